@@ -0,0 +1,132 @@
+"""
+Aggregate orthophoto detections per plot, per planting row and per grid cell.
+
+Loads the <name>_detections.json written by sliced inference into a packed
+spatial index (src.inference.spatial_index.DetectionIndex), georeferenced with
+the orthophoto's world file when plots and rows are in map coordinates. The
+index is saved next to the detections and reused while they and the
+georeferencing do not change.
+"""
+import sys
+import csv
+import json
+import argparse
+from pathlib import Path
+from wasabi import msg
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(root_dir))
+
+from src.inference.geojson import load_georeference
+from src.inference.spatial_index import DetectionIndex, load_geojson_geometries
+
+def load_index(detections_path: Path, index_path: Path, transform: tuple, cell_size: float = None) -> DetectionIndex:
+    """
+    Load the spatial index, rebuilding it if the detections are newer or the georeferencing changed.
+
+    Args:
+        detections_path (Path): Path to the <name>_detections.json file.
+        index_path (Path): Path to the serialized index (.npz).
+        transform (tuple): Affine transform from pixels to map coordinates, or None.
+        cell_size (float): Index cell size.
+
+    Returns:
+        DetectionIndex: Index over the detection centers.
+    """
+    if index_path.exists() and index_path.stat().st_mtime >= detections_path.stat().st_mtime:
+        index = DetectionIndex.load(index_path)
+        if index.transform == (None if transform is None else tuple(float(v) for v in transform)):
+            msg.info(f"Loading spatial index from '{index_path}'.")
+            return index
+    msg.info(f"Building spatial index from '{detections_path}'.")
+    index = DetectionIndex.from_detections(detections_path, transform, cell_size)
+    index.save(index_path)
+    return index
+
+def class_names(detections_path: Path) -> dict:
+    """Class names found in the detections file."""
+    with open(detections_path, 'r') as file:
+        return {d['cls']: d['name'] for d in json.load(file)['detections']}
+
+def write_csv(path: Path, header: list, rows: list):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def main(args: argparse.Namespace):
+    """
+    Build or load the index and write the requested aggregations as CSV files.
+
+    Args:
+        args (argparse.Namespace): Command line arguments.
+    """
+    detections_path = Path(args.detections)
+    output_dir = Path(args.output_dir or detections_path.parent)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    index_path = Path(args.index or detections_path.with_suffix('.index.npz'))
+
+    transform = None
+    if args.image or args.world_file:
+        transform, _ = load_georeference(Path(args.image or ''), world_file=args.world_file)
+        if transform is None:
+            msg.warn("No world file or GeoTIFF transform found; using pixel coordinates.")
+
+    index = load_index(detections_path, index_path, transform, args.cell_size)
+    names = class_names(detections_path)
+    num_classes = max(names, default=0) + 1
+    class_header = [names.get(c, str(c)) for c in range(num_classes)]
+    msg.info(f"{len(index)} detections indexed ({index.shape[0]}x{index.shape[1]} cells).")
+
+    if args.plots:
+        ids, polygons, _, _ = load_geojson_geometries(Path(args.plots), args.id_field)
+        counts = index.polygon_counts(polygons, num_classes)
+        path = output_dir / 'plot_counts.csv'
+        write_csv(path, ['plot', 'total', *class_header],
+                  [[plot, int(row.sum()), *row.tolist()] for plot, row in zip(ids, counts)])
+        msg.good(f"{len(ids)} plots, {int(counts.sum())} detections inside plots. Saved to '{path}'.")
+
+    if args.rows:
+        _, _, ids, lines = load_geojson_geometries(Path(args.rows), args.id_field)
+        counts = index.line_counts(lines, args.row_width)
+        totals = {}
+        for row_id, count in zip(ids, counts):
+            totals[row_id] = totals.get(row_id, 0) + int(count)
+        path = output_dir / 'row_counts.csv'
+        write_csv(path, ['row', 'total'], list(totals.items()))
+        msg.good(f"{len(totals)} rows, {int(counts.sum())} detections within {args.row_width} of a row. "
+                 f"Saved to '{path}'.")
+
+    if args.grid_size:
+        counts, origin = index.grid_counts(args.grid_size)
+        path = output_dir / 'grid_counts.csv'
+        write_csv(path, ['row', 'col', 'xmin', 'ymin', 'count'],
+                  [[r, c, origin[0] + c * args.grid_size, origin[1] + r * args.grid_size, int(counts[r, c])]
+                   for r in range(counts.shape[0]) for c in range(counts.shape[1]) if counts[r, c]])
+        msg.good(f"{counts.shape[0]}x{counts.shape[1]} grid of {args.grid_size}. Saved to '{path}'.")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Aggregate detections per plot, row and grid cell.")
+    parser.add_argument('--detections', type=str, required=True,
+                        help='Path to the <name>_detections.json file written by sliced inference.')
+    parser.add_argument('--plots', type=str, default=None,
+                        help='GeoJSON with plot polygons.')
+    parser.add_argument('--rows', type=str, default=None,
+                        help='GeoJSON with planting rows as lines.')
+    parser.add_argument('--row_width', type=float, default=1.0,
+                        help='Width of the corridor counted around each row, in map units.')
+    parser.add_argument('--grid_size', type=float, default=None,
+                        help='Cell size of the grid counts, in map units.')
+    parser.add_argument('--id_field', type=str, default=None,
+                        help='Feature property used as plot/row identifier (default: feature index).')
+    parser.add_argument('--image', type=str, default=None,
+                        help='Orthophoto of the detections, used to find its world file or GeoTIFF transform.')
+    parser.add_argument('--world_file', type=str, default=None,
+                        help='World file of the orthophoto.')
+    parser.add_argument('--index', type=str, default=None,
+                        help='Path of the serialized index (default: <detections>.index.npz).')
+    parser.add_argument('--cell_size', type=float, default=None,
+                        help='Index cell size (default: about 4 detections per cell).')
+    parser.add_argument('--output_dir', type=str, default=None,
+                        help='Directory of the CSV files (default: next to the detections).')
+    main(parser.parse_args())
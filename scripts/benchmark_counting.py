@@ -0,0 +1,85 @@
+"""
+Benchmark of the detect-every-N counting mode against full per-frame inference.
+
+Runs src.inference.tracking.count_video on the video of an inference config for
+several values of N and reports frames/s, detector calls and the count error
+relative to N = 1 (detector on every frame).
+"""
+import sys
+import argparse
+from pathlib import Path
+import yaml
+from ultralytics import YOLO
+from wasabi import msg
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(root_dir))
+
+from src.inference.tracking import count_video
+
+def load_config(config_path: str) -> dict:
+    """
+    Load the inference configuration from a YAML file.
+
+    Args:
+        config_path (str): Path to the configuration file.
+
+    Returns:
+        dict: Configuration data.
+    """
+    with open(config_path, 'r') as file:
+        return yaml.safe_load(file)
+
+def main(config_path: str, detect_every: list):
+    """
+    Run the counting benchmark for each N.
+
+    Args:
+        config_path (str): Path to the inference configuration file.
+        detect_every (list): Values of N to evaluate; N = 1 is always run as reference.
+    """
+    config = load_config(config_path)
+    model_path = Path(config['model']['path'])
+    video_path = Path(config['paths']['input'])
+    counting = config.get('counting', {})
+    if not model_path.exists() or not video_path.exists():
+        msg.fail(f"Model or video not found: {model_path}, {video_path}")
+        return
+
+    model = YOLO(str(model_path))
+    # Same tracker settings as run_counting in scripts/inference.py, so the deployed configuration is measured
+    options = dict(
+        imgsz=config['inference']['imgsz'],
+        conf=config['inference']['conf'],
+        redetect_confidence=counting.get('redetect_confidence', 0.5),
+        line_position=counting.get('line_position', 0.5),
+        line_axis=counting.get('line_axis', 'y'),
+        iou_threshold=counting.get('iou_threshold', 0.3),
+        max_age=counting.get('max_age', 30),
+        min_hits=counting.get('min_hits', 2),
+    )
+
+    results = {}
+    for n in sorted(set([1] + detect_every)):
+        msg.info(f"Counting with detect_every={n}...")
+        results[n] = count_video(model, video_path, detect_every=n, **options)
+
+    reference = results[1]
+    rows = []
+    for n, result in results.items():
+        error = result['unique_objects'] - reference['unique_objects']
+        relative = abs(error) / reference['unique_objects'] if reference['unique_objects'] else 0.0
+        crossings = result['line_crossings']['forward'] + result['line_crossings']['backward']
+        rows.append((n, f"{result['fps']:.1f}", f"{result['fps'] / reference['fps']:.1f}x",
+                     result['detector_frames'], result['unique_objects'], f"{relative:.1%}", crossings))
+    msg.table(rows, header=("N", "frames/s", "speedup", "detector calls", "unique", "count error", "line crossings"),
+              divider=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark detect-every-N counting against per-frame inference.")
+    parser.add_argument('--config', type=str, default='config/inference_config.yaml',
+                        help='Path to the inference configuration YAML file.')
+    parser.add_argument('--detect_every', type=int, nargs='+', default=[2, 3, 5, 10],
+                        help='Values of N to evaluate.')
+    args = parser.parse_args()
+    main(args.config, args.detect_every)
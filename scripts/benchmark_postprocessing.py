@@ -0,0 +1,169 @@
+"""
+Benchmark of the YOLO output postprocessing used by the Android app.
+
+Compares a straight Python port of bestBox/applyNMS from Detector.kt against
+the vectorized NumPy decoder in src/inference/decoder.py. For every anchor
+count it checks that both return exactly the same boxes and reports the time
+of each implementation, so the cost of postprocessing can be measured off-device.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+from wasabi import msg
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(root_dir))
+
+from src.inference.decoder import decode_output, CONFIDENCE_THRESHOLD, IOU_THRESHOLD
+
+def kotlin_best_box(array: np.ndarray, num_channel: int, num_elements: int) -> list:
+    """
+    Line-by-line port of Detector.bestBox over the flattened output tensor.
+
+    Args:
+        array (np.ndarray): Flattened float32 output of shape (num_channel * num_elements,).
+        num_channel (int): 4 + number of classes.
+        num_elements (int): Number of anchors.
+
+    Returns:
+        list: Selected boxes as (x1, y1, x2, y2, cnf, cls) tuples.
+    """
+    array = [np.float32(v) for v in array]
+    two = np.float32(2)
+    bounding_boxes = []
+    for c in range(num_elements):
+        max_conf = np.float32(-1.0)
+        max_idx = -1
+        j = 4
+        array_idx = c + num_elements * j
+        while j < num_channel:
+            if array[array_idx] > max_conf:
+                max_conf = array[array_idx]
+                max_idx = j - 4
+            j += 1
+            array_idx += num_elements
+
+        if max_conf > np.float32(CONFIDENCE_THRESHOLD):
+            cx = array[c]
+            cy = array[c + num_elements]
+            w = array[c + num_elements * 2]
+            h = array[c + num_elements * 3]
+            x1 = cx - w / two
+            y1 = cy - h / two
+            x2 = cx + w / two
+            y2 = cy + h / two
+            if x1 < 0 or x1 > 1 or y1 < 0 or y1 > 1 or x2 < 0 or x2 > 1 or y2 < 0 or y2 > 1:
+                continue
+            bounding_boxes.append((x1, y1, x2, y2, w, h, max_conf, max_idx))
+
+    return kotlin_apply_nms(bounding_boxes)
+
+def kotlin_apply_nms(boxes: list) -> list:
+    """Port of Detector.applyNMS and calculateIoU."""
+    sorted_boxes = sorted(boxes, key=lambda b: b[6], reverse=True)
+    selected = []
+    threshold = np.float32(IOU_THRESHOLD)
+    zero = np.float32(0)
+    while sorted_boxes:
+        first = sorted_boxes.pop(0)
+        selected.append((first[0], first[1], first[2], first[3], first[6], first[7]))
+        remaining = []
+        for box in sorted_boxes:
+            x1 = max(first[0], box[0])
+            y1 = max(first[1], box[1])
+            x2 = min(first[2], box[2])
+            y2 = min(first[3], box[3])
+            intersection = max(zero, x2 - x1) * max(zero, y2 - y1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                iou = intersection / (first[4] * first[5] + box[4] * box[5] - intersection)
+            if not iou >= threshold:
+                remaining.append(box)
+        sorted_boxes = remaining
+    return selected
+
+def synthetic_output(num_anchors: int, num_classes: int, positive_ratio: float, seed: int = 0) -> np.ndarray:
+    """
+    Build a random [1, 4 + nc, N] tensor with clustered positives like a real YOLO head.
+
+    Args:
+        num_anchors (int): Number of anchors (N).
+        num_classes (int): Number of classes (nc).
+        positive_ratio (float): Fraction of anchors above the confidence threshold.
+        seed (int): Random seed.
+
+    Returns:
+        np.ndarray: Float32 output tensor.
+    """
+    rng = np.random.default_rng(seed)
+    output = np.empty((4 + num_classes, num_anchors), dtype=np.float32)
+    centers = rng.uniform(0.1, 0.9, size=(max(num_anchors // 50, 1), 2))
+    owner = rng.integers(0, len(centers), num_anchors)
+    output[0:2] = (centers[owner] + rng.normal(0, 0.01, (num_anchors, 2))).T
+    output[2:4] = rng.uniform(0.02, 0.12, (2, num_anchors))
+    output[4:] = rng.uniform(0, CONFIDENCE_THRESHOLD, (num_classes, num_anchors))
+    positives = rng.random(num_anchors) < positive_ratio
+    output[4 + rng.integers(0, num_classes, positives.sum()), np.flatnonzero(positives)] = rng.uniform(
+        CONFIDENCE_THRESHOLD, 1.0, positives.sum())
+    return output[None]
+
+def time_call(func, repeats: int) -> float:
+    """Return the best wall time in milliseconds over several repeats."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main(anchors: list, num_classes: int, positive_ratio: float, repeats: int, max_reference: int):
+    """
+    Run the parity check and the micro-benchmark for each anchor count.
+
+    Args:
+        anchors (list): Anchor counts to evaluate.
+        num_classes (int): Number of classes.
+        positive_ratio (float): Fraction of anchors above the confidence threshold.
+        repeats (int): Repetitions per measurement.
+        max_reference (int): Largest anchor count for which the Kotlin port is run.
+    """
+    rows = []
+    parity_ok = True
+    for num_anchors in anchors:
+        output = synthetic_output(num_anchors, num_classes, positive_ratio)
+        detections = decode_output(output)
+        numpy_ms = time_call(lambda: decode_output(output), repeats)
+
+        if num_anchors <= max_reference:
+            reference = kotlin_best_box(output.ravel(), output.shape[1], output.shape[2])
+            reference_ms = time_call(lambda: kotlin_best_box(output.ravel(), output.shape[1], output.shape[2]), 1)
+            expected = np.array([r[:4] for r in reference], dtype=np.float32).reshape(-1, 4)
+            same = (np.array_equal(expected, detections['boxes'])
+                    and np.array_equal([r[5] for r in reference], detections['classes']))
+            parity_ok &= same
+            rows.append((num_anchors, len(detections['boxes']), f"{reference_ms:.1f}", f"{numpy_ms:.2f}",
+                         f"{reference_ms / numpy_ms:.0f}x", "ok" if same else "MISMATCH"))
+        else:
+            rows.append((num_anchors, len(detections['boxes']), "-", f"{numpy_ms:.2f}", "-", "-"))
+
+    msg.table(rows, header=("anchors", "boxes", "kotlin port (ms)", "numpy (ms)", "speedup", "parity"), divider=True)
+    if parity_ok:
+        msg.good("NumPy decoder matches the Detector.kt port on every checked input.")
+    else:
+        msg.fail("NumPy decoder differs from the Detector.kt port.")
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark and parity check of the YOLO output decoder.")
+    parser.add_argument('--anchors', type=int, nargs='+', default=[2100, 8400, 33600, 134400],
+                        help='Anchor counts to evaluate (8400 = 640x640 input).')
+    parser.add_argument('--num_classes', type=int, default=2, help='Number of classes in the output tensor.')
+    parser.add_argument('--positive_ratio', type=float, default=0.05,
+                        help='Fraction of anchors above the confidence threshold.')
+    parser.add_argument('--repeats', type=int, default=5, help='Repetitions per measurement.')
+    parser.add_argument('--max_reference', type=int, default=33600,
+                        help='Largest anchor count for which the slow Kotlin port is run.')
+    args = parser.parse_args()
+    main(args.anchors, args.num_classes, args.positive_ratio, args.repeats, args.max_reference)
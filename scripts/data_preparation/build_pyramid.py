@@ -0,0 +1,24 @@
+"""Interface for building the multi-resolution pyramid of an ortophoto."""
+import argparse
+from pathlib import Path
+from src.data_processing.pyramid import build_pyramid
+
+def main():
+    parser = argparse.ArgumentParser(description="Construir niveles reducidos 2x, 4x, 8x... de una ortofoto.")
+    parser.add_argument("--image_path", type=str, required=True, help="Ruta a la ortofoto.")
+    parser.add_argument("--output_dir", type=str, default=None, help="Directorio de la pirámide (por defecto <imagen>.pyramid).")
+    parser.add_argument("--levels", type=int, default=None, help="Niveles reducidos (por defecto hasta que el último cabe en un mosaico).")
+    parser.add_argument("--tile_size", type=int, default=512, help="Tamaño de los mosaicos de cada nivel.")
+    parser.add_argument("--format", type=str, default="jpg", choices=["jpg", "png"], help="Formato de los mosaicos; png conserva la transparencia.")
+    parser.add_argument("--shards", action="store_true", help="Guarda cada nivel en un contenedor de shards.")
+    parser.add_argument("--strip_rows", type=int, default=1024, help="Filas de la ortofoto leídas por franja.")
+    parser.add_argument("--world_file", type=str, default=None, help="World file de la ortofoto (por defecto junto a la imagen).")
+
+    args = parser.parse_args()
+
+    build_pyramid(Path(args.image_path), Path(args.output_dir) if args.output_dir else None, args.levels,
+                  args.tile_size, args.format, args.shards, args.strip_rows,
+                  world_file=Path(args.world_file) if args.world_file else None)
+
+if __name__ == "__main__":
+    main()
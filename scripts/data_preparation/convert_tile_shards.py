@@ -0,0 +1,31 @@
+"""Interface for converting between image directories and shard containers."""
+import argparse
+from pathlib import Path
+from wasabi import Printer
+from src.data_processing.tile_shards import is_container, pack_directory, unpack_shards
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte un directorio de imágenes en un contenedor de shards o viceversa.")
+    parser.add_argument("--input", type=str, required=True,
+                        help="Directorio de imágenes (mosaicos, frames o split YOLO) o contenedor de shards.")
+    parser.add_argument("--output", type=str, required=True, help="Contenedor o directorio de salida.")
+    parser.add_argument("--labels_dir", type=str, default=None,
+                        help="Directorio de etiquetas YOLO (por defecto la carpeta labels hermana de images).")
+    parser.add_argument("--shard_size_mb", type=float, default=256, help="Tamaño máximo de cada shard en MB.")
+
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    output_path = Path(args.output)
+    labels_dir = Path(args.labels_dir) if args.labels_dir else None
+    msg = Printer()
+
+    if is_container(input_path):
+        count = unpack_shards(input_path, output_path, labels_dir)
+        msg.good(f"Se extrajeron {count} imágenes en {output_path}")
+    else:
+        count = pack_directory(input_path, output_path, args.shard_size_mb, labels_dir)
+        msg.good(f"Se empaquetaron {count} imágenes en {output_path}")
+
+if __name__ == "__main__":
+    main()
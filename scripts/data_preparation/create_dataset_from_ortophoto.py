@@ -2,6 +2,7 @@
 import argparse
 from pathlib import Path
 from src.data_processing.ortophoto_utils import create_tiles
+from src.data_processing.pyramid import resolve_level
 
 def main():
     parser = argparse.ArgumentParser(description="Crear mosaicos a partir de una imagen.")
@@ -9,6 +10,24 @@ def main():
     parser.add_argument("--output_dir", type=str, required=True, help="Directorio de salida para los mosaicos.")
     parser.add_argument("--tile_size", type=int, default=512, help="Tamaño de los mosaicos en píxeles.")
     parser.add_argument("--overlap", type=float, default=0.2, help="Proporción de traslape entre mosaicos (0 a 1).")
+    parser.add_argument("--windowed", action="store_true", help="Lee la imagen por franjas para acotar el uso de memoria.")
+    parser.add_argument("--workers", type=int, default=1, help="Número de hilos para codificar y guardar los mosaicos.")
+    parser.add_argument("--min_valid", type=float, default=None,
+                        help="Omite los mosaicos con menos fracción de datos válidos (p. ej. 0.1) y escribe tiles_manifest.csv.")
+    parser.add_argument("--nodata", type=int, default=0, help="Valor de las bandas en los bordes sin datos.")
+    parser.add_argument("--nodata_tolerance", type=int, default=8,
+                        help="Diferencia máxima con --nodata para considerar un píxel sin datos (artefactos JPEG).")
+    parser.add_argument("--vegetation_threshold", type=float, default=None,
+                        help="Umbral de ExG normalizado para omitir mosaicos de suelo desnudo (p. ej. 0.05).")
+    parser.add_argument("--shards", action="store_true",
+                        help="Escribe los mosaicos en un contenedor de shards en output_dir en lugar de un JPEG por mosaico.")
+    parser.add_argument("--shard_size_mb", type=float, default=256, help="Tamaño máximo de cada shard en MB.")
+    parser.add_argument("--gsd", type=float, default=None,
+                        help="Resolución objetivo en unidades del mapa por píxel; corta los mosaicos del nivel de pirámide más cercano.")
+    parser.add_argument("--level", type=int, default=None,
+                        help="Nivel de pirámide a cortar (0 = resolución nativa); tiene prioridad sobre --gsd.")
+    parser.add_argument("--pyramid_dir", type=str, default=None,
+                        help="Directorio de la pirámide (por defecto <imagen>.pyramid); se construye si no existe.")
 
     args = parser.parse_args()
 
@@ -17,7 +36,12 @@ def main():
     tile_size = args.tile_size
     overlap = args.overlap
 
-    create_tiles(image_path, output_dir, tile_size, overlap)
+    if args.gsd is not None or args.level is not None:
+        image_path, _, _ = resolve_level(image_path, args.gsd, args.level, args.pyramid_dir)
+
+    create_tiles(image_path, output_dir, tile_size, overlap, windowed=args.windowed, workers=args.workers,
+                 min_valid=args.min_valid, nodata=args.nodata, vegetation_threshold=args.vegetation_threshold,
+                 shards=args.shards, shard_size_mb=args.shard_size_mb, nodata_tolerance=args.nodata_tolerance)
 
 if __name__ == "__main__":
     main()
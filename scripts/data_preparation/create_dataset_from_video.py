@@ -2,13 +2,27 @@
 
 import argparse
 from pathlib import Path
-from src.data_processing.video_utils import extract_frames
+from src.data_processing.video_utils import (extract_frames, extract_frames_from_dir, extract_keyframes,
+                                             extract_keyframes_from_dir)
 
 def main():
     parser = argparse.ArgumentParser(description="Extraer frames de un video.")
-    parser.add_argument("--video_path", type=str, required=True, help="Ruta al archivo de video.")
+    parser.add_argument("--video_path", type=str, required=True, help="Ruta al archivo de video o a un directorio de videos.")
     parser.add_argument("--output_dir", type=str, required=True, help="Directorio de salida para los frames.")
     parser.add_argument("--frame_interval", type=int, default=30, help="Intervalo de frames para guardar.")
+    parser.add_argument("--interval_seconds", type=float, default=None, help="Intervalo en segundos entre frames (tiene prioridad sobre --frame_interval).")
+    parser.add_argument("--mode", type=str, default="auto", choices=["auto", "grab", "seek", "read"], help="Estrategia de muestreo de frames.")
+    parser.add_argument("--decode_workers", type=int, default=2, help="Videos decodificados simultáneamente (solo directorios).")
+    parser.add_argument("--encode_workers", type=int, default=1, help="Hilos que codifican y escriben los frames.")
+    parser.add_argument("--queue_size", type=int, default=64, help="Máximo de frames decodificados en espera.")
+    parser.add_argument("--shards", action="store_true", help="Escribe los frames en contenedores de shards en lugar de un JPEG por frame.")
+    parser.add_argument("--shard_size_mb", type=float, default=256, help="Tamaño máximo de cada shard en MB.")
+    parser.add_argument("--adaptive", action="store_true", help="Muestreo adaptativo: guarda un frame solo cuando la escena cambia.")
+    parser.add_argument("--threshold", type=float, default=0.08, help="Cambio mínimo (0 a 1) para guardar un frame en modo adaptativo.")
+    parser.add_argument("--min_gap", type=int, default=5, help="Frames mínimos entre frames guardados en modo adaptativo.")
+    parser.add_argument("--max_gap", type=int, default=150, help="Frames máximos entre frames guardados en modo adaptativo.")
+    parser.add_argument("--probe_step", type=int, default=2,
+                        help="Cada cuántos frames se evalúa el cambio en modo adaptativo (cada evaluación decodifica el frame completo).")
 
     args = parser.parse_args()
 
@@ -16,7 +30,22 @@ def main():
     output_dir = Path(args.output_dir)
     frame_interval = args.frame_interval
 
-    extract_frames(video_path, output_dir, frame_interval)
+    if args.adaptive and video_path.is_dir():
+        extract_keyframes_from_dir(video_path, output_dir, threshold=args.threshold, min_gap=args.min_gap,
+                                   max_gap=args.max_gap, probe_step=args.probe_step, workers=args.decode_workers,
+                                   shards=args.shards, shard_size_mb=args.shard_size_mb)
+    elif args.adaptive:
+        extract_keyframes(video_path, output_dir, threshold=args.threshold, min_gap=args.min_gap, max_gap=args.max_gap,
+                          probe_step=args.probe_step, shards=args.shards, shard_size_mb=args.shard_size_mb)
+    elif video_path.is_dir():
+        extract_frames_from_dir(video_path, output_dir, frame_interval, interval_seconds=args.interval_seconds,
+                                mode=args.mode, decode_workers=args.decode_workers,
+                                encode_workers=max(args.encode_workers, 1), queue_size=args.queue_size,
+                                shards=args.shards, shard_size_mb=args.shard_size_mb)
+    else:
+        extract_frames(video_path, output_dir, frame_interval, interval_seconds=args.interval_seconds, mode=args.mode,
+                       encode_workers=args.encode_workers, queue_size=args.queue_size,
+                       shards=args.shards, shard_size_mb=args.shard_size_mb)
 
 if __name__ == "__main__":
     main()
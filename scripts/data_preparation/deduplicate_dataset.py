@@ -0,0 +1,18 @@
+"""Interface for finding and removing near-duplicate images in a dataset directory."""
+import argparse
+from pathlib import Path
+from src.data_processing.dedup_utils import deduplicate
+
+def main():
+    parser = argparse.ArgumentParser(description="Detectar imágenes casi duplicadas con hashes perceptuales.")
+    parser.add_argument("--dataset_dir", type=str, required=True, help="Directorio con las imágenes (mosaicos, frames o dataset sincronizado).")
+    parser.add_argument("--max_distance", type=int, default=4, help="Distancia de Hamming máxima entre hashes para considerar duplicados.")
+    parser.add_argument("--action", type=str, default="report", choices=["report", "hardlink", "drop"], help="Qué hacer con los duplicados.")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para calcular los hashes.")
+
+    args = parser.parse_args()
+
+    deduplicate(Path(args.dataset_dir), args.max_distance, args.action, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""Interface for indexing the YOLO labels of a dataset and reporting its statistics."""
+import argparse
+from pathlib import Path
+from src.data_processing.label_index import index_dataset
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexar las etiquetas YOLO de un dataset y mostrar sus estadísticas.")
+    parser.add_argument("--dataset_dir", type=str, required=True, help="Directorio del dataset (con train/, valid/ y test/).")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para leer las etiquetas.")
+    parser.add_argument("--bins", type=int, default=10, help="Intervalos del histograma de tamaños de caja.")
+
+    args = parser.parse_args()
+
+    index_dataset(Path(args.dataset_dir), args.workers, args.bins)
+
+if __name__ == "__main__":
+    main()
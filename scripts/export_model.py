@@ -18,6 +18,10 @@ from wasabi import msg
 root_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(root_dir))
 
+from src.data_processing.dataset_utils import IMAGE_EXTENSIONS, split_images
+from src.export.benchmark import FORMATS, model_size, run_benchmark, write_report
+from src.export.quantization import evaluate_tflite, quantize_saved_model, sample_calibration_images
+
 def load_config(config_path: str) -> dict:
     """
     Load the export configuration from a YAML file.
@@ -63,15 +67,143 @@ def export_model_to_tflite(config: dict):
     else:
         msg.warn(f"Float16 model not found at '{tflite_model_path_float16}'. This may be expected depending on your export settings.")
 
-def main(config_path: str):
+def export_int8_tflite(config: dict):
+    """
+    Export a full-integer INT8 TFLite model calibrated on the dataset and validate it against the float model.
+
+    The quantized model (uint8 input, float32 output) is kept as best_int8.tflite only if its
+    mAP50 drop and CPU speedup versus best_float32.tflite are within the configured limits.
+
+    Args:
+        config (dict): Export configuration.
+    """
+    int8 = config['int8']
+    export_dir = Path(config['model']['export_dir'])
+    saved_model_dir = export_dir / 'best_saved_model'
+    float_model_path = saved_model_dir / 'best_float32.tflite'
+    int8_model_path = saved_model_dir / 'best_int8.tflite'
+    imgsz = config['export']['imgsz']
+    data_yaml = Path(int8['data_yaml'])
+
+    if int8_model_path.exists():
+        msg.info(f"INT8 model already exported at '{int8_model_path}'. Skipping export.")
+        return
+    if not float_model_path.exists():
+        msg.fail(f"Float model not found at '{float_model_path}'. Run the TFLite export first.")
+        return
+
+    calibration = sample_calibration_images(data_yaml, int8.get('num_samples', 200), int8.get('stratify', True),
+                                            seed=int8.get('seed', 0))
+    if not calibration:
+        msg.fail(f"No calibration images found in the validation split of '{data_yaml}'.")
+        return
+    msg.info(f"Quantizing to INT8 with {len(calibration)} calibration images...")
+    candidate_path = saved_model_dir / 'best_int8_candidate.tflite'
+    quantize_saved_model(saved_model_dir, calibration, candidate_path, imgsz)
+
+    # Evaluate on validation images not used for calibration when there are enough of them
+    calibration_set = set(calibration)
+    eval_images = [p for p in split_images(data_yaml, 'val') if p not in calibration_set] or calibration
+    eval_images = eval_images[:int8.get('eval_images', 100)]
+    threads = int8.get('threads', 4)
+    float_metrics = evaluate_tflite(float_model_path, eval_images, imgsz, threads=threads)
+    int8_metrics = evaluate_tflite(candidate_path, eval_images, imgsz, threads=threads)
+
+    map_drop = float_metrics['map50'] - int8_metrics['map50']
+    speedup = float_metrics['latency_p50_ms'] / max(int8_metrics['latency_p50_ms'], 1e-9)
+    msg.table([
+        ('float32', f"{float_metrics['map50']:.3f}", f"{float_metrics['latency_p50_ms']:.1f}",
+         f"{float_metrics['latency_p95_ms']:.1f}", f"{model_size(float_model_path):.1f}"),
+        ('int8', f"{int8_metrics['map50']:.3f}", f"{int8_metrics['latency_p50_ms']:.1f}",
+         f"{int8_metrics['latency_p95_ms']:.1f}", f"{model_size(candidate_path):.1f}"),
+    ], header=('Model', 'mAP50', 'p50 (ms)', 'p95 (ms)', 'Size (MB)'), divider=True)
+
+    max_map_drop = int8.get('max_map_drop', 0.02)
+    min_speedup = int8.get('min_speedup', 1.0)
+    if map_drop > max_map_drop or speedup < min_speedup:
+        msg.fail(f"INT8 model rejected: mAP50 drop {map_drop:.3f} (max {max_map_drop}), "
+                 f"speedup {speedup:.2f}x (min {min_speedup}x). Kept at '{candidate_path}' for inspection.")
+        return
+    candidate_path.replace(int8_model_path)
+    msg.good(f"INT8 model accepted (mAP50 drop {map_drop:.3f}, {speedup:.2f}x faster) and saved at '{int8_model_path}'.")
+
+def benchmark_exports(config: dict):
+    """
+    Export the model to every format/precision and imgsz in the 'benchmark' section and compare them.
+
+    Latency, throughput and peak RSS are measured on CPU over a fixed image set, and mAP
+    on the dataset's validation split. Results are written to benchmark.json and benchmark.md.
+
+    Args:
+        config (dict): Export configuration.
+    """
+    model_input_path = Path(config['model']['input_path'])
+    benchmark = config.get('benchmark', {})
+    output_dir = Path(benchmark.get('output_dir', Path(config['model']['export_dir']) / 'benchmark'))
+    data_yaml = Path(benchmark['data_yaml']) if benchmark.get('data_yaml') else None
+    variants = benchmark.get('formats', list(FORMATS))
+    sizes = benchmark.get('imgsz', [config['export']['imgsz']])
+
+    unknown = [variant for variant in variants if variant not in FORMATS]
+    if unknown:
+        msg.fail(f"Unknown formats: {', '.join(unknown)}. Options: {', '.join(FORMATS)}")
+        return
+
+    # Fixed image set: an explicit directory, otherwise the first images of the validation split
+    if benchmark.get('images'):
+        images = sorted(p for p in Path(benchmark['images']).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    elif data_yaml:
+        images = split_images(data_yaml, 'val')
+    else:
+        images = []
+    images = images[:benchmark.get('num_images', 50)]
+    if not images:
+        msg.fail("No benchmark images found. Set 'benchmark.images' or 'benchmark.data_yaml'.")
+        return
+    if data_yaml is None:
+        msg.warn("No 'benchmark.data_yaml' set; mAP will not be computed.")
+
+    msg.info(f"Benchmarking {len(variants)} formats x {len(sizes)} sizes on {len(images)} images...")
+    rows = run_benchmark(
+        model_input_path,
+        images,
+        output_dir / 'exports',
+        variants,
+        sizes,
+        data_yaml=data_yaml,
+        warmup=benchmark.get('warmup', 5),
+        threads=benchmark.get('threads', 4),
+        batch_size=benchmark.get('batch_size', 1),
+        log=msg.text
+    )
+    json_path, markdown_path = write_report(rows, output_dir, {
+        'model': str(model_input_path),
+        'images': len(images),
+        'threads': benchmark.get('threads', 4),
+        'data_yaml': str(data_yaml) if data_yaml else None,
+    })
+
+    for row in rows:
+        if 'error' in row:
+            msg.warn(f"{row['format']} @ {row['imgsz']} failed: {row['error']}")
+    msg.text(markdown_path.read_text())
+    msg.good(f"Benchmark saved to '{json_path}' and '{markdown_path}'.")
+
+def main(config_path: str, benchmark: bool = False):
     """
     Main function to load config and export the model.
 
     Args:
         config_path (str): Path to the configuration file.
+        benchmark (bool): Run the export benchmark instead of the single TFLite export.
     """
     config = load_config(config_path)
+    if benchmark:
+        benchmark_exports(config)
+        return
     export_model_to_tflite(config)
+    if config.get('int8', {}).get('enabled', False):
+        export_int8_tflite(config)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Script to export YOLOv8 models to TFLite format.")
@@ -81,6 +213,11 @@ if __name__ == '__main__':
         default='config/export_config.yaml',
         help='Path to the export configuration YAML file.'
     )
+    parser.add_argument(
+        '--benchmark',
+        action='store_true',
+        help='Export to several formats and sizes and compare latency, memory, size and mAP.'
+    )
     args = parser.parse_args()
-    main(args.config)
+    main(args.config, args.benchmark)
 
@@ -6,13 +6,37 @@ Argumentos:
     input (str): Ruta al archivo de imagen o video para la inferencia.
     output (str): Ruta donde se guardarán los resultados de la inferencia.
 """
+from __future__ import annotations
+
 import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import cv2
 import yaml
 import argparse
-from ultralytics import YOLO
+from typing import TYPE_CHECKING
 from wasabi import msg
 
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(root_dir))
+
+from src.inference.sliced import predict_orthophoto, save_detections, scale_detections
+from src.inference.geojson import export_mask_polygons, load_georeference
+from src.data_processing.pyramid import resolve_level, scaled_transform
+from src.data_processing.ortophoto_utils import select_tiles, write_tile_manifest
+from src.inference.streaming import stream_video_inference
+from src.inference.tracking import count_video
+from src.inference.client import InferenceClient
+from src.inference.cache import ResultCache, model_fingerprint, predict_with_cache, result_to_array
+from src.data_processing.tile_shards import ShardReader, is_container
+from src.inference.backends import load_backend
+
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp'}
+
 def load_config(config_path: str = "config/inference_config.yaml") -> dict:
     """
     Carga la configuración de inferencia desde un archivo YAML.
@@ -55,12 +79,472 @@ def run_inference(model: YOLO, input_path: Path, output_path: Path, imgsz: int,
     else:
         msg.fail(f"La ruta de entrada no existe: {input_path}")
 
-def main(config_path: str = "config/inference_config.yaml"):
+def resolve_sliced_input(input_path: Path, sliced: dict) -> tuple:
+    """
+    Elige el nivel de la pirámide de la ortofoto según la sección 'pyramid' de 'sliced'.
+
+    La pirámide se construye en una sola pasada si todavía no existe.
+
+    Args:
+        input_path (Path): Ruta a la ortofoto.
+        sliced (dict): Sección 'sliced' de la configuración.
+
+    Returns:
+        tuple: (ruta de la ortofoto o del nivel, factor de reducción del nivel).
+    """
+    pyramid = sliced.get('pyramid', {})
+    if not pyramid.get('enabled', False):
+        return input_path, 1
+
+    path, record, _ = resolve_level(
+        input_path,
+        gsd=pyramid.get('gsd'),
+        level=pyramid.get('level'),
+        pyramid_dir=pyramid.get('dir'),
+        tile_size=pyramid.get('tile_size', 512),
+        fmt=pyramid.get('format', 'jpg'),
+        shards=pyramid.get('shards', False)
+    )
+    resolution = f", {record['gsd']:.3g} unidades/px" if record['gsd'] else ''
+    msg.info(f"Nivel {record['level']} de la pirámide: {record['width']}x{record['height']} px{resolution}")
+    return path, record['scale']
+
+def select_sliced_tiles(input_path: Path, output_path: Path, sliced: dict, name: str = None) -> set | None:
+    """
+    Omite los mosaicos sin datos o sin vegetación según la sección 'skip_empty' de 'sliced'.
+
+    Args:
+        input_path (Path): Ruta a la ortofoto o al nivel de pirámide que se procesa.
+        output_path (Path): Directorio donde se guarda el manifiesto de mosaicos.
+        sliced (dict): Sección 'sliced' de la configuración.
+        name (str): Nombre del manifiesto; por defecto el de input_path.
+
+    Returns:
+        set | None: Celdas (row, col) a procesar, o None para procesarlas todas.
+    """
+    skip_empty = sliced.get('skip_empty', {})
+    if not skip_empty.get('enabled', False):
+        return None
+
+    records = select_tiles(
+        input_path,
+        tile_size=sliced.get('tile_size', 640),
+        overlap=sliced.get('overlap', 0.2),
+        min_valid=skip_empty.get('min_valid', 0.1),
+        nodata=skip_empty.get('nodata', 0),
+        nodata_tolerance=skip_empty.get('nodata_tolerance', 8),
+        vegetation_threshold=skip_empty.get('vegetation_threshold'),
+        scale=skip_empty.get('scale', 16)
+    )
+    manifest_path = output_path / f"{name or input_path.stem}_tiles_manifest.csv"
+    keep = write_tile_manifest(records, manifest_path)
+    msg.info(f"Se omiten {len(records) - len(keep)} de {len(records)} mosaicos sin datos. Manifiesto: {manifest_path}")
+    return keep
+
+def run_sliced_inference(model: YOLO, input_path: Path, output_path: Path, imgsz: int, conf: float, sliced: dict,
+                         source_path: Path, scale: int, keep: set = None):
+    """
+    Ejecuta la inferencia por mosaicos sobre una ortofoto y guarda un único conjunto global de detecciones.
+
+    Args:
+        model (YOLO): Modelo YOLO cargado.
+        input_path (Path): Ruta a la ortofoto.
+        output_path (Path): Directorio donde se guardará la salida.
+        imgsz (int): Tamaño de imagen de entrada.
+        conf (float): Umbral de confianza.
+        sliced (dict): Sección 'sliced' de la configuración.
+        source_path (Path): Ortofoto o nivel de pirámide a procesar (resolve_sliced_input).
+        scale (int): Factor de reducción de source_path respecto a la ortofoto.
+        keep (set): Celdas a procesar (select_sliced_tiles); por defecto todas.
+    """
+    msg.info(f"Procesando por mosaicos: {input_path}")
+    detections = predict_orthophoto(
+        model,
+        source_path,
+        tile_size=sliced.get('tile_size', 640),
+        overlap=sliced.get('overlap', 0.2),
+        imgsz=imgsz,
+        conf=conf,
+        batch_size=sliced.get('batch_size', 8),
+        match_threshold=sliced.get('match_threshold', 0.5),
+        windowed=sliced.get('windowed', True),
+        keep=keep
+    )
+    if scale != 1:
+        detections = scale_detections(detections, scale)
+    detections_path = output_path / f"{input_path.stem}_detections.json"
+    save_detections(detections, detections_path, model.names)
+    msg.good(f"Se detectaron {len(detections['boxes'])} objetos. Resultados guardados en: {detections_path}")
+
+def run_geojson_export(model: YOLO, input_path: Path, output_path: Path, imgsz: int, conf: float, sliced: dict,
+                       geojson: dict, source_path: Path, scale: int, keep: set = None):
+    """
+    Exporta las máscaras de un modelo de segmentación como polígonos GeoJSON georreferenciados.
+
+    Args:
+        model (YOLO): Modelo YOLO de segmentación cargado.
+        input_path (Path): Ruta a la imagen u ortofoto.
+        output_path (Path): Directorio donde se guardará la salida.
+        imgsz (int): Tamaño de imagen de entrada.
+        conf (float): Umbral de confianza.
+        sliced (dict): Sección 'sliced' de la configuración (rejilla de mosaicos).
+        geojson (dict): Sección 'geojson' de la configuración.
+        source_path (Path): Ortofoto o nivel de pirámide a procesar (resolve_sliced_input).
+        scale (int): Factor de reducción de source_path respecto a la ortofoto.
+        keep (set): Celdas a procesar (select_sliced_tiles); por defecto todas.
+    """
+    msg.info(f"Exportando polígonos de segmentación: {input_path}")
+
+    # En un nivel reducido, la transformación de la ortofoto se escala al tamaño de píxel del nivel
+    transform, georeferenced = geojson.get('transform'), True
+    if scale != 1:
+        transform, _ = load_georeference(input_path, transform, geojson.get('world_file'))
+        georeferenced = transform is not None
+        transform = scaled_transform(transform, scale)
+
+    geojson_path = output_path / f"{input_path.stem}_polygons{geojson.get('suffix', '.geojson')}"
+    stats = export_mask_polygons(
+        model,
+        source_path,
+        geojson_path,
+        tile_size=sliced.get('tile_size', 640),
+        overlap=sliced.get('overlap', 0.2),
+        imgsz=imgsz,
+        conf=conf,
+        batch_size=sliced.get('batch_size', 8),
+        tolerance=geojson.get('tolerance', 1.5),
+        max_vertices=geojson.get('max_vertices', 256),
+        min_area=geojson.get('min_area', 16),
+        transform=transform,
+        world_file=geojson.get('world_file'),
+        crs=geojson.get('crs'),
+        precision=geojson.get('precision'),
+        windowed=sliced.get('windowed', True),
+        keep=keep
+    )
+    if not (stats['georeferenced'] and georeferenced):
+        msg.warn("No se encontró world file ni transformación; las coordenadas están en píxeles.")
+    msg.table(
+        [('Polígonos', stats['features']),
+         ('Vértices (sin simplificar)', stats['raw_vertices']),
+         ('Vértices (simplificados)', stats['vertices']),
+         ('Tamaño (KB)', f"{stats['size_kb']:.1f}")],
+        divider=True
+    )
+    msg.good(f"Polígonos guardados en: {geojson_path}")
+
+def run_streaming_inference(model: YOLO, input_path: Path, output_path: Path, imgsz: int, conf: float, streaming: dict):
+    """
+    Ejecuta la inferencia sobre un video en modo streaming, con memoria constante.
+
+    Args:
+        model (YOLO): Modelo YOLO cargado.
+        input_path (Path): Ruta al video.
+        output_path (Path): Directorio donde se guardará la salida.
+        imgsz (int): Tamaño de imagen de entrada.
+        conf (float): Umbral de confianza.
+        streaming (dict): Sección 'streaming' de la configuración.
+    """
+    msg.info(f"Procesando en streaming: {input_path}")
+
+    if not input_path.exists():
+        msg.fail(f"La ruta de entrada no existe: {input_path}")
+        return
+
+    summary = stream_video_inference(
+        model,
+        input_path,
+        output_path,
+        imgsz=imgsz,
+        conf=conf,
+        chunk_size=streaming.get('chunk_size', 5000),
+        fmt=streaming.get('format', 'csv'),
+        save_video=streaming.get('save_video', True)
+    )
+    msg.good(f"Se procesaron {summary['frames']} frames con {summary['detections']} detecciones. "
+             f"Resultados guardados en: {summary['detections_path']}")
+    if summary['video_path']:
+        msg.good(f"Video anotado guardado en: {summary['video_path']}")
+
+def run_counting(model: YOLO, input_path: Path, output_path: Path, imgsz: int, conf: float, counting: dict):
+    """
+    Cuenta objetos únicos en un video con detección cada N frames y seguimiento entre detecciones.
+
+    Args:
+        model (YOLO): Modelo YOLO cargado.
+        input_path (Path): Ruta al video.
+        output_path (Path): Directorio donde se guardará el resumen.
+        imgsz (int): Tamaño de imagen de entrada.
+        conf (float): Umbral de confianza.
+        counting (dict): Sección 'counting' de la configuración.
+    """
+    msg.info(f"Contando objetos en: {input_path}")
+
+    if not input_path.exists():
+        msg.fail(f"La ruta de entrada no existe: {input_path}")
+        return
+
+    summary = count_video(
+        model,
+        input_path,
+        imgsz=imgsz,
+        conf=conf,
+        detect_every=counting.get('detect_every', 5),
+        redetect_confidence=counting.get('redetect_confidence', 0.5),
+        line_position=counting.get('line_position', 0.5),
+        line_axis=counting.get('line_axis', 'y'),
+        iou_threshold=counting.get('iou_threshold', 0.3),
+        max_age=counting.get('max_age', 30),
+        min_hits=counting.get('min_hits', 2)
+    )
+    output_path.mkdir(parents=True, exist_ok=True)
+    summary_path = output_path / f"{input_path.stem}_counts.json"
+    with open(summary_path, 'w') as file:
+        json.dump(summary, file, indent=2)
+
+    crossings = summary['line_crossings']
+    msg.good(f"{summary['unique_objects']} objetos únicos, {crossings['forward']} + {crossings['backward']} cruces de línea "
+             f"({summary['fps']:.1f} frames/s, detector en {summary['detector_frames']} de {summary['frames']} frames). "
+             f"Resumen guardado en: {summary_path}")
+
+def save_detections_json(path: Path, detections, names: dict):
+    """
+    Guarda las detecciones (N, 6) [x1, y1, x2, y2, conf, cls] de una imagen en JSON.
+
+    Args:
+        path (Path): Ruta del archivo JSON.
+        detections (np.ndarray): Detecciones de la imagen.
+        names (dict): Nombres de clase por índice.
+    """
+    # float64 para que el redondeo no arrastre el error de representación de float32
+    detections = detections.astype(float)
+    classes = detections[:, 5].astype(int).tolist()
+    with open(path, 'w') as file:
+        json.dump({
+            'boxes': detections[:, :4].round(2).tolist(),
+            'scores': detections[:, 4].round(4).tolist(),
+            'classes': classes,
+            'names': [names.get(c, str(c)) for c in classes],
+        }, file)
+
+def run_cached_inference(model: YOLO, model_path: Path, input_path: Path, output_path: Path, imgsz: int,
+                         conf: float, cache_config: dict):
+    """
+    Ejecuta la inferencia sobre imágenes reutilizando los resultados en caché.
+
+    Solo las imágenes nuevas o modificadas (o todas si cambian el modelo, imgsz o conf)
+    llegan al modelo. Como en run_inference, se guarda cada imagen anotada, y además
+    un JSON de detecciones por imagen. La caché solo guarda cajas, por lo que los
+    modelos de segmentación se ejecutan sin caché.
+
+    Args:
+        model (YOLO): Modelo YOLO cargado.
+        model_path (Path): Ruta a los pesos, usada para la huella del modelo.
+        input_path (Path): Imagen o directorio de imágenes.
+        output_path (Path): Directorio donde se guardarán los resultados.
+        imgsz (int): Tamaño de imagen de entrada.
+        conf (float): Umbral de confianza.
+        cache_config (dict): Sección 'cache' de la configuración.
+    """
+    if model.task != 'detect':
+        msg.warn(f"La caché solo guarda cajas; el modelo de tarea '{model.task}' se ejecuta sin caché.")
+        run_inference(model, input_path, output_path, imgsz, conf)
+        return
+
+    # Se importan aquí, igual que YOLO en main, para no cargar torch en el modo cliente
+    import torch
+    from ultralytics.engine.results import Results
+
+    if input_path.is_dir():
+        images = sorted(p for p in input_path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    else:
+        images = [input_path]
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    cache = ResultCache(Path(cache_config.get('path', '.cache/inference')),
+                        int(cache_config.get('max_size_mb', 512) * 1024 * 1024))
+    fingerprint = model_fingerprint(model_path, {'imgsz': imgsz, 'conf': conf})
+    total = 0
+    try:
+        for image_path, detections in predict_with_cache(model, images, cache, fingerprint, imgsz, conf,
+                                                         cache_config.get('batch_size', 16)):
+            save_detections_json(output_path / f"{image_path.stem}.json", detections, model.names)
+            # Los aciertos de caché no pasan por el modelo: la anotación se dibuja desde las cajas
+            annotated = Results(cv2.imread(str(image_path)), str(image_path), model.names,
+                                boxes=torch.from_numpy(detections))
+            annotated.save(filename=str(output_path / image_path.name))
+            total += len(detections)
+    finally:
+        cache.close()
+
+    msg.good(f"Inferencia completada: {len(images)} imágenes, {total} detecciones. "
+             f"Resultados guardados en: {output_path}")
+    msg.info(f"Caché: {cache.hits} aciertos, {cache.misses} fallos")
+
+def run_container_inference(model: YOLO, input_path: Path, output_path: Path, imgsz: int, conf: float,
+                            batch_size: int = 16):
+    """
+    Ejecuta la inferencia sobre un contenedor de shards de mosaicos o frames.
+
+    Las imágenes se leen en orden de escritura con lecturas secuenciales de los
+    shards y se envían al modelo en lotes ya decodificados. Se guarda un JSON de
+    detecciones por registro, igual que con un directorio de imágenes.
+
+    Args:
+        model (YOLO): Modelo YOLO cargado.
+        input_path (Path): Directorio del contenedor.
+        output_path (Path): Directorio donde se guardarán los resultados.
+        imgsz (int): Tamaño de imagen de entrada.
+        conf (float): Umbral de confianza.
+        batch_size (int): Imágenes por llamada a model.predict.
+    """
+    reader = ShardReader(input_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+    msg.info(f"Procesando contenedor de shards: {input_path} ({len(reader)} imágenes)")
+
+    total = 0
+    pending = []
+
+    def flush():
+        results = model.predict(source=[image for _, image in pending], imgsz=imgsz, conf=conf, verbose=False)
+        for (record, _), result in zip(pending, results):
+            detections = result_to_array(result)
+            save_detections_json(output_path / f"{Path(record['name']).stem}.json", detections, model.names)
+            yield len(detections)
+        pending.clear()
+
+    for record, image in reader.iter_images():
+        pending.append((record, image))
+        if len(pending) >= batch_size:
+            total += sum(flush())
+    if pending:
+        total += sum(flush())
+
+    msg.good(f"Inferencia completada: {len(reader)} imágenes, {total} detecciones. "
+             f"Resultados guardados en: {output_path}")
+
+def run_backend_inference(model_path: Path, input_path: Path, output_path: Path, imgsz: int, conf: float,
+                          backend_config: dict):
+    """
+    Ejecuta la inferencia sobre imágenes con un backend de CPU (pt, onnx, openvino o tflite).
+
+    Todos los backends comparten el mismo preprocesamiento y la misma NMS, por lo que
+    la misma configuración sirve para comparar el .pt con sus exportaciones. Las
+    imágenes que no se pueden leer se omiten con una advertencia.
+
+    Args:
+        model_path (Path): Ruta a los pesos .pt de la configuración.
+        input_path (Path): Imagen, directorio de imágenes o contenedor de shards.
+        output_path (Path): Directorio donde se guardarán los resultados.
+        imgsz (int): Tamaño de imagen de entrada.
+        conf (float): Umbral de confianza.
+        backend_config (dict): Sección 'backend' de la configuración.
+    """
+    if is_container(input_path):
+        reader = ShardReader(input_path)
+        names = [Path(name).stem for name in reader.names]
+        load_image = reader.read_image
+    else:
+        if input_path.is_dir():
+            images = sorted(p for p in input_path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        else:
+            images = [input_path]
+        names = [image_path.stem for image_path in images]
+
+        def load_image(i: int):
+            return cv2.imread(str(images[i]))
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    backend = load_backend(model_path, backend_config, imgsz)
+    msg.info(f"Backend '{backend_config.get('type', 'pt')}' cargado desde: {backend.model_path}")
+
+    total = skipped = 0
+    batch_size = max(backend.batch_size, 1)
+    for start in range(0, len(names), batch_size):
+        chunk, frames = [], []
+        for i in range(start, min(start + batch_size, len(names))):
+            frame = load_image(i)
+            if frame is None:
+                msg.warn(f"No se pudo leer la imagen, se omite: {names[i]}")
+                skipped += 1
+                continue
+            chunk.append(i)
+            frames.append(frame)
+        if not frames:
+            continue
+        for i, detections in zip(chunk, backend.predict(frames, conf, backend_config.get('iou', 0.7))):
+            save_detections_json(output_path / f"{names[i]}.json", detections, backend.names)
+            total += len(detections)
+
+    msg.good(f"Inferencia completada: {len(names) - skipped} imágenes ({skipped} omitidas), {total} detecciones. "
+             f"Resultados guardados en: {output_path}")
+
+def run_client_inference(client: InferenceClient, model_name: str, input_path: Path, output_path: Path,
+                         workers: int = 8):
+    """
+    Envía las imágenes al servidor de inferencia y guarda un JSON de detecciones por imagen.
+
+    Las solicitudes se envían en paralelo para que el servidor las agrupe en micro-lotes.
+
+    Args:
+        client (InferenceClient): Cliente del servidor.
+        model_name (str): Nombre del modelo en el servidor.
+        input_path (Path): Imagen o directorio de imágenes.
+        output_path (Path): Directorio donde se guardarán los resultados.
+        workers (int): Solicitudes concurrentes.
+    """
+    if input_path.is_dir():
+        images = sorted(p for p in input_path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    else:
+        images = [input_path]
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    def predict(image_path: Path) -> int:
+        detections = client.predict(model_name, image_path)
+        with open(output_path / f"{image_path.stem}.json", 'w') as file:
+            json.dump(detections, file)
+        return len(detections['boxes'])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        total = sum(executor.map(predict, images))
+    msg.good(f"Inferencia remota completada: {len(images)} imágenes, {total} detecciones. "
+             f"Resultados guardados en: {output_path}")
+
+def get_server_client(config_path: str, config: dict, input_path: Path) -> InferenceClient | None:
+    """
+    Devuelve un cliente si server.enabled está activo y hay un servidor en ejecución que sirva
+    el modelo de esta configuración.
+
+    El uso del servidor es opcional porque cambia la salida: se guarda un JSON de detecciones
+    por imagen en lugar de las imágenes anotadas de run_inference. Solo las imágenes se envían
+    al servidor; videos, ortofotos por mosaicos y contenedores de shards se procesan localmente.
+
+    Args:
+        config_path (str): Ruta al archivo de configuración (su nombre identifica al modelo).
+        config (dict): Configuración de inferencia.
+        input_path (Path): Ruta de entrada.
+
+    Returns:
+        InferenceClient | None: Cliente conectado o None.
+    """
+    server = config.get('server', {})
+    if not server.get('enabled', False) or config.get('sliced', {}).get('enabled', False):
+        return None
+    if is_container(input_path) or not (input_path.is_dir() or input_path.suffix.lower() in IMAGE_EXTENSIONS):
+        return None
+
+    client = InferenceClient(server.get('url', 'http://127.0.0.1:8765'), server.get('socket'))
+    if not client.is_available() or Path(config_path).stem not in client.models():
+        return None
+    return client
+
+def main(config_path: str = "config/inference_config.yaml", local: bool = False):
     """
     Función principal para cargar la configuración y ejecutar la inferencia.
 
     Args:
         config_path (str): Ruta al archivo de configuración.
+        local (bool): Ignora el servidor de inferencia aunque esté en ejecución.
     """
     config = load_config(config_path)
 
@@ -76,10 +560,50 @@ def main(config_path: str = "config/inference_config.yaml"):
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
+    client = None if local else get_server_client(config_path, config, input_path)
+    if client is not None:
+        msg.info(f"Enviando a servidor de inferencia: {input_path}")
+        run_client_inference(client, Path(config_path).stem, input_path, output_path)
+        return
+
+    backend = config.get('backend', {})
+    if backend.get('enabled', False) and (input_path.is_dir() or input_path.suffix.lower() in IMAGE_EXTENSIONS):
+        run_backend_inference(model_path, input_path, output_path, imgsz, conf, backend)
+        return
+
+    # Se importa aquí para que el modo cliente no pague el costo de cargar torch
+    from ultralytics import YOLO
+
     msg.info(f"Cargando el modelo desde: {model_path}")
     model = YOLO(str(model_path))
 
-    run_inference(model, input_path, output_path, imgsz, conf)
+    sliced = config.get('sliced', {})
+    streaming = config.get('streaming', {})
+    counting = config.get('counting', {})
+    cache = config.get('cache', {})
+    geojson = config.get('geojson', {})
+    if geojson.get('enabled', False) or sliced.get('enabled', False):
+        if not input_path.exists():
+            msg.fail(f"La ruta de entrada no existe: {input_path}")
+            return
+        # El nivel de pirámide y los mosaicos omitidos se resuelven una vez para ambas salidas
+        source_path, scale = resolve_sliced_input(input_path, sliced)
+        keep = select_sliced_tiles(source_path, output_path, sliced, input_path.stem)
+        if geojson.get('enabled', False):
+            run_geojson_export(model, input_path, output_path, imgsz, conf, sliced, geojson, source_path, scale, keep)
+        if sliced.get('enabled', False):
+            run_sliced_inference(model, input_path, output_path, imgsz, conf, sliced, source_path, scale, keep)
+    elif counting.get('enabled', False):
+        run_counting(model, input_path, output_path, imgsz, conf, counting)
+    elif streaming.get('enabled', False):
+        run_streaming_inference(model, input_path, output_path, imgsz, conf, streaming)
+    elif is_container(input_path):
+        run_container_inference(model, input_path, output_path, imgsz, conf,
+                                config['inference'].get('batch_size', 16))
+    elif cache.get('enabled', False) and (input_path.is_dir() or input_path.suffix.lower() in IMAGE_EXTENSIONS):
+        run_cached_inference(model, model_path, input_path, output_path, imgsz, conf, cache)
+    else:
+        run_inference(model, input_path, output_path, imgsz, conf)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Ejecuta inferencia con un modelo YOLOv8 en imágenes o videos.")
@@ -89,6 +613,11 @@ if __name__ == '__main__':
         default='config/inference_config.yaml',
         help='Ruta al archivo de configuración'
     )
+    parser.add_argument(
+        '--local',
+        action='store_true',
+        help='Ejecuta la inferencia localmente aunque haya un servidor de inferencia en ejecución'
+    )
     args = parser.parse_args()
-    main(args.config)
+    main(args.config, args.local)
 
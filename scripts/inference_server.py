@@ -0,0 +1,106 @@
+"""
+Servidor de inferencia local que mantiene los modelos YOLO cargados.
+
+Carga los modelos de las configuraciones de inferencia listadas en
+config/inference_server.yaml, agrupa las solicitudes concurrentes en micro-lotes
+y responde con las detecciones en JSON. Expone la profundidad de la cola y los
+percentiles de latencia en /stats. scripts/inference.py lo usa cuando la
+configuración de inferencia activa server.enabled y el servidor está en
+ejecución; en ese caso guarda un JSON por imagen en lugar de imágenes anotadas.
+"""
+import sys
+from pathlib import Path
+import yaml
+import argparse
+from ultralytics import YOLO
+from wasabi import msg
+
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(root_dir))
+
+from src.inference.server import MicroBatcher, create_server
+
+def load_config(config_path: str) -> dict:
+    """
+    Carga una configuración desde un archivo YAML.
+
+    Args:
+        config_path (str): Ruta al archivo de configuración.
+
+    Returns:
+        dict: Datos de configuración.
+    """
+    with open(config_path, 'r') as file:
+        return yaml.safe_load(file)
+
+def load_batchers(config: dict) -> dict:
+    """
+    Carga y precalienta un MicroBatcher por cada configuración de inferencia.
+
+    Args:
+        config (dict): Configuración del servidor.
+
+    Returns:
+        dict: MicroBatcher por nombre de modelo.
+    """
+    batching = config.get('batching', {})
+    batchers = {}
+    for inference_config_path in config['models']:
+        inference_config = load_config(inference_config_path)
+        model_path = Path(inference_config['model']['path'])
+        if not model_path.exists():
+            msg.warn(f"No se encontró el modelo en: {model_path}. Se omite.")
+            continue
+
+        name = Path(inference_config_path).stem
+        msg.info(f"Cargando '{name}' desde: {model_path}")
+        batcher = MicroBatcher(
+            YOLO(str(model_path)),
+            imgsz=inference_config['inference']['imgsz'],
+            conf=inference_config['inference']['conf'],
+            max_batch_size=batching.get('max_batch_size', 8),
+            max_wait_ms=batching.get('max_wait_ms', 10)
+        )
+        batcher.warmup()
+        batchers[name] = batcher
+    return batchers
+
+def main(config_path: str = "config/inference_server.yaml"):
+    """
+    Función principal para cargar los modelos y atender solicitudes.
+
+    Args:
+        config_path (str): Ruta al archivo de configuración del servidor.
+    """
+    config = load_config(config_path)
+    batchers = load_batchers(config)
+    if not batchers:
+        msg.fail("No se cargó ningún modelo.")
+        return
+
+    server_config = config.get('server', {})
+    socket_path = server_config.get('socket')
+    if socket_path:
+        Path(socket_path).unlink(missing_ok=True)
+    server = create_server(batchers, server_config.get('host', '127.0.0.1'), server_config.get('port', 8765),
+                           socket_path)
+
+    address = socket_path or f"http://{server_config.get('host', '127.0.0.1')}:{server_config.get('port', 8765)}"
+    msg.good(f"Servidor de inferencia escuchando en {address} con modelos: {', '.join(sorted(batchers))}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        msg.info("Deteniendo el servidor.")
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor de inferencia local con micro-lotes.")
+    parser.add_argument(
+        '--config',
+        type=str,
+        default='config/inference_server.yaml',
+        help='Ruta al archivo de configuración del servidor'
+    )
+    args = parser.parse_args()
+    main(args.config)
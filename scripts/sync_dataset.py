@@ -2,11 +2,11 @@
     
     The datasets are downloaded to datasets/.. directory.
     The .env should contain the ROBOFLOW_API_KEY.
+    A local directory or zip archives can be used instead of Roboflow with the 'source' section.
 """
 
+import argparse
 from pathlib import Path
-from roboflow import Roboflow
-from roboflow.adapters.rfapi import RoboflowError
 from wasabi import msg
 import yaml
 
@@ -17,6 +17,9 @@ root_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(root_dir))
 
 from config import ROBOFLOW_API_KEY
+from src.data_processing.dataset_sources import create_source
+from src.data_processing.dataset_sync import sync_datasets
+from src.data_processing.label_index import index_dataset
 
 def load_config(config_path: str = "/config/datasets_sync.yaml") -> dict:
     """
@@ -35,39 +38,18 @@ def load_config(config_path: str = "/config/datasets_sync.yaml") -> dict:
         msg.fail(f"Configuration file should be placed at 'config/datasets_sync.yaml'.")
         raise SystemExit
 
-def sync_dataset(rf: Roboflow, dataset_config: dict) -> None:
+def postprocess_dataset(dataset_path: Path) -> None:
     """
-    Synchronize a single dataset from Roboflow.
+    Update data.yaml and the label index after a dataset was downloaded or repaired.
 
     Args:
-        rf (Roboflow): Roboflow instance.
-        dataset_config (dict): Configuration for the dataset.
-
+        dataset_path (Path): Path to the dataset directory.
     """
-    workspace_name = dataset_config['workspace']
-    project_name = dataset_config['project']
-    dataset_version = dataset_config['version']
-    dataset_format = dataset_config['format']
-    dataset_dir = dataset_config['output_dir']
-
-    dataset_path = Path(dataset_dir)
-    
-    #TODO: Validate that labels and images are present in the dataset
-    if dataset_path.exists():
-        msg.info(f"Dataset already exists in '{dataset_path}'. Skipping download.")
-    else:
-        msg.info(f"Downloading dataset {project_name} from {workspace_name}...")
-        try:
-            project = rf.workspace(workspace_name).project(project_name)
-            version = project.version(dataset_version)
-            version.download(dataset_format, location=str(dataset_path))
-            msg.good(f"Dataset downloaded to '{dataset_path}'.")
-        except RoboflowError as e:
-            msg.fail(f"Error accessing Roboflow for {project_name}: {e}")
-            return
-
     update_data_yaml(dataset_path)
 
+    # Validate that labels and images are present (only changed label files are re-read)
+    index_dataset(dataset_path, verbose=False)
+
 def update_data_yaml(dataset_path: Path) -> None:
     """
     Update data.yaml file with absolute paths.
@@ -93,19 +75,46 @@ def update_data_yaml(dataset_path: Path) -> None:
     
     msg.good(f"data.yaml updated with absolute paths for {dataset_path.name}.")
 
-def main(config_path: str = "config/datasets_sync.yaml"):
+def main(config_path: str = "config/datasets_sync.yaml", workers: int = None, verify: bool = False):
     """
     Main function to synchronize all datasets specified in the config file.
 
+    Datasets are synchronized concurrently with a bounded number of workers.
+
     Args:
         config_path (str): Path to the configuration file.
+        workers (int): Datasets synchronized at the same time (defaults to the config's 'workers').
+        verify (bool): Verify file checksums, not only sizes.
     """
     config = load_config(config_path)
-    api_key = ROBOFLOW_API_KEY
-    rf = Roboflow(api_key=api_key)
+    source = create_source(config.get('source', {}), ROBOFLOW_API_KEY)
+    workers = workers or config.get('workers', 4)
 
-    for dataset in config['datasets']:
-        sync_dataset(rf, dataset)
+    results = sync_datasets(source, config['datasets'], workers, verify, postprocess_dataset, log=msg.info)
+    for output_dir, status in results.items():
+        if status.startswith('error'):
+            msg.fail(f"{output_dir}: {status}")
+        else:
+            msg.good(f"{output_dir}: {status.replace('_', ' ')}")
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Synchronize the datasets listed in datasets_sync.yaml.")
+    parser.add_argument(
+        '--config',
+        type=str,
+        default='config/datasets_sync.yaml',
+        help='Path to the datasets sync configuration YAML file.'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Datasets synchronized at the same time.'
+    )
+    parser.add_argument(
+        '--verify',
+        action='store_true',
+        help='Verify SHA-256 checksums of every file, not only sizes.'
+    )
+    args = parser.parse_args()
+    main(args.config, args.workers, args.verify)
@@ -1,141 +1,271 @@
-import os
-import sys
-import torch
-
-# Antes de importar Ultralytics, sobrescribe settings
-from ultralytics import settings
+"""
+Pipeline de sincronización, entrenamiento y exportación para varios datasets.
 
-# Sobrescribir datasets_dir
-settings.datasets_dir = os.path.abspath('datasets')
+Construye un grafo con un paso sync por dataset y pasos train y export por cada
+job de config/pipeline_config.yaml. Cada paso se omite si su huella de entrada
+no cambió desde la última ejecución correcta, y los pasos independientes se
+ejecutan en paralelo dentro de los límites de CPU y memoria.
+"""
 
+import argparse
+import hashlib
 import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
 import yaml
-from roboflow import Roboflow
-from ultralytics import YOLO
-from dotenv import load_dotenv
+from wasabi import msg
 
-load_dotenv()
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(root_dir))
 
-def download_dataset(api_key, workspace_name, project_name, dataset_version, dataset_format, dataset_dir):
-    if os.path.exists(dataset_dir):
-        print(f"El dataset ya existe en '{dataset_dir}'. No se descargará nuevamente.")
-    else:
-        print("Descargando el dataset desde Roboflow...")
-        rf = Roboflow(api_key=api_key)
-        project = rf.workspace(workspace_name).project(project_name)
-        version = project.version(dataset_version)
-        version.download(dataset_format, location=dataset_dir)
-        print(f"Dataset descargado en '{dataset_dir}'.")
-    
-    # Ajustar las rutas en data.yaml
-    data_yaml_path = os.path.join(dataset_dir, 'data.yaml')
-    with open(data_yaml_path, 'r') as f:
-        data_yaml = yaml.safe_load(f)
-    
-    # Obtener rutas absolutas
-    dataset_abs_path = os.path.abspath(dataset_dir)
-    data_yaml['train'] = os.path.join(dataset_abs_path, 'train', 'images').replace('\\', '/')
-    data_yaml['val'] = os.path.join(dataset_abs_path, 'valid', 'images').replace('\\', '/')
-    data_yaml['test'] = os.path.join(dataset_abs_path, 'test', 'images').replace('\\', '/')
-    
-    # Guardar los cambios
-    with open(data_yaml_path, 'w') as f:
-        yaml.dump(data_yaml, f)
-    
-    print("Archivo data.yaml actualizado con rutas absolutas.")
-
-def train_model(data_yaml, model_output_dir, epochs=50, batch_size=16, imgsz=640):
-    model_path = os.path.join(model_output_dir, 'best.pt')
-    if os.path.exists(model_path):
-        print(f"El modelo ya ha sido entrenado y se encuentra en '{model_path}'. No se reentrenará.")
-    else:
-        print("Entrenando el modelo con YOLOv8...")
+from config import ROBOFLOW_API_KEY
+from src.data_processing.dataset_sources import create_source
+from src.data_processing.dataset_sync import MANIFEST_FILE, sync_one
+from src.data_processing.dataset_utils import manifest_digest
+from src.training.pipeline import Step, run_pipeline
+from src.training.runs import PRETRAINED_MODELS, run_fingerprint
+
+# Script de entrenamiento por tarea
+TRAIN_SCRIPTS = {
+    'detect': 'train_model',
+    'segment': 'train_segmentation',
+}
+
+DEFAULT_RESOURCES = {
+    'sync': {'cpus': 1, 'memory_gb': 0.5},
+    'train': {'cpus': 8, 'memory_gb': 8},
+    'export': {'cpus': 2, 'memory_gb': 4},
+}
+
+def load_config(config_path: str) -> dict:
+    """
+    Carga un archivo YAML.
+
+    Args:
+        config_path (str): Ruta al archivo.
+
+    Returns:
+        dict: Contenido del archivo.
+    """
+    with open(config_path, 'r') as file:
+        return yaml.safe_load(file)
+
+def file_checksum(path: Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def run_script(script: str, config: dict, cache_dir: Path, step_name: str, args: list = ()):
+    """
+    Ejecuta un script del repositorio en un proceso aparte con una configuración resuelta.
+
+    Args:
+        script (str): Nombre del módulo en scripts/ (p. ej. 'train_model').
+        config (dict): Configuración que se escribe en <cache_dir>/configs.
+        cache_dir (Path): Directorio del pipeline.
+        step_name (str): Nombre del paso, usado para la configuración y el log.
+        args (list): Argumentos adicionales del script.
+    """
+    safe_name = step_name.replace(':', '_')
+    config_path = cache_dir / 'configs' / f"{safe_name}.yaml"
+    log_path = cache_dir / 'logs' / f"{safe_name}.log"
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(config_path, 'w') as file:
+        yaml.safe_dump(config, file)
+
+    command = [sys.executable, str(root_dir / 'scripts' / f"{script}.py"), '--config', str(config_path), *args]
+    with open(log_path, 'w') as log_file:
+        result = subprocess.run(command, cwd=root_dir, stdout=log_file, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        raise RuntimeError(f"{script}.py terminó con código {result.returncode}, ver {log_path}")
+
+def job_configs(job: dict) -> tuple:
+    """
+    Configuraciones de entrenamiento y exportación de un job.
+
+    Las rutas del modelo y del dataset se completan a partir de 'name' y 'dataset'.
+
+    Args:
+        job (dict): Entrada 'jobs' de pipeline_config.yaml.
+
+    Returns:
+        tuple: (configuración de entrenamiento, configuración de exportación).
+    """
+    model_dir = Path(job.get('output_dir', Path('models') / job['name']))
+    data_yaml = Path(job['dataset']) / 'data.yaml'
+
+    training = load_config(job['training_config'])
+    training['model'] = {'name': job['name'], 'data_yaml': str(data_yaml), 'output_dir': str(model_dir)}
+    training['training'].update(job.get('training', {}))
+
+    export = load_config(job['export_config'])
+    export['model'] = {'input_path': str(model_dir / 'best.pt'), 'export_dir': str(model_dir)}
+    export['export'].update(job.get('export', {}))
+    if 'int8' in export:
+        export['int8']['data_yaml'] = str(data_yaml)
+    # El benchmark se ejecuta a mano con export_model.py --benchmark, no en el pipeline
+    export.pop('benchmark', None)
+    return training, export
 
-        # Verificar si hay GPU disponible y registrar el dispositivo
-        if torch.cuda.is_available():
-            device = 'cuda'
-            print("Entrenando en GPU.")
+def build_steps(config: dict, cache_dir: Path, jobs: list = None) -> list:
+    """
+    Construye el grafo sync -> train -> export de los jobs del pipeline.
+
+    Args:
+        config (dict): Contenido de pipeline_config.yaml.
+        cache_dir (Path): Directorio del pipeline.
+        jobs (list): Nombres de los jobs a incluir; por defecto todos.
+
+    Returns:
+        list: Pasos del pipeline.
+    """
+    datasets_config = load_config(config['datasets_config'])
+    datasets = {str(Path(d['output_dir'])): d for d in datasets_config['datasets']}
+    resources = {kind: {**DEFAULT_RESOURCES[kind], **config.get('resources', {}).get(kind, {})}
+                 for kind in DEFAULT_RESOURCES}
+    source = None
+
+    steps = {}
+    for job in config['jobs']:
+        if jobs and job['name'] not in jobs:
+            continue
+        dataset_dir = Path(job['dataset'])
+        training, export = job_configs(job)
+        data_yaml = Path(training['model']['data_yaml'])
+        model_dir = Path(training['model']['output_dir'])
+
+        # Un solo paso sync por dataset aunque lo usen varios jobs
+        sync_name = f"sync:{dataset_dir.name}"
+        dataset_config = datasets.get(str(dataset_dir))
+        if dataset_config is None:
+            msg.warn(f"{dataset_dir} is not in {config['datasets_config']}; using the local copy.")
+            deps = []
         else:
-            device = 'cpu'
-            print("Entrenando en CPU.")
-
-        # Cargar el modelo y asignar el dispositivo
-        model = YOLO('yolov8n.pt')
-
-        # Asignar el dispositivo al modelo (opcional, Ultralytics lo maneja automáticamente)
-        # model.to(device)
-
-        # Especificar un nombre fijo para el entrenamiento
-        run_name = 'custom_train'
-
-        # Eliminar el directorio de entrenamiento previo si existe (opcional)
-        run_dir = os.path.join('runs', 'detect', run_name)
-        if os.path.exists(run_dir):
-            shutil.rmtree(run_dir)
-
-        # Iniciar el entrenamiento y pasar el dispositivo
-        model.train(
-            data=data_yaml,
-            epochs=epochs,
-            batch=batch_size,
-            imgsz=imgsz,
-            device=device,
-            name=run_name
+            if source is None:
+                source = create_source(datasets_config.get('source', {}), ROBOFLOW_API_KEY)
+            if sync_name not in steps:
+                from scripts.sync_dataset import postprocess_dataset
+
+                steps[sync_name] = Step(
+                    sync_name,
+                    run=lambda dataset_config=dataset_config: sync_one(
+                        source, dataset_config, postprocess=postprocess_dataset, log=msg.info),
+                    fingerprint=lambda dataset_config=dataset_config, data_yaml=data_yaml: {
+                        'source': source.key(dataset_config),
+                        'files': manifest_digest(data_yaml) if data_yaml.exists() else None,
+                    },
+                    outputs=[dataset_dir / MANIFEST_FILE, data_yaml],
+                    **resources['sync']
+                )
+            deps = [sync_name]
+
+        task = job.get('task', 'detect')
+        script = TRAIN_SCRIPTS[task]
+        train_name = f"train:{job['name']}"
+
+        def train_fingerprint(script=script, training=training, pretrained=PRETRAINED_MODELS[task]):
+            return {'script': script, 'run': run_fingerprint(training, pretrained)['digest']}
+
+        steps[train_name] = Step(
+            train_name,
+            run=lambda script=script, training=training, train_name=train_name: run_script(
+                script, training, cache_dir, train_name),
+            fingerprint=train_fingerprint,
+            outputs=[model_dir / 'best.pt'],
+            deps=deps,
+            **{**resources['train'], **job.get('resources', {}).get('train', {})}
         )
 
-        # Mueve el modelo entrenado a la carpeta de salida
-        os.makedirs(model_output_dir, exist_ok=True)
-        src_model_path = os.path.join('runs', 'detect', run_name, 'weights', 'best.pt')
-        if os.path.exists(src_model_path):
-            shutil.copy(src_model_path, model_path)
-            print(f"Modelo entrenado y guardado en '{model_path}'.")
-        else:
-            print(f"No se encontró el archivo '{src_model_path}'. Asegúrate de que el entrenamiento se completó correctamente.")
+        export_name = f"export:{job['name']}"
+        saved_model_dir = model_dir / 'best_saved_model'
 
+        def export_run(export=export, export_name=export_name, saved_model_dir=saved_model_dir):
+            # export_model.py omite la exportación si ya existe, y aquí best.pt o la config cambiaron
+            shutil.rmtree(saved_model_dir, ignore_errors=True)
+            run_script('export_model', export, cache_dir, export_name)
 
-def export_model_to_tflite(model_input_path, export_dir):
-    tflite_model_path = os.path.join(export_dir, 'model.tflite')
-    if os.path.exists(tflite_model_path):
-        print(f"El modelo ya ha sido exportado a TFLite en '{tflite_model_path}'. No se volverá a exportar.")
-    else:
-        print("Exportando el modelo a formato TFLite...")
-        model = YOLO(model_input_path)
-        model.export(format='tflite', imgsz=640)
-        # Mueve el modelo exportado a la carpeta de exportación
-        os.makedirs(export_dir, exist_ok=True)
-        src_tflite_path = os.path.join('runs', 'detect', 'custom_train', 'weights', 'best-fp16.tflite')
-        if os.path.exists(src_tflite_path):
-            shutil.move(src_tflite_path, tflite_model_path)
-            print(f"Modelo exportado a TFLite y guardado en '{tflite_model_path}'.")
-        else:
-            print(f"No se encontró el archivo '{src_tflite_path}'. Asegúrate de que la exportación se completó correctamente.")
+        steps[export_name] = Step(
+            export_name,
+            run=export_run,
+            fingerprint=lambda export=export, model_dir=model_dir: {
+                'config': export,
+                'model': file_checksum(model_dir / 'best.pt'),
+            },
+            outputs=[saved_model_dir / 'best_float32.tflite'],
+            deps=[train_name],
+            **{**resources['export'], **job.get('resources', {}).get('export', {})}
+        )
+    return list(steps.values())
+
+def print_summary(results: list, wall_time: float):
+    """
+    Muestra el estado y el tiempo de cada paso.
+
+    Args:
+        results (list): Resultados de run_pipeline.
+        wall_time (float): Duración total del pipeline en segundos.
+    """
+    rows = [(r['step'], r['status'], f"{r['seconds']:.1f}", r['error'] or '') for r in results]
+    msg.table(rows, header=('Step', 'Status', 'Seconds', 'Error'), divider=True)
+
+    totals = {}
+    for r in results:
+        kind = r['step'].split(':')[0]
+        totals[kind] = totals.get(kind, 0.0) + r['seconds']
+    summary = ', '.join(f"{kind} {seconds:.1f} s" for kind, seconds in totals.items())
+    msg.info(f"Wall time {wall_time:.1f} s (step time: {summary}).")
 
-def main():
-    # Configuración
-    api_key = os.getenv('ROBOFLOW_API_KEY')
-    if api_key:
-        print(f"RF api key: {api_key[:4]}")
+    failed = [r['step'] for r in results if r['status'] in ('failed', 'skipped')]
+    if failed:
+        msg.fail(f"{len(failed)} steps did not complete: {', '.join(failed)}")
     else:
-        raise ValueError(f"not api key readed from roboflow")
-    workspace_name = 'psa01'
-    project_name = 'merma_in_situ'
-    dataset_version = 1
-    dataset_format = 'yolov8'
-    dataset_dir = os.path.join('datasets', 'merma_in_situ')
-    data_yaml = os.path.join(dataset_dir, 'data.yaml')
-    model_output_dir = os.path.join('models', 'merma_in_situ_v1')
-    export_dir = model_output_dir
-
-    # Descarga del dataset
-    download_dataset(api_key, workspace_name, project_name, dataset_version, dataset_format, dataset_dir)
-
-    # Entrenamiento del modelo
-    train_model(data_yaml, model_output_dir, epochs=50, batch_size=16, imgsz=640)
-
-    # Exportación del modelo a TFLite
-    model_input_path = os.path.join(model_output_dir, 'best.pt')
-    export_model_to_tflite(model_input_path, export_dir)
+        msg.good("Pipeline completed.")
 
-if __name__ == '__main__':
-    main()
+def main(config_path: str = "config/pipeline_config.yaml", jobs: list = None, force: list = ()):
+    """
+    Ejecuta el pipeline de sync, entrenamiento y exportación.
+
+    Args:
+        config_path (str): Ruta a pipeline_config.yaml.
+        jobs (list): Nombres de los jobs a ejecutar; por defecto todos.
+        force (list): Pasos o prefijos a ejecutar aunque no hayan cambiado (p. ej. 'export:').
+    """
+    config = load_config(config_path)
+    cache_dir = Path(config.get('cache_dir', '.cache/pipeline'))
+    limits = config.get('limits', {})
 
+    steps = build_steps(config, cache_dir, jobs)
+    start = time.perf_counter()
+    results = run_pipeline(
+        steps,
+        cache_dir,
+        max_cpus=limits.get('max_cpus'),
+        max_memory_gb=limits.get('max_memory_gb'),
+        force=force,
+        log=msg.info
+    )
+    print_summary(results, time.perf_counter() - start)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sync, train and export every dataset of the pipeline config.")
+    parser.add_argument(
+        '--config',
+        type=str,
+        default='config/pipeline_config.yaml',
+        help='Path to the pipeline configuration YAML file.'
+    )
+    parser.add_argument(
+        '--jobs',
+        nargs='*',
+        default=None,
+        help='Names of the jobs to run (default: all).'
+    )
+    parser.add_argument(
+        '--force',
+        nargs='*',
+        default=[],
+        help="Steps or step prefixes to run even if unchanged, e.g. 'export:' or 'train:jima_in_situ'."
+    )
+    args = parser.parse_args()
+    main(args.config, args.jobs, args.force)
@@ -6,7 +6,6 @@ import sys
 from pathlib import Path
 import torch
 import shutil
-from ultralytics import YOLO
 from wasabi import msg
 import yaml
 import argparse  # Import argparse
@@ -14,6 +13,13 @@ import argparse  # Import argparse
 root_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(root_dir))
 
+from src.training.runs import PRETRAINED_MODELS, read_fingerprint, run_fingerprint, train_run, write_fingerprint
+from src.training.shard_trainer import make_shard_trainer
+from src.data_processing.tile_shards import dataset_uses_containers
+
+# Pre-trained weights should be downloaded in root
+PRETRAINED_MODEL = PRETRAINED_MODELS['detect']
+
 def load_config(config_path: str = "config/training_config.yaml") -> dict:
     """
     Load the training configuration from a YAML file.
@@ -34,13 +40,13 @@ def train_model(config: dict):
     Args:
         config (dict): Training configuration.
     """
-    model_name = config['model']['name']
-    data_yaml = config['model']['data_yaml']
     model_output_dir = Path(config['model']['output_dir'])
     model_path = model_output_dir / 'best.pt'
 
-    if model_path.exists():
-        msg.info(f"Model already trained and exists at '{model_path}'. Skipping training.")
+    # Skip only if the exported model was trained with the current config and dataset
+    fingerprint = run_fingerprint(config, PRETRAINED_MODEL)
+    if model_path.exists() and read_fingerprint(model_output_dir).get('digest') == fingerprint['digest']:
+        msg.info(f"Model already trained with this config and dataset at '{model_path}'. Skipping training.")
         return
 
     msg.info("Training YOLOv8 model...")
@@ -62,32 +68,29 @@ def train_model(config: dict):
     # TODO: Verify that training on MPS works as expected
     msg.info(f"Training on {device.upper()}.")
 
-    # Load the YOLOv8 model (pre-trained weights should be downloaded in root)
-    model = YOLO('yolov8n.pt')
-
-    # Specify a fixed name for the training run
-    run_name = f'{model_name}_train'
-
-    # Remove previous training directory if it exists
-    run_dir = Path('runs') / 'detect' / run_name
-    if run_dir.exists():
-        shutil.rmtree(run_dir)
-
-    # Start the training
-    model.train(
-        data=data_yaml,
-        epochs=config['training']['epochs'],
-        batch=config['training']['batch_size'],
-        imgsz=config['training']['imgsz'],
-        device=device,  # Here we pass the dynamically selected device
-        name=run_name
-    )
+    # Resume an interrupted run with the same fingerprint, or start a new versioned run
+    # Read pre-decoded images from memory-mapped shards instead of decoding JPEGs every epoch,
+    # and splits stored as tile-shard containers directly from the container
+    trainer = None
+    dataset_cache = config.get('dataset_cache', {})
+    if dataset_cache.get('enabled', False) or dataset_uses_containers(Path(config['model']['data_yaml'])):
+        from ultralytics.models.yolo.detect import DetectionTrainer as BaseTrainer
+        trainer = make_shard_trainer(
+            BaseTrainer,
+            Path(dataset_cache.get('dir', '.cache/shards')) if dataset_cache.get('enabled', False) else None,
+            shard_size=dataset_cache.get('shard_size', 1024),
+            workers=dataset_cache.get('workers', 8),
+            log=msg.info
+        )
+
+    run_dir = train_run(config, PRETRAINED_MODEL, fingerprint, Path('runs') / 'detect', device, trainer, log=msg.info)
 
     # Move the trained model to the output directory
     model_output_dir.mkdir(parents=True, exist_ok=True)
     src_model_path = run_dir / 'weights' / 'best.pt'
     if src_model_path.exists():
         shutil.copy(src_model_path, model_path)
+        write_fingerprint(model_output_dir, fingerprint, run_dir=str(run_dir))
         msg.good(f"Trained model saved to '{model_path}'.")
     else:
         msg.fail(f"Model file not found at '{src_model_path}'. Check if training completed successfully.")
@@ -0,0 +1,115 @@
+import shutil
+import zipfile
+from pathlib import Path
+
+class DatasetSource:
+    """
+    Interfaz de los orígenes de datasets usados por la sincronización.
+
+    fetch materializa el dataset completo en un directorio de staging y
+    fetch_files solo los archivos indicados; los orígenes que no pueden
+    descargar archivos sueltos usan fetch como respaldo.
+    """
+
+    def key(self, dataset_config: dict) -> dict:
+        """Identifica la versión del dataset; si cambia, el manifiesto deja de ser válido."""
+        return {name: dataset_config.get(name) for name in ('workspace', 'project', 'version', 'format')}
+
+    def fetch(self, dataset_config: dict, staging_dir: Path) -> Path:
+        raise NotImplementedError
+
+    def fetch_files(self, dataset_config: dict, relpaths: list, staging_dir: Path) -> Path:
+        return self.fetch(dataset_config, staging_dir)
+
+class RoboflowSource(DatasetSource):
+    """
+    Descarga desde Roboflow con su SDK.
+
+    Roboflow entrega cada versión como un único zip, por lo que una reparación
+    vuelve a descargar el archivo, aunque solo se reemplazan los archivos dañados.
+    """
+
+    def __init__(self, api_key: str):
+        from roboflow import Roboflow
+
+        self.rf = Roboflow(api_key=api_key)
+
+    def fetch(self, dataset_config: dict, staging_dir: Path) -> Path:
+        project = self.rf.workspace(dataset_config['workspace']).project(dataset_config['project'])
+        version = project.version(dataset_config['version'])
+        # Sin overwrite, el SDK no descarga nada si el directorio de staging ya existe
+        version.download(dataset_config['format'], location=str(staging_dir), overwrite=True)
+        return Path(staging_dir)
+
+class LocalDirectorySource(DatasetSource):
+    """
+    Copia datasets desde un directorio local (<root>/<project>/), p. ej. un mirror o datos de prueba.
+
+    Args:
+        root (Path): Directorio con una carpeta por proyecto.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _dataset_dir(self, dataset_config: dict) -> Path:
+        return Path(dataset_config.get('source_path') or self.root / dataset_config['project'])
+
+    def fetch(self, dataset_config: dict, staging_dir: Path) -> Path:
+        shutil.copytree(self._dataset_dir(dataset_config), staging_dir, dirs_exist_ok=True)
+        return Path(staging_dir)
+
+    def fetch_files(self, dataset_config: dict, relpaths: list, staging_dir: Path) -> Path:
+        source = self._dataset_dir(dataset_config)
+        for relpath in relpaths:
+            target = Path(staging_dir) / relpath
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source / relpath, target)
+        return Path(staging_dir)
+
+class ArchiveSource(DatasetSource):
+    """
+    Extrae datasets desde archivos zip locales (<root>/<project>.zip), como los que exporta Roboflow.
+
+    Args:
+        root (Path): Directorio con un zip por proyecto.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _archive(self, dataset_config: dict) -> Path:
+        return Path(dataset_config.get('source_path') or self.root / f"{dataset_config['project']}.zip")
+
+    def fetch(self, dataset_config: dict, staging_dir: Path) -> Path:
+        with zipfile.ZipFile(self._archive(dataset_config)) as archive:
+            archive.extractall(staging_dir)
+        return Path(staging_dir)
+
+    def fetch_files(self, dataset_config: dict, relpaths: list, staging_dir: Path) -> Path:
+        with zipfile.ZipFile(self._archive(dataset_config)) as archive:
+            members = set(archive.namelist())
+            for relpath in relpaths:
+                if relpath in members:
+                    archive.extract(relpath, staging_dir)
+        return Path(staging_dir)
+
+def create_source(source_config: dict, api_key: str = None) -> DatasetSource:
+    """
+    Crea el origen indicado en la sección 'source' de datasets_sync.yaml.
+
+    Args:
+        source_config (dict): type ('roboflow', 'directory' o 'archive') y path.
+        api_key (str): API key de Roboflow.
+
+    Returns:
+        DatasetSource: Origen de los datasets.
+    """
+    source_type = source_config.get('type', 'roboflow')
+    if source_type == 'roboflow':
+        return RoboflowSource(api_key)
+    if source_type == 'directory':
+        return LocalDirectorySource(Path(source_config['path']))
+    if source_type == 'archive':
+        return ArchiveSource(Path(source_config['path']))
+    raise ValueError(f"Origen de datasets desconocido: {source_type}")
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from src.data_processing.dataset_sources import DatasetSource
+
+MANIFEST_FILE = '.sync_manifest.json'
+
+# Archivos que la propia sincronización u otras herramientas escriben en el dataset
+IGNORED_FILES = {MANIFEST_FILE, '.label_index.npz', '.phash_index.json', 'duplicates.csv'}
+
+def file_checksum(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_manifest(root: Path, relpaths: list = None, workers: int = 8) -> dict:
+    """
+    Tamaño y SHA-256 de los archivos de un dataset.
+
+    Args:
+        root (Path): Directorio del dataset.
+        relpaths (list): Archivos a incluir; por defecto todos salvo IGNORED_FILES.
+        workers (int): Hilos para calcular los hashes.
+
+    Returns:
+        dict: {ruta relativa: [tamaño, sha256]}.
+    """
+    root = Path(root)
+    if relpaths is None:
+        relpaths = sorted(p.relative_to(root).as_posix() for p in root.rglob('*')
+                          if p.is_file() and p.name not in IGNORED_FILES)
+
+    def entry(relpath: str) -> tuple:
+        path = root / relpath
+        return relpath, [path.stat().st_size, file_checksum(path)]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(executor.map(entry, relpaths))
+
+def verify_manifest(root: Path, files: dict, full: bool = False, workers: int = 8) -> list:
+    """
+    Archivos del manifiesto que faltan o están dañados.
+
+    Args:
+        root (Path): Directorio del dataset.
+        files (dict): {ruta relativa: [tamaño, sha256]}.
+        full (bool): Compara también el SHA-256; si es False solo el tamaño.
+        workers (int): Hilos para calcular los hashes.
+
+    Returns:
+        list: Rutas relativas a reparar.
+    """
+    root = Path(root)
+
+    def is_bad(item: tuple) -> bool:
+        relpath, (size, checksum) = item
+        path = root / relpath
+        if not path.is_file() or path.stat().st_size != size:
+            return True
+        return full and file_checksum(path) != checksum
+
+    items = list(files.items())
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        flags = list(executor.map(is_bad, items))
+    return [relpath for (relpath, _), bad in zip(items, flags) if bad]
+
+def load_manifest(root: Path) -> dict:
+    path = Path(root) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def write_manifest(root: Path, source_key: dict, files: dict):
+    path = Path(root) / MANIFEST_FILE
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as file:
+        json.dump({'source': source_key, 'files': files}, file)
+    os.replace(tmp_path, path)
+
+def _copy_into(staging_dir: Path, output_dir: Path, relpaths: list):
+    for relpath in relpaths:
+        target = output_dir / relpath
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(staging_dir / relpath, target)
+
+def sync_one(source: DatasetSource, dataset_config: dict, verify: bool = False, postprocess=None,
+             workers: int = 8, log=print) -> str:
+    """
+    Sincroniza un dataset usando su manifiesto de integridad.
+
+    El manifiesto (.sync_manifest.json) se escribe al final, por lo que una
+    descarga interrumpida se detecta por su ausencia. Con manifiesto válido solo
+    se vuelven a obtener los archivos que faltan o están dañados; sin él, el
+    dataset se descarga en staging y solo se copian los archivos que difieren.
+
+    Args:
+        source (DatasetSource): Origen del dataset.
+        dataset_config (dict): Entrada de datasets_sync.yaml.
+        verify (bool): Verifica los SHA-256 además de los tamaños.
+        postprocess (callable): Función aplicada al directorio del dataset tras sincronizarlo.
+        workers (int): Hilos para calcular los hashes.
+        log (callable): Función para reportar el progreso.
+
+    Returns:
+        str: 'up_to_date', 'repaired' o 'downloaded'.
+    """
+    output_dir = Path(dataset_config['output_dir'])
+    staging_dir = output_dir.with_name(f".{output_dir.name}.staging")
+    name = dataset_config['project']
+    source_key = source.key(dataset_config)
+    manifest = load_manifest(output_dir)
+
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir(parents=True)
+    try:
+        # Un manifiesto vacío no prueba nada: el dataset se vuelve a descargar
+        if manifest is not None and manifest.get('source') == source_key and manifest.get('files'):
+            bad = verify_manifest(output_dir, manifest['files'], verify, workers)
+            if not bad:
+                log(f"{name}: up to date ({len(manifest['files'])} files).")
+                return 'up_to_date'
+            log(f"{name}: repairing {len(bad)} missing or corrupted files...")
+            source.fetch_files(dataset_config, bad, staging_dir)
+            missing = [relpath for relpath in bad if not (staging_dir / relpath).is_file()]
+            if missing:
+                raise RuntimeError(f"{name}: the source did not deliver {len(missing)} files, e.g. {missing[0]}.")
+            _copy_into(staging_dir, output_dir, bad)
+            status, changed = 'repaired', bad
+            files = manifest['files']
+        else:
+            reason = 'version changed' if manifest is not None else \
+                'no manifest, incomplete or earlier download' if output_dir.exists() else 'new dataset'
+            log(f"{name}: downloading ({reason})...")
+            source.fetch(dataset_config, staging_dir)
+            staged = build_manifest(staging_dir, workers=workers)
+            if not staged:
+                raise RuntimeError(f"{name}: the source delivered no files; the manifest is not written.")
+            if output_dir.exists():
+                # Se conservan los archivos ya descargados que coinciden con el staging
+                current = {relpath: entry for relpath, entry in staged.items()
+                           if (output_dir / relpath).is_file()
+                           and (output_dir / relpath).stat().st_size == entry[0]}
+                changed = [relpath for relpath in staged
+                           if relpath not in current or file_checksum(output_dir / relpath) != staged[relpath][1]]
+                _copy_into(staging_dir, output_dir, changed)
+                stale = set((manifest or {}).get('files', {})) - set(staged)
+                for relpath in stale:
+                    (output_dir / relpath).unlink(missing_ok=True)
+                log(f"{name}: {len(changed)} of {len(staged)} files updated, {len(stale)} removed.")
+            else:
+                output_dir.parent.mkdir(parents=True, exist_ok=True)
+                staging_dir.rename(output_dir)
+                changed = list(staged)
+            status, files = 'downloaded', staged
+
+        if postprocess is not None:
+            postprocess(output_dir)
+        # Se vuelven a registrar los archivos reparados y los que modifica postprocess (data.yaml)
+        touched = set(changed if status == 'repaired' else []) | {p for p in files if p.endswith('data.yaml')}
+        touched = sorted(p for p in touched if (output_dir / p).is_file())
+        files = {**files, **build_manifest(output_dir, touched, workers)}
+        write_manifest(output_dir, source_key, files)
+        return status
+    finally:
+        if staging_dir.exists():
+            shutil.rmtree(staging_dir)
+
+def sync_datasets(source: DatasetSource, datasets: list, max_workers: int = 4, verify: bool = False,
+                  postprocess=None, log=print) -> dict:
+    """
+    Sincroniza varios datasets en paralelo con un número acotado de hilos.
+
+    Args:
+        source (DatasetSource): Origen de los datasets.
+        datasets (list): Entradas de datasets_sync.yaml.
+        max_workers (int): Datasets sincronizados a la vez.
+        verify (bool): Verifica los SHA-256 además de los tamaños.
+        postprocess (callable): Función aplicada a cada dataset tras sincronizarlo.
+        log (callable): Función para reportar el progreso.
+
+    Returns:
+        dict: Estado por output_dir ('up_to_date', 'repaired', 'downloaded' o el error).
+    """
+    def run(dataset_config: dict) -> str:
+        try:
+            return sync_one(source, dataset_config, verify, postprocess, log=log)
+        except Exception as error:
+            log(f"{dataset_config['project']}: sync failed: {error}")
+            return f"error: {error}"
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip((d['output_dir'] for d in datasets), executor.map(run, datasets)))
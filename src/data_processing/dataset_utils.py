@@ -0,0 +1,116 @@
+import hashlib
+from pathlib import Path
+import yaml
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp'}
+
+def load_data_yaml(data_yaml: Path) -> dict:
+    """
+    Carga el data.yaml de un dataset en formato YOLO.
+
+    Args:
+        data_yaml (Path): Ruta al data.yaml.
+
+    Returns:
+        dict: Contenido del archivo.
+    """
+    with open(data_yaml, 'r') as file:
+        return yaml.safe_load(file)
+
+def split_dir(data_yaml: Path, split: str = 'val') -> Path:
+    """
+    Resuelve el directorio de imágenes de un split del data.yaml.
+
+    Acepta rutas absolutas (las que escribe sync_dataset.py) y las relativas de
+    Roboflow ('../valid/images'), que se resuelven respecto a la carpeta del dataset.
+
+    Args:
+        data_yaml (Path): Ruta al data.yaml.
+        split (str): 'train', 'val' o 'test'.
+
+    Returns:
+        Path: Directorio de imágenes del split.
+    """
+    data_yaml = Path(data_yaml)
+    data = load_data_yaml(data_yaml)
+    entry = Path(data[split])
+    if entry.is_absolute():
+        return entry
+    base = Path(data['path']) if data.get('path') else data_yaml.parent
+    candidates = [base / entry, base / Path(*entry.parts[1:])] if entry.parts[0] == '..' else [base / entry]
+    for candidate in candidates:
+        if candidate.exists():
+            return candidate.resolve()
+    return candidates[-1]
+
+def split_images(data_yaml: Path, split: str = 'val') -> list:
+    """
+    Lista ordenada de imágenes de un split del data.yaml.
+
+    Args:
+        data_yaml (Path): Ruta al data.yaml.
+        split (str): 'train', 'val' o 'test'.
+
+    Returns:
+        list: Rutas de las imágenes.
+    """
+    images_dir = split_dir(data_yaml, split)
+    if not images_dir.exists():
+        return []
+    return sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+def label_path(image_path: Path) -> Path:
+    """
+    Ruta del archivo de etiquetas YOLO de una imagen (.../images/x.jpg -> .../labels/x.txt).
+
+    Args:
+        image_path (Path): Ruta a la imagen.
+
+    Returns:
+        Path: Ruta al .txt de etiquetas.
+    """
+    return image_path.parent.parent / 'labels' / f"{image_path.stem}.txt"
+
+def dataset_files(data_yaml: Path) -> list:
+    """
+    Archivos de imágenes y etiquetas de todos los splits del data.yaml.
+
+    Args:
+        data_yaml (Path): Ruta al data.yaml.
+
+    Returns:
+        list: Rutas ordenadas de los archivos.
+    """
+    data = load_data_yaml(data_yaml)
+    files = set()
+    for split in ('train', 'val', 'test'):
+        if not data.get(split):
+            continue
+        images_dir = split_dir(data_yaml, split)
+        for directory in (images_dir, images_dir.parent / 'labels'):
+            if directory.is_dir():
+                files.update(p for p in directory.iterdir() if p.is_file())
+    return sorted(files)
+
+def manifest_digest(data_yaml: Path) -> str:
+    """
+    Hash del manifiesto del dataset (ruta relativa, tamaño y fecha de modificación de cada archivo).
+
+    Cambia si se agregan, eliminan o modifican imágenes o etiquetas, sin leer su contenido.
+
+    Args:
+        data_yaml (Path): Ruta al data.yaml.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    root = Path(data_yaml).resolve().parent
+    digest = hashlib.sha256()
+    for path in dataset_files(data_yaml):
+        stat = path.stat()
+        try:
+            name = path.resolve().relative_to(root).as_posix()
+        except ValueError:
+            name = path.resolve().as_posix()
+        digest.update(f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
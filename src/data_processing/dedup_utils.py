@@ -0,0 +1,228 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import cv2
+import numpy as np
+from wasabi import Printer
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp'}
+INDEX_NAME = '.phash_index.json'
+
+def phash(image_path: str) -> int:
+    """
+    Calcula el hash perceptual (pHash de 64 bits) de una imagen.
+
+    La imagen se lee reducida en gris (el decodificador JPEG escala en el dominio
+    DCT), se lleva a 32×32 y se comparan los 8×8 coeficientes DCT de baja
+    frecuencia contra su mediana.
+
+    Args:
+        image_path (str): Ruta a la imagen.
+
+    Returns:
+        int: Hash de 64 bits, o -1 si la imagen no se pudo leer.
+    """
+    image = cv2.imread(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None:
+        return -1
+    small = cv2.resize(image, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view('>u8')[0])
+
+def _hash_many(paths: list) -> list:
+    return [phash(path) for path in paths]
+
+class HashIndex:
+    """
+    Índice persistente de hashes perceptuales de un directorio.
+
+    Se guarda como JSON en el propio directorio y solo se recalculan los archivos
+    nuevos o cuyo tamaño o fecha de modificación cambió.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.path = self.root / INDEX_NAME
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, 'r') as file:
+                self.entries = json.load(file)
+
+    def update(self, workers: int = None, chunk_size: int = 256) -> int:
+        """
+        Sincroniza el índice con las imágenes del directorio.
+
+        Args:
+            workers (int): Procesos para calcular hashes; por defecto os.cpu_count().
+            chunk_size (int): Imágenes por tarea enviada a cada proceso.
+
+        Returns:
+            int: Número de imágenes que se hashearon en esta ejecución.
+        """
+        current, pending = {}, []
+        for path in self.root.rglob('*'):
+            if path.suffix.lower() not in IMAGE_EXTENSIONS or not path.is_file():
+                continue
+            key = path.relative_to(self.root).as_posix()
+            stat = path.stat()
+            entry = self.entries.get(key)
+            if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                current[key] = entry
+            else:
+                current[key] = [stat.st_size, stat.st_mtime_ns, None]
+                pending.append(key)
+
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_hash_many, [[str(self.root / key) for key in chunk] for chunk in chunks])
+            for chunk, hashes in zip(chunks, results):
+                for key, value in zip(chunk, hashes):
+                    current[key][2] = None if value < 0 else f"{value:016x}"
+
+        self.entries = current
+        self.save()
+        return len(pending)
+
+    def save(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as file:
+            json.dump(self.entries, file)
+        os.replace(tmp_path, self.path)
+
+    def arrays(self) -> tuple:
+        """
+        Devuelve las rutas relativas y los hashes como arreglo uint64.
+
+        Returns:
+            tuple: (keys, hashes) omitiendo las imágenes ilegibles.
+        """
+        keys = sorted(k for k, v in self.entries.items() if v[2] is not None)
+        hashes = np.array([int(self.entries[k][2], 16) for k in keys], dtype=np.uint64)
+        return keys, hashes
+
+def _close_pairs(hashes: np.ndarray, members: np.ndarray, max_distance: int, block: int = 1024):
+    """Pares de un bucket a distancia <= max_distance, por bloques para acotar la memoria."""
+    for first in range(0, len(members), block):
+        rows = members[first:first + block]
+        cols = members[first:]
+        distance = np.bitwise_count(hashes[rows][:, None] ^ hashes[cols][None, :])
+        i, j = np.nonzero(distance <= max_distance)
+        upper = j > i
+        yield from zip(rows[i[upper]], cols[j[upper]])
+
+def find_duplicate_clusters(hashes: np.ndarray, max_distance: int = 4) -> list:
+    """
+    Agrupa hashes a distancia de Hamming <= max_distance de un representante,
+    con multi-index hashing.
+
+    Los 64 bits se dividen en max_distance + 1 bloques; por el principio del
+    palomar, dos hashes cercanos coinciden exactamente en al menos un bloque,
+    así que solo se comparan los pares que comparten algún bloque en lugar de
+    todos contra todos. Los clusters no se encadenan: en orden de índice, cada
+    hash sin asignar es el representante de los hashes libres cercanos a él, de
+    modo que todo el cluster está a max_distance del primer elemento.
+
+    Args:
+        hashes (np.ndarray): Hashes uint64 de forma (N,).
+        max_distance (int): Distancia de Hamming máxima para considerar duplicados.
+
+    Returns:
+        list: Clusters (listas de índices ordenados) con más de un elemento; el primero es el representante.
+    """
+    unique, inverse = np.unique(hashes, return_inverse=True)
+    neighbors = [[] for _ in range(len(unique))]
+
+    bounds = np.linspace(0, 64, max_distance + 2).astype(int)
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        mask = np.uint64((1 << (high - low)) - 1)
+        keys = (unique >> np.uint64(low)) & mask
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+            for a, b in _close_pairs(unique, order[start:end], max_distance):
+                neighbors[a].append(b)
+                neighbors[b].append(a)
+
+    # Los hashes se recorren en el orden de su primera imagen
+    first = np.full(len(unique), len(hashes), dtype=np.int64)
+    np.minimum.at(first, inverse, np.arange(len(hashes)))
+    representative = np.full(len(unique), -1, dtype=np.int64)
+    for u in np.argsort(first, kind='stable'):
+        if representative[u] >= 0:
+            continue
+        representative[u] = u
+        for v in neighbors[u]:
+            if representative[v] < 0:
+                representative[v] = u
+
+    clusters = {}
+    for index, root in enumerate(representative[inverse]):
+        clusters.setdefault(root, []).append(index)
+    return [members for members in clusters.values() if len(members) > 1]
+
+def _label_path(image_path: Path) -> Path:
+    """Etiqueta YOLO asociada a una imagen dentro de .../images/."""
+    if image_path.parent.name != 'images':
+        return None
+    return image_path.parent.parent / 'labels' / f"{image_path.stem}.txt"
+
+def deduplicate(root: Path, max_distance: int = 4, action: str = 'report', workers: int = None):
+    """
+    Busca imágenes casi duplicadas en un directorio y las reporta, enlaza o elimina.
+
+    Se conserva la primera imagen de cada cluster en orden alfabético (el primer
+    mosaico o frame); el reporte se escribe en duplicates.csv.
+
+    Args:
+        root (Path): Directorio del dataset.
+        max_distance (int): Distancia de Hamming máxima entre hashes duplicados.
+        action (str): 'report', 'hardlink' (reemplaza los duplicados y sus
+            etiquetas por enlaces duros a la imagen y la etiqueta conservadas) o 'drop'
+            (los elimina junto con su etiqueta).
+        workers (int): Procesos para calcular hashes.
+    """
+    msg = Printer()
+    if not root.is_dir():
+        msg.fail(f"No se encontró el directorio: {root}")
+        return
+
+    index = HashIndex(root)
+    hashed = index.update(workers)
+    keys, hashes = index.arrays()
+    msg.info(f"Índice actualizado: {hashed} imágenes nuevas de {len(keys)}")
+
+    clusters = find_duplicate_clusters(hashes, max_distance)
+    removed = 0
+    with open(root / 'duplicates.csv', 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['cluster', 'path', 'kept', 'distance'])
+        for cluster_id, members in enumerate(clusters):
+            keep = members[0]
+            for member in members:
+                distance = int(np.bitwise_count(hashes[keep] ^ hashes[member]))
+                writer.writerow([cluster_id, keys[member], member == keep, distance])
+                if member == keep or action == 'report':
+                    continue
+
+                path = root / keys[member]
+                path.unlink()
+                label_path = _label_path(path)
+                if label_path is not None and label_path.exists():
+                    label_path.unlink()
+                if action == 'hardlink':
+                    os.link(root / keys[keep], path)
+                    # La imagen enlazada es la conservada, así que también lo es su etiqueta
+                    kept_label = _label_path(root / keys[keep])
+                    if label_path is not None and kept_label is not None and kept_label.exists():
+                        os.link(kept_label, label_path)
+                removed += 1
+
+    duplicates = sum(len(members) - 1 for members in clusters)
+    msg.good(f"{len(clusters)} clusters con {duplicates} duplicados en {root} (acción: {action}, {removed} modificados)")
+    if removed:
+        index.update(workers)
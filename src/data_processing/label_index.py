@@ -0,0 +1,277 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from wasabi import Printer
+from src.data_processing.dataset_utils import IMAGE_EXTENSIONS
+
+INDEX_FILE = '.label_index.npz'
+
+def _parse_label_file(path: str) -> tuple:
+    """
+    Lee un archivo de etiquetas YOLO (cajas o polígonos de segmentación).
+
+    Args:
+        path (str): Ruta al .txt.
+
+    Returns:
+        tuple: (clases (N,), cajas (N, 4) [cx, cy, w, h], puntos por fila (N,), puntos (P, 2)).
+    """
+    classes, boxes, lengths, points = [], [], [], []
+    with open(path, 'r') as file:
+        for line in file:
+            values = line.split()
+            if len(values) < 5:
+                continue
+            coords = np.array(values[1:], dtype=np.float32)
+            classes.append(int(values[0]))
+            if len(coords) == 4:
+                boxes.append(coords)
+                lengths.append(0)
+            else:
+                polygon = coords[:len(coords) // 2 * 2].reshape(-1, 2)
+                low, high = polygon.min(axis=0), polygon.max(axis=0)
+                boxes.append(np.concatenate([(low + high) / 2, high - low]))
+                lengths.append(len(polygon))
+                points.append(polygon)
+    return (np.array(classes, dtype=np.int32), np.array(boxes, dtype=np.float32).reshape(-1, 4),
+            np.array(lengths, dtype=np.int64),
+            np.concatenate(points) if points else np.zeros((0, 2), dtype=np.float32))
+
+def _scan_split(split_dir: Path) -> dict:
+    """Imágenes y etiquetas de un split por nombre base, con tamaño y fecha de las etiquetas."""
+    entries = {}
+    images_dir, labels_dir = split_dir / 'images', split_dir / 'labels'
+    if images_dir.is_dir():
+        with os.scandir(images_dir) as it:
+            for entry in it:
+                stem, ext = os.path.splitext(entry.name)
+                if ext.lower() in IMAGE_EXTENSIONS and entry.is_file():
+                    entries.setdefault(stem, {})['image'] = entry.name
+    if labels_dir.is_dir():
+        with os.scandir(labels_dir) as it:
+            for entry in it:
+                stem, ext = os.path.splitext(entry.name)
+                if ext == '.txt' and entry.is_file():
+                    stat = entry.stat()
+                    entries.setdefault(stem, {})['label'] = (stat.st_size, stat.st_mtime_ns)
+    return entries
+
+class LabelIndex:
+    """
+    Índice compacto de las etiquetas YOLO de un dataset en un único archivo .npz.
+
+    Tabla de archivos (split, nombre, imagen, etiqueta con tamaño y fecha) y tabla
+    de filas (archivo, clase, caja [cx, cy, w, h]), más los puntos de los polígonos
+    de segmentación con sus offsets por fila. update() solo vuelve a leer las
+    etiquetas cuyo tamaño o fecha de modificación cambiaron.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.path = self.root / INDEX_FILE
+        self.splits = []
+        self.file_split = np.zeros(0, dtype=np.int16)
+        self.file_stem = np.zeros(0, dtype='<U1')
+        self.file_image = np.zeros(0, dtype='<U1')
+        self.file_has_label = np.zeros(0, dtype=bool)
+        self.label_size = np.zeros(0, dtype=np.int64)
+        self.label_mtime = np.zeros(0, dtype=np.int64)
+        self.row_offsets = np.zeros(1, dtype=np.int64)
+        self.row_class = np.zeros(0, dtype=np.int32)
+        self.row_box = np.zeros((0, 4), dtype=np.float32)
+        self.point_offsets = np.zeros(1, dtype=np.int64)
+        self.points = np.zeros((0, 2), dtype=np.float32)
+        if self.path.exists():
+            self._load()
+
+    def _load(self):
+        with np.load(self.path) as data:
+            self.splits = data['splits'].tolist()
+            for name in ('file_split', 'file_stem', 'file_image', 'file_has_label', 'label_size', 'label_mtime',
+                         'row_offsets', 'row_class', 'row_box', 'point_offsets', 'points'):
+                setattr(self, name, data[name])
+
+    def save(self):
+        """Guarda el índice en <root>/.label_index.npz (escritura atómica)."""
+        tmp_path = self.path.with_name(self.path.name + '.tmp.npz')
+        np.savez(tmp_path, splits=np.array(self.splits, dtype='<U64'), file_split=self.file_split,
+                 file_stem=self.file_stem, file_image=self.file_image, file_has_label=self.file_has_label,
+                 label_size=self.label_size, label_mtime=self.label_mtime, row_offsets=self.row_offsets,
+                 row_class=self.row_class, row_box=self.row_box, point_offsets=self.point_offsets, points=self.points)
+        os.replace(tmp_path, self.path)
+
+    def update(self, workers: int = None) -> tuple:
+        """
+        Sincroniza el índice con los archivos del dataset.
+
+        Args:
+            workers (int): Procesos para leer etiquetas; por defecto uno por CPU.
+
+        Returns:
+            tuple: (etiquetas leídas, etiquetas reutilizadas del índice anterior).
+        """
+        split_dirs = sorted(p for p in self.root.iterdir()
+                            if p.is_dir() and ((p / 'images').is_dir() or (p / 'labels').is_dir()))
+        previous = {(self.splits[s], stem): i for i, (s, stem) in enumerate(zip(self.file_split.tolist(),
+                                                                                 self.file_stem.tolist()))}
+
+        files = []
+        for split_id, split_dir in enumerate(split_dirs):
+            for stem, entry in sorted(_scan_split(split_dir).items()):
+                files.append((split_id, split_dir, stem, entry))
+
+        to_read, parts = [], []
+        for split_id, split_dir, stem, entry in files:
+            old = previous.get((split_dir.name, stem))
+            label = entry.get('label')
+            if label is None:
+                parts.append(None)
+            elif old is not None and self.file_has_label[old] and \
+                    (self.label_size[old], self.label_mtime[old]) == label:
+                parts.append(self._file_rows(old))
+            else:
+                parts.append(len(to_read))
+                to_read.append(str(split_dir / 'labels' / f"{stem}.txt"))
+
+        parsed = []
+        if to_read:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parsed = list(executor.map(_parse_label_file, to_read, chunksize=max(len(to_read) // 64, 1)))
+        empty = (np.zeros(0, np.int32), np.zeros((0, 4), np.float32), np.zeros(0, np.int64),
+                 np.zeros((0, 2), np.float32))
+        parts = [empty if part is None else parsed[part] if isinstance(part, int) else part for part in parts]
+
+        self.splits = [split_dir.name for split_dir in split_dirs]
+        self.file_split = np.array([f[0] for f in files], dtype=np.int16)
+        self.file_stem = np.array([f[2] for f in files], dtype=str)
+        self.file_image = np.array([f[3].get('image', '') for f in files], dtype=str)
+        self.file_has_label = np.array(['label' in f[3] for f in files], dtype=bool)
+        self.label_size = np.array([f[3].get('label', (0, 0))[0] for f in files], dtype=np.int64)
+        self.label_mtime = np.array([f[3].get('label', (0, 0))[1] for f in files], dtype=np.int64)
+
+        self.row_offsets = np.zeros(len(files) + 1, dtype=np.int64)
+        self.row_offsets[1:] = np.cumsum([len(part[0]) for part in parts])
+        self.row_class = np.concatenate([part[0] for part in parts]) if parts else np.zeros(0, np.int32)
+        self.row_box = np.concatenate([part[1] for part in parts]) if parts else np.zeros((0, 4), np.float32)
+        lengths = np.concatenate([part[2] for part in parts]) if parts else np.zeros(0, np.int64)
+        self.point_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        self.point_offsets[1:] = np.cumsum(lengths)
+        self.points = np.concatenate([part[3] for part in parts]) if parts else np.zeros((0, 2), np.float32)
+        return len(to_read), int(self.file_has_label.sum()) - len(to_read)
+
+    def _file_rows(self, index: int) -> tuple:
+        start, end = self.row_offsets[index], self.row_offsets[index + 1]
+        p_start, p_end = self.point_offsets[start], self.point_offsets[end]
+        return (self.row_class[start:end], self.row_box[start:end],
+                np.diff(self.point_offsets[start:end + 1]), self.points[p_start:p_end])
+
+    @property
+    def row_file(self) -> np.ndarray:
+        """Índice de archivo de cada fila."""
+        return np.repeat(np.arange(len(self.file_stem)), np.diff(self.row_offsets))
+
+    def polygon(self, row: int) -> np.ndarray:
+        """Puntos (P, 2) normalizados del polígono de una fila (vacío si es una caja)."""
+        return self.points[self.point_offsets[row]:self.point_offsets[row + 1]]
+
+    def _split_mask(self, split: str = None) -> np.ndarray:
+        if split is None:
+            return np.ones(len(self.file_stem), dtype=bool)
+        return self.file_split == self.splits.index(split)
+
+    def split_counts(self) -> dict:
+        """Imágenes, etiquetas y objetos por split."""
+        counts = {}
+        rows_per_file = np.diff(self.row_offsets)
+        for split in self.splits:
+            mask = self._split_mask(split)
+            counts[split] = {
+                'images': int((self.file_image[mask] != '').sum()),
+                'labels': int(self.file_has_label[mask].sum()),
+                'objects': int(rows_per_file[mask].sum()),
+            }
+        return counts
+
+    def class_balance(self, split: str = None) -> dict:
+        """Objetos por clase, en todo el dataset o en un split."""
+        rows = self._split_mask(split)[self.row_file]
+        classes, counts = np.unique(self.row_class[rows], return_counts=True)
+        return dict(zip(classes.tolist(), counts.tolist()))
+
+    def unlabeled_images(self, split: str = None) -> list:
+        """Imágenes con archivo de etiquetas vacío (fondo)."""
+        mask = self._split_mask(split) & self.file_has_label & (self.file_image != '') & (np.diff(self.row_offsets) == 0)
+        return self._names(mask)
+
+    def orphan_images(self, split: str = None) -> list:
+        """Imágenes sin archivo de etiquetas."""
+        return self._names(self._split_mask(split) & ~self.file_has_label & (self.file_image != ''))
+
+    def orphan_labels(self, split: str = None) -> list:
+        """Etiquetas sin imagen."""
+        return self._names(self._split_mask(split) & self.file_has_label & (self.file_image == ''))
+
+    def box_size_histogram(self, bins: int = 10, split: str = None) -> dict:
+        """
+        Histograma por clase del tamaño relativo de los objetos, sqrt(w * h) en [0, 1].
+
+        Args:
+            bins (int): Número de intervalos.
+            split (str): Split a considerar; None para todo el dataset.
+
+        Returns:
+            dict: 'edges' y un arreglo de conteos por clase.
+        """
+        rows = self._split_mask(split)[self.row_file]
+        sizes = np.sqrt(np.clip(self.row_box[rows, 2] * self.row_box[rows, 3], 0, 1))
+        classes = self.row_class[rows]
+        edges = np.linspace(0, 1, bins + 1)
+        histogram = {'edges': edges}
+        for cls in np.unique(classes).tolist():
+            histogram[cls] = np.histogram(sizes[classes == cls], bins=edges)[0]
+        return histogram
+
+    def _names(self, mask: np.ndarray) -> list:
+        splits = np.array(self.splits, dtype=str)[self.file_split[mask]] if self.splits else []
+        return [f"{split}/{stem}" for split, stem in zip(splits, self.file_stem[mask])]
+
+def index_dataset(root: Path, workers: int = None, bins: int = 10, verbose: bool = True) -> LabelIndex:
+    """
+    Actualiza el índice de etiquetas de un dataset y reporta sus estadísticas.
+
+    Args:
+        root (Path): Directorio del dataset (con train/, valid/, test/ que contienen images/ y labels/).
+        workers (int): Procesos para leer etiquetas.
+        bins (int): Intervalos del histograma de tamaños.
+        verbose (bool): Muestra las tablas de estadísticas además del resumen.
+
+    Returns:
+        LabelIndex: Índice actualizado.
+    """
+    msg = Printer()
+    root = Path(root)
+    index = LabelIndex(root)
+    read, reused = index.update(workers)
+    index.save()
+    msg.info(f"Índice de etiquetas actualizado: {read} leídas, {reused} sin cambios ({index.path})")
+
+    counts = index.split_counts()
+    if verbose:
+        msg.table([(split, c['images'], c['labels'], c['objects']) for split, c in counts.items()],
+                  header=('Split', 'Imágenes', 'Etiquetas', 'Objetos'), divider=True)
+        balance = {split: index.class_balance(split) for split in index.splits}
+        classes = sorted(set().union(*balance.values())) if balance else []
+        msg.table([(cls, *(balance[split].get(cls, 0) for split in index.splits)) for cls in classes],
+                  header=('Clase', *index.splits), divider=True)
+        histogram = index.box_size_histogram(bins)
+        edges = histogram.pop('edges')
+        msg.table([(cls, *counts_) for cls, counts_ in histogram.items()],
+                  header=('Clase', *(f"<{edge:.1f}" for edge in edges[1:])), divider=True)
+
+    for name, items in (('imágenes sin etiquetas', index.orphan_images()),
+                        ('etiquetas sin imagen', index.orphan_labels()),
+                        ('imágenes con etiquetas vacías', index.unlabeled_images())):
+        if items:
+            msg.warn(f"{len(items)} {name}: {', '.join(items[:5])}{' ...' if len(items) > 5 else ''}")
+    return index
@@ -1,9 +1,497 @@
+import csv
+import io
+import json
 import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import cv2
+import numpy as np
 from PIL import Image
 from wasabi import Printer
+from src.data_processing.tile_shards import ShardReader, ShardWriter, is_container
 
-def create_tiles(image_path: Path, output_dir: Path, tile_size: int = 512, overlap: float = 0.2):
+try:
+    import rasterio
+    from rasterio.enums import Resampling
+    from rasterio.windows import Window
+except ImportError:  # rasterio es opcional; sin él se usa la lectura por franjas de PIL
+    rasterio = None
+
+PYRAMID_FILE = 'pyramid.json'
+
+# Image.MAX_IMAGE_PIXELS es global: el cambio temporal al abrir se serializa entre hilos
+_PIL_LIMIT_LOCK = threading.Lock()
+# Imágenes ya advertidas de que no admiten lectura parcial
+_FULL_DECODE_WARNED = set()
+
+def compute_tile_grid(width: int, height: int, tile_size: int = 512, overlap: float = 0.2) -> list:
+    """
+    Calcula la rejilla de mosaicos para una imagen de tamaño dado.
+
+    Args:
+        width (int): Ancho de la imagen en píxeles.
+        height (int): Alto de la imagen en píxeles.
+        tile_size (int): Tamaño de los mosaicos en píxeles.
+        overlap (float): Proporción de traslape entre mosaicos (0 a 1).
+
+    Returns:
+        list: Tuplas (row, col, left, upper, right, lower) ordenadas por fila.
+    """
+    step = max(int(tile_size * (1 - overlap)), 1)
+    # Una imagen más pequeña que tile_size produce un único mosaico recortado
+    cols = max(math.ceil((width - tile_size) / step), 0) + 1
+    rows = max(math.ceil((height - tile_size) / step), 0) + 1
+
+    grid = []
+    for row in range(rows):
+        for col in range(cols):
+            left = col * step
+            upper = row * step
+            right = min(left + tile_size, width)
+            lower = min(upper + tile_size, height)
+
+            if right <= left or lower <= upper:
+                continue
+
+            grid.append((row, col, left, upper, right, lower))
+    return grid
+
+def _shift_tile(tile: tuple, top: int) -> tuple:
+    decoder, (x0, y0, x1, y1), offset, args = tile
+    extents = (x0, y0 - top, x1, y1 - top)
+    if hasattr(tile, '_replace'):  # Pillow >= 11 usa ImageFile._Tile
+        return tile._replace(extents=extents)
+    return decoder, extents, offset, args
+
+class StripReader:
+    """
+    Lector de franjas horizontales de una ortofoto.
+
+    Con rasterio (o con PIL sobre un TIFF sin compresión dividido en strips) se
+    decodifican únicamente las filas necesarias para cada franja, de modo que la
+    memoria depende de tile_size × ancho y no del mosaico completo. Los formatos
+    sin lectura parcial en PIL (JPEG, PNG, TIFF comprimido) se decodifican
+    completos una sola vez y se conservan mientras el lector esté abierto: la
+    memoria es la del mosaico completo y se advierte al abrirlos (partial=False).
+    """
+
+    def __init__(self, image_path: Path, bands: int = 3):
+        self.image_path = Path(image_path)
+        self.bands = bands
+        self._dataset = None
+        self._full_image = None
+        if rasterio is not None:
+            try:
+                self._dataset = rasterio.open(self.image_path)
+            except rasterio.errors.RasterioIOError:
+                self._dataset = None
+
+        self.partial = True
+        if self._dataset is not None:
+            self.size = (self._dataset.width, self._dataset.height)
+        else:
+            with self._open_pil() as image:
+                self.size = image.size
+                self.partial = len(image.tile) > 1
+            if not self.partial and self.image_path not in _FULL_DECODE_WARNED:
+                _FULL_DECODE_WARNED.add(self.image_path)
+                Printer().warn(f"{self.image_path.name} no admite lectura por franjas sin rasterio; "
+                               f"se decodifica completa en memoria ({self.size[0]}x{self.size[1]} px)")
+
+    def _open_pil(self) -> Image.Image:
+        # La memoria se acota por franja, por lo que el límite de PIL no aplica
+        with _PIL_LIMIT_LOCK:
+            max_pixels = Image.MAX_IMAGE_PIXELS
+            Image.MAX_IMAGE_PIXELS = None
+            try:
+                return Image.open(self.image_path)
+            finally:
+                Image.MAX_IMAGE_PIXELS = max_pixels
+
+    def read_rows(self, upper: int, lower: int, mode: str = 'RGB') -> Image.Image:
+        """
+        Lee las filas [upper, lower) con el ancho completo de la imagen.
+
+        Args:
+            upper (int): Primera fila (inclusive).
+            lower (int): Última fila (exclusiva).
+            mode (str): 'RGB', o 'RGBA' para incluir la transparencia (con rasterio,
+                la máscara de validez del raster, que cubre alfa y nodata).
+
+        Returns:
+            Image.Image: Franja en el modo indicado.
+        """
+        if self._dataset is not None:
+            return self._read_rows_rasterio(upper, lower, mode)
+        strip = self._read_rows_pil(upper, lower)
+        return strip if strip.mode == mode else strip.convert(mode)
+
+    def _read_rows_rasterio(self, upper: int, lower: int, mode: str = 'RGB') -> Image.Image:
+        width = self._dataset.width
+        window = Window(0, upper, width, lower - upper)
+        indexes = list(range(1, min(self.bands, self._dataset.count) + 1))
+        data = self._dataset.read(indexes, window=window)
+        if data.shape[0] == 1:
+            strip = Image.fromarray(data[0]).convert('RGB')
+        else:
+            strip = Image.fromarray(data.transpose(1, 2, 0)).convert('RGB')
+        if mode == 'RGBA':
+            strip.putalpha(Image.fromarray(self._dataset.dataset_mask(window=window)))
+        return strip
+
+    def read_overview(self, scale: int) -> np.ndarray:
+        """
+        Lee la imagen completa reducida scale veces con su máscara de validez.
+
+        rasterio usa las overviews del GeoTIFF si existen; sin rasterio, los JPEG se
+        decodifican reducidos en el dominio DCT (hasta 1/8). En ambos casos no se
+        decodifica la resolución completa.
+
+        Returns:
+            np.ndarray: Arreglo (H / scale, W / scale, 4) RGB + validez, o None si el
+                formato no admite una lectura reducida.
+        """
+        if self._dataset is None:
+            return self._read_overview_pil(scale)
+        height = max(math.ceil(self._dataset.height / scale), 1)
+        width = max(math.ceil(self._dataset.width / scale), 1)
+        indexes = list(range(1, min(3, self._dataset.count) + 1))
+        data = self._dataset.read(indexes, out_shape=(len(indexes), height, width), resampling=Resampling.average)
+        if len(indexes) < 3:
+            data = np.repeat(data[:1], 3, axis=0)
+        mask = self._dataset.dataset_mask(out_shape=(height, width), resampling=Resampling.average)
+        return np.concatenate([data.astype(np.uint8), mask[None].astype(np.uint8)]).transpose(1, 2, 0)
+
+    def _read_overview_pil(self, scale: int) -> np.ndarray:
+        width, height = (max(math.ceil(side / scale), 1) for side in self.size)
+        with self._open_pil() as image:
+            if image.format != 'JPEG':
+                return None
+            image.draft('RGB', (width, height))
+            data = np.asarray(image.convert('RGBA'))
+        return cv2.resize(data, (width, height), interpolation=cv2.INTER_AREA)
+
+    def _read_rows_pil(self, upper: int, lower: int) -> Image.Image:
+        if self._full_image is not None:
+            return self._full_image.crop((0, upper, self._full_image.size[0], lower))
+        image = self._open_pil()
+        width = image.size[0]
+        tiles = [t for t in image.tile if t[1][1] < lower and t[1][3] > upper]
+
+        if len(image.tile) <= 1:
+            # Formato sin strips (JPEG, PNG, TIFF comprimido vía libtiff):
+            # no hay lectura parcial posible con PIL; se decodifica una sola vez
+            image.load()
+            self._full_image = image
+            return image.crop((0, upper, width, lower))
+
+        # Restringe la decodificación a los strips que tocan la ventana
+        top = min(t[1][1] for t in tiles)
+        bottom = max(t[1][3] for t in tiles)
+        image.tile = [_shift_tile(tile, top) for tile in tiles]
+        image._size = (width, bottom - top)
+        image.load()
+        strip = image.crop((0, upper - top, width, lower - top))
+
+        image.close()
+        return strip
+
+    def close(self):
+        if self._dataset is not None:
+            self._dataset.close()
+            self._dataset = None
+        if self._full_image is not None:
+            self._full_image.close()
+            self._full_image = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def is_pyramid_level(path: Path) -> bool:
+    """Indica si la ruta es un nivel de una pirámide de build_pyramid (level_<k> junto a pyramid.json)."""
+    path = Path(path)
+    return path.is_dir() and (path.parent / PYRAMID_FILE).exists()
+
+class PyramidLevelReader:
+    """
+    Lector de franjas de un nivel de pirámide guardado como mosaicos sin traslape.
+
+    Ofrece la misma interfaz que StripReader (size, read_rows, read_overview),
+    de modo que la rejilla, la inferencia por mosaicos y el filtrado de mosaicos
+    vacíos funcionan igual sobre un nivel reducido que sobre la ortofoto. Solo se
+    decodifican las filas de mosaicos que tocan cada franja; la última fila
+    decodificada se conserva porque las franjas consecutivas se traslapan.
+    """
+
+    def __init__(self, level_dir: Path):
+        self.level_dir = Path(level_dir)
+        pyramid = json.loads((self.level_dir.parent / PYRAMID_FILE).read_text())
+        self.level = next(level for level in pyramid['levels'] if level['path'] == self.level_dir.name)
+        self.size = (self.level['width'], self.level['height'])
+        self.tile_size = pyramid['tile_size']
+        self.extension = pyramid['format']
+        self._shards = ShardReader(self.level_dir) if is_container(self.level_dir) else None
+        self._cached = (None, None)
+
+    def _read_tile(self, row: int, col: int) -> Image.Image:
+        name = f"tile_{row}_{col}.{self.extension}"
+        if self._shards is not None:
+            index = self._shards.find(name)
+            if index is None:
+                raise FileNotFoundError(f"El contenedor {self.level_dir} no tiene el mosaico {name}; "
+                                        f"reconstruya la pirámide.")
+            return Image.open(io.BytesIO(self._shards.read_bytes(index)))
+        if not (self.level_dir / name).exists():
+            raise FileNotFoundError(f"Falta el mosaico {self.level_dir / name}; reconstruya la pirámide.")
+        return Image.open(self.level_dir / name)
+
+    def _tile_row(self, row: int) -> Image.Image:
+        if self._cached[0] != row:
+            width, height = self.size
+            upper = row * self.tile_size
+            tiles = [self._read_tile(row, col) for col in range(math.ceil(width / self.tile_size))]
+            strip = Image.new(tiles[0].mode, (width, min(self.tile_size, height - upper)))
+            for col, tile in enumerate(tiles):
+                strip.paste(tile, (col * self.tile_size, 0))
+                tile.close()
+            self._cached = (row, strip)
+        return self._cached[1]
+
+    def read_rows(self, upper: int, lower: int, mode: str = 'RGB') -> Image.Image:
+        """
+        Lee las filas [upper, lower) del nivel con su ancho completo.
+
+        Args:
+            upper (int): Primera fila (inclusive).
+            lower (int): Última fila (exclusiva).
+            mode (str): 'RGB' o 'RGBA'; la transparencia solo se conserva en niveles PNG.
+
+        Returns:
+            Image.Image: Franja en el modo indicado.
+        """
+        first, last = upper // self.tile_size, (lower - 1) // self.tile_size
+        if first == last:
+            tile_upper = first * self.tile_size
+            strip = self._tile_row(first).crop((0, upper - tile_upper, self.size[0], lower - tile_upper))
+        else:
+            strip = None
+            for row in range(first, last + 1):
+                tile_row = self._tile_row(row)
+                if strip is None:
+                    strip = Image.new(tile_row.mode, (self.size[0], lower - upper))
+                strip.paste(tile_row, (0, row * self.tile_size - upper))
+        return strip if strip.mode == mode else strip.convert(mode)
+
+    def read_overview(self, scale: int) -> np.ndarray:
+        return None
+
+    def close(self):
+        if self._shards is not None:
+            self._shards.close()
+        self._cached = (None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_strip_reader(image_path: Path):
+    """
+    Abre el lector de franjas de una ortofoto o de un nivel de pirámide.
+
+    Args:
+        image_path (Path): Ruta a la imagen o al directorio level_<k> de una pirámide.
+
+    Returns:
+        StripReader | PyramidLevelReader: Lector con size y read_rows.
+    """
+    return PyramidLevelReader(image_path) if is_pyramid_level(image_path) else StripReader(image_path)
+
+def iter_strips(image_path: Path, tile_size: int = 512, overlap: float = 0.2, windowed: bool = True,
+                keep: set = None):
+    """
+    Genera las franjas decodificadas de una imagen junto con sus celdas de la rejilla.
+
+    Args:
+        image_path (Path): Ruta a la imagen de entrada.
+        tile_size (int): Tamaño de los mosaicos en píxeles.
+        overlap (float): Proporción de traslape entre mosaicos (0 a 1).
+        windowed (bool): Si es True, decodifica solo la franja de cada fila
+            (siempre en un nivel de pirámide).
+        keep (set): Celdas (row, col) a generar; las filas sin celdas no se decodifican.
+
+    Yields:
+        tuple: (strip, strip_upper, cells) donde cells son las tuplas
+        (row, col, left, upper, right, lower) de la fila.
+    """
+    windowed = windowed or is_pyramid_level(image_path)
+    if windowed:
+        reader = open_strip_reader(image_path)
+        width, height = reader.size
+    else:
+        image = Image.open(image_path)
+        image.load()
+        # Igual que read_rows: los mosaicos son RGB aunque la ortofoto tenga transparencia
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        width, height = image.size
+
+    rows = {}
+    for cell in compute_tile_grid(width, height, tile_size, overlap):
+        if keep is None or (cell[0], cell[1]) in keep:
+            rows.setdefault(cell[0], []).append(cell)
+
+    try:
+        for cells in rows.values():
+            upper = cells[0][3]
+            if windowed:
+                yield reader.read_rows(upper, min(upper + tile_size, height)), upper, cells
+            else:
+                yield image, 0, cells
+    finally:
+        if windowed:
+            reader.close()
+
+def iter_tiles(image_path: Path, tile_size: int = 512, overlap: float = 0.2, windowed: bool = True,
+               keep: set = None):
+    """
+    Genera los mosaicos de una imagen en memoria, fila por fila.
+
+    Args:
+        image_path (Path): Ruta a la imagen de entrada.
+        tile_size (int): Tamaño de los mosaicos en píxeles.
+        overlap (float): Proporción de traslape entre mosaicos (0 a 1).
+        windowed (bool): Si es True, decodifica solo la franja de cada fila.
+        keep (set): Celdas (row, col) a generar; por defecto todas.
+
+    Yields:
+        tuple: (row, col, left, upper, tile) con la posición global del mosaico.
+    """
+    for strip, strip_upper, cells in iter_strips(image_path, tile_size, overlap, windowed, keep):
+        for row, col, left, upper, right, lower in cells:
+            yield row, col, left, upper, strip.crop((left, upper - strip_upper, right, lower - strip_upper))
+
+def validity_mask(image_path: Path, scale: int = 16, nodata: int = 0, vegetation_threshold: float = None,
+                  strip_rows: int = 1024, nodata_tolerance: int = 8) -> np.ndarray:
+    """
+    Fracción de píxeles válidos de una ortofoto en una rejilla reducida scale veces.
+
+    Un píxel es válido si no es transparente, si no todas sus bandas están a
+    nodata_tolerance o menos de nodata (la compresión JPEG no conserva el valor
+    exacto de los bordes) y, con vegetation_threshold, si su índice ExG normalizado
+    ((2G - R - B) / (R + G + B)) supera el umbral (descarta suelo desnudo). Con
+    rasterio, o con un JPEG, se lee directamente la versión reducida (ver
+    StripReader.read_overview); si no, se recorre la imagen por franjas de
+    strip_rows filas, lo que en un PNG o TIFF comprimido supone decodificarla completa.
+
+    Args:
+        image_path (Path): Ruta a la ortofoto.
+        scale (int): Factor de reducción.
+        nodata (int): Valor de las bandas en los bordes sin datos (None para no usarlo).
+        vegetation_threshold (float): Umbral de ExG; None para no filtrar suelo desnudo.
+        strip_rows (int): Filas por franja en la lectura con PIL.
+        nodata_tolerance (int): Diferencia máxima con nodata para considerar un píxel sin datos.
+
+    Returns:
+        np.ndarray: Fracción válida (ceil(H / scale), ceil(W / scale)) en float32.
+    """
+    def valid_pixels(rgba: np.ndarray) -> np.ndarray:
+        rgb = rgba[..., :3].astype(np.float32)
+        valid = rgba[..., 3] > 127
+        if nodata is not None:
+            valid &= ~np.all(np.abs(rgb - nodata) <= nodata_tolerance, axis=-1)
+        if vegetation_threshold is not None:
+            r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+            valid &= (2 * g - r - b) / np.maximum(r + g + b, 1) > vegetation_threshold
+        return valid.astype(np.float32)
+
+    with open_strip_reader(image_path) as reader:
+        overview = reader.read_overview(scale)
+        if overview is not None:
+            return valid_pixels(overview)
+
+        width, height = reader.size
+        strip_rows = max(strip_rows // scale, 1) * scale
+        rows = []
+        for upper in range(0, height, strip_rows):
+            lower = min(upper + strip_rows, height)
+            valid = valid_pixels(np.asarray(reader.read_rows(upper, lower, mode='RGBA')))
+            size = (math.ceil(width / scale), math.ceil((lower - upper) / scale))
+            rows.append(cv2.resize(valid, size, interpolation=cv2.INTER_AREA))
+        return np.vstack(rows)
+
+def select_tiles(image_path: Path, tile_size: int = 512, overlap: float = 0.2, min_valid: float = 0.1,
+                 nodata: int = 0, vegetation_threshold: float = None, scale: int = 16,
+                 nodata_tolerance: int = 8) -> list:
+    """
+    Decide qué celdas de la rejilla contienen datos útiles, antes de decodificar los mosaicos.
+
+    Args:
+        image_path (Path): Ruta a la ortofoto.
+        tile_size (int): Tamaño de los mosaicos en píxeles.
+        overlap (float): Proporción de traslape entre mosaicos (0 a 1).
+        min_valid (float): Fracción válida mínima para conservar un mosaico.
+        nodata (int): Valor de las bandas en los bordes sin datos.
+        vegetation_threshold (float): Umbral de ExG para considerar vegetación.
+        scale (int): Factor de reducción de la máscara.
+        nodata_tolerance (int): Diferencia máxima con nodata para considerar un píxel sin datos.
+
+    Returns:
+        list: Un dict por celda con row, col, left, upper, right, lower, valid_fraction y kept.
+    """
+    mask = validity_mask(image_path, scale, nodata, vegetation_threshold, nodata_tolerance=nodata_tolerance)
+    table = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.float64)
+    table[1:, 1:] = mask.cumsum(0).cumsum(1)
+
+    with open_strip_reader(image_path) as reader:
+        width, height = reader.size
+    records = []
+    for row, col, left, upper, right, lower in compute_tile_grid(width, height, tile_size, overlap):
+        x0, y0 = left // scale, upper // scale
+        x1 = min(max(math.ceil(right / scale), x0 + 1), mask.shape[1])
+        y1 = min(max(math.ceil(lower / scale), y0 + 1), mask.shape[0])
+        total = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+        fraction = float(total / max((x1 - x0) * (y1 - y0), 1))
+        records.append({'row': row, 'col': col, 'left': left, 'upper': upper, 'right': right, 'lower': lower,
+                        'valid_fraction': round(fraction, 4), 'kept': fraction >= min_valid})
+    return records
+
+def write_tile_manifest(records: list, path: Path) -> set:
+    """
+    Guarda el manifiesto de mosaicos conservados y omitidos en CSV.
+
+    Args:
+        records (list): Salida de select_tiles.
+        path (Path): Ruta del CSV.
+
+    Returns:
+        set: Celdas (row, col) conservadas.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(records[0]) if records else ['row', 'col', 'kept'])
+        writer.writeheader()
+        writer.writerows(records)
+    return {(r['row'], r['col']) for r in records if r['kept']}
+
+def _save_tile(strip: Image.Image, strip_upper: int, cell: tuple, output):
+    row, col, left, upper, right, lower = cell
+    tile = strip.crop((left, upper - strip_upper, right, lower - strip_upper))
+    if isinstance(output, ShardWriter):
+        output.add_image(f"tile_{row}_{col}.jpg", tile, row=row, col=col, left=left, upper=upper)
+    else:
+        tile.save(output / f"tile_{row}_{col}.jpg")
+
+def create_tiles(image_path: Path, output_dir: Path, tile_size: int = 512, overlap: float = 0.2,
+                 windowed: bool = False, workers: int = 1, min_valid: float = None, nodata: int = 0,
+                 vegetation_threshold: float = None, shards: bool = False, shard_size_mb: float = 256,
+                 nodata_tolerance: int = 8):
     """
     Divide una imagen en mosaicos con un traslape especificado.
 
@@ -12,6 +500,16 @@ def create_tiles(image_path: Path, output_dir: Path, tile_size: int = 512, overl
         output_dir (Path): Directorio de salida para los mosaicos.
         tile_size (int): Tamaño de los mosaicos en píxeles.
         overlap (float): Proporción de traslape entre mosaicos (0 a 1).
+        windowed (bool): Lee la imagen por franjas para acotar la memoria.
+        workers (int): Hilos para recortar y codificar los mosaicos en paralelo.
+        min_valid (float): Si se indica, omite los mosaicos con menos fracción de datos
+            válidos (ver select_tiles) y escribe tiles_manifest.csv.
+        nodata (int): Valor de las bandas en los bordes sin datos.
+        vegetation_threshold (float): Umbral de ExG para omitir suelo desnudo.
+        shards (bool): Escribe los mosaicos en un contenedor de shards (ver tile_shards)
+            en output_dir en lugar de un JPEG por mosaico.
+        shard_size_mb (float): Tamaño máximo de cada shard.
+        nodata_tolerance (int): Diferencia máxima con nodata para considerar un píxel sin datos.
     """
     msg = Printer()
     if not image_path.exists():
@@ -19,30 +517,41 @@ def create_tiles(image_path: Path, output_dir: Path, tile_size: int = 512, overl
         return
 
     output_dir.mkdir(parents=True, exist_ok=True)
+    output = output_dir
+    if shards:
+        output = ShardWriter(output_dir, shard_size_mb, {'source': str(image_path), 'tile_size': tile_size,
+                                                          'overlap': overlap})
 
-    image = Image.open(image_path)
-    width, height = image.size
-
-    step = int(tile_size * (1 - overlap))
-    cols = math.ceil((width - tile_size) / step) + 1
-    rows = math.ceil((height - tile_size) / step) + 1
+    keep = None
+    if min_valid is not None:
+        records = select_tiles(image_path, tile_size, overlap, min_valid, nodata, vegetation_threshold,
+                               nodata_tolerance=nodata_tolerance)
+        keep = write_tile_manifest(records, output_dir / 'tiles_manifest.csv')
+        msg.info(f"Se omiten {len(records) - len(keep)} de {len(records)} mosaicos sin datos o sin vegetación")
 
     tile_count = 0
-    for row in range(rows):
-        for col in range(cols):
-            left = col * step
-            upper = row * step
-            right = min(left + tile_size, width)
-            lower = min(upper + tile_size, height)
-
-            if right <= left or lower <= upper:
-                continue
-
-            tile = image.crop((left, upper, right, lower))
-            tile_name = f"tile_{row}_{col}.jpg"
-            tile_path = output_dir / tile_name
-            tile.save(tile_path)
-            tile_count += 1
+    strips = iter_strips(image_path, tile_size, overlap, windowed, keep)
+    if workers <= 1:
+        for strip, strip_upper, cells in strips:
+            for cell in cells:
+                _save_tile(strip, strip_upper, cell, output)
+                tile_count += 1
+    else:
+        # PIL libera el GIL al codificar JPEG, por lo que los hilos comparten
+        # la franja decodificada sin copiarla entre procesos
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for strip, strip_upper, cells in strips:
+                for cell in cells:
+                    pending.append(executor.submit(_save_tile, strip, strip_upper, cell, output))
+                # Limita los mosaicos en vuelo para no retener muchas franjas en memoria
+                while len(pending) > workers * 4:
+                    pending.popleft().result()
+                    tile_count += 1
+            while pending:
+                pending.popleft().result()
+                tile_count += 1
+    if shards:
+        output.close()
 
     msg.good(f"Se crearon {tile_count} mosaicos en {output_dir}")
-
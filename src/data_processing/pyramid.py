@@ -0,0 +1,237 @@
+import json
+import math
+import shutil
+from pathlib import Path
+import cv2
+import numpy as np
+from PIL import Image
+from wasabi import Printer
+from src.data_processing.ortophoto_utils import PYRAMID_FILE, StripReader
+from src.data_processing.tile_shards import ShardWriter
+from src.inference.geojson import load_georeference
+
+def default_pyramid_dir(image_path: Path) -> Path:
+    """Directorio de la pirámide junto a la ortofoto (ortofoto.tif -> ortofoto.pyramid)."""
+    return Path(image_path).with_suffix('.pyramid')
+
+def downsample_2x(image: np.ndarray) -> np.ndarray:
+    """
+    Reduce una imagen a la mitad promediando bloques de 2×2 píxeles.
+
+    Las dimensiones impares se completan repitiendo la última fila o columna,
+    de modo que el tamaño resultante es ceil(H / 2) × ceil(W / 2).
+
+    Args:
+        image (np.ndarray): Arreglo (H, W, C) uint8.
+
+    Returns:
+        np.ndarray: Arreglo reducido.
+    """
+    height, width = image.shape[:2]
+    if height % 2 or width % 2:
+        image = np.pad(image, ((0, height % 2), (0, width % 2), (0, 0)), mode='edge')
+    # INTER_AREA con factor entero exacto es el promedio de cada bloque
+    return cv2.resize(image, (image.shape[1] // 2, image.shape[0] // 2), interpolation=cv2.INTER_AREA)
+
+class _LevelTiler:
+    """Acumula las filas de un nivel y escribe cada fila completa de mosaicos sin traslape."""
+
+    def __init__(self, output, width: int, tile_size: int, extension: str):
+        self.output = output
+        self.width = width
+        self.tile_size = tile_size
+        self.extension = extension
+        self.buffer = None
+        self.row = 0
+
+    def push(self, rows: np.ndarray):
+        self.buffer = rows if self.buffer is None else np.concatenate([self.buffer, rows])
+        while len(self.buffer) >= self.tile_size:
+            self._write_row(self.buffer[:self.tile_size])
+            self.buffer = self.buffer[self.tile_size:]
+
+    def finish(self):
+        if self.buffer is not None and len(self.buffer):
+            self._write_row(self.buffer)
+        if isinstance(self.output, ShardWriter):
+            self.output.close()
+
+    def _write_row(self, rows: np.ndarray):
+        for col, left in enumerate(range(0, self.width, self.tile_size)):
+            tile = Image.fromarray(np.ascontiguousarray(rows[:, left:left + self.tile_size]))
+            name = f"tile_{self.row}_{col}.{self.extension}"
+            if isinstance(self.output, ShardWriter):
+                self.output.add_image(name, tile, row=self.row, col=col)
+            else:
+                tile.save(self.output / name)
+        self.row += 1
+
+def build_pyramid(image_path: Path, output_dir: Path = None, levels: int = None, tile_size: int = 512,
+                  fmt: str = 'jpg', shards: bool = False, strip_rows: int = 1024, transform: list = None,
+                  world_file: Path = None) -> dict:
+    """
+    Construye niveles reducidos 2×, 4×, 8×... de una ortofoto en una sola pasada por franjas.
+
+    Cada franja de la ortofoto se reduce sucesivamente a la mitad y alimenta a
+    todos los niveles a la vez, por lo que la imagen se decodifica una sola vez.
+    Con rasterio o un TIFF por franjas la memoria depende del ancho y no del
+    alto; con otros formatos StripReader decodifica la imagen completa una vez y
+    la conserva durante la construcción. Como en las overviews de un
+    GeoTIFF, la resolución nativa no se copia: cada nivel k se guarda en
+    output_dir/level_<k> como mosaicos sin traslape de tile_size píxeles
+    (tile_<fila>_<columna>), o en un contenedor de shards. pyramid.json describe
+    el tamaño, la escala y la resolución en el terreno de cada nivel.
+
+    Args:
+        image_path (Path): Ruta a la ortofoto.
+        output_dir (Path): Directorio de la pirámide; por defecto <ortofoto>.pyramid.
+        levels (int): Niveles reducidos; por defecto hasta que el nivel cabe en un mosaico.
+        tile_size (int): Tamaño de los mosaicos de cada nivel.
+        fmt (str): 'jpg', o 'png' para conservar la transparencia.
+        shards (bool): Guarda cada nivel como contenedor de shards (ver tile_shards).
+        strip_rows (int): Filas de la ortofoto por franja; se redondea a un múltiplo de 2^levels.
+        transform (list): Transformación afín de la ortofoto; por defecto su world file o GeoTIFF.
+        world_file (Path): World file de la ortofoto.
+
+    Returns:
+        dict: Contenido de pyramid.json.
+    """
+    msg = Printer()
+    image_path = Path(image_path)
+    output_dir = Path(output_dir) if output_dir else default_pyramid_dir(image_path)
+    transform, crs = load_georeference(image_path, transform, world_file)
+    gsd = math.hypot(transform[0], transform[3]) if transform is not None else None
+    mode = 'RGBA' if fmt == 'png' else 'RGB'
+
+    with StripReader(image_path) as reader:
+        width, height = reader.size
+        if levels is None:
+            levels = max(math.ceil(math.log2(max(width, height) / tile_size)), 1)
+        block = 2 ** levels
+        strip_rows = max(strip_rows // block, 1) * block
+
+        records = [{'level': 0, 'path': None, 'scale': 1, 'width': width, 'height': height, 'gsd': gsd}]
+        tilers = []
+        for level in range(1, levels + 1):
+            level_width, level_height = records[-1]['width'], records[-1]['height']
+            level_width, level_height = math.ceil(level_width / 2), math.ceil(level_height / 2)
+            level_dir = output_dir / f"level_{level}"
+            shutil.rmtree(level_dir, ignore_errors=True)
+            level_dir.mkdir(parents=True)
+            output = ShardWriter(level_dir, metadata={'source': str(image_path), 'level': level}) if shards else level_dir
+            tilers.append(_LevelTiler(output, level_width, tile_size, fmt))
+            records.append({
+                'level': level, 'path': level_dir.name, 'scale': 2 ** level,
+                'width': level_width, 'height': level_height,
+                'rows': math.ceil(level_height / tile_size), 'cols': math.ceil(level_width / tile_size),
+                'gsd': gsd * 2 ** level if gsd is not None else None,
+            })
+
+        for upper in range(0, height, strip_rows):
+            strip = np.asarray(reader.read_rows(upper, min(upper + strip_rows, height), mode=mode))
+            for tiler in tilers:
+                strip = downsample_2x(strip)
+                tiler.push(strip)
+        for tiler in tilers:
+            tiler.finish()
+
+    pyramid = {
+        'source': str(image_path),
+        'tile_size': tile_size,
+        'format': fmt,
+        'shards': shards,
+        'transform': list(transform) if transform is not None else None,
+        'crs': crs,
+        'levels': records,
+    }
+    (output_dir / PYRAMID_FILE).write_text(json.dumps(pyramid, indent=2))
+    msg.good(f"Pirámide de {levels} niveles ({records[-1]['width']}x{records[-1]['height']} px en el último) "
+             f"guardada en {output_dir}")
+    return pyramid
+
+def load_pyramid(pyramid_dir: Path) -> dict:
+    """
+    Lee pyramid.json de una pirámide.
+
+    Args:
+        pyramid_dir (Path): Directorio de la pirámide.
+
+    Returns:
+        dict: Descripción de la pirámide, o None si no existe.
+    """
+    path = Path(pyramid_dir) / PYRAMID_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+def select_level(pyramid: dict, gsd: float = None, level: int = None) -> dict:
+    """
+    Elige el nivel más reducido cuya resolución en el terreno no es más gruesa que gsd.
+
+    Args:
+        pyramid (dict): Contenido de pyramid.json.
+        gsd (float): Resolución objetivo en unidades del mapa por píxel (p. ej. metros).
+        level (int): Nivel fijo; tiene prioridad sobre gsd.
+
+    Returns:
+        dict: Registro del nivel (level, path, scale, width, height, gsd).
+    """
+    levels = pyramid['levels']
+    if level is not None:
+        return levels[min(max(level, 0), len(levels) - 1)]
+    if gsd is None:
+        return levels[0]
+    if levels[0]['gsd'] is None:
+        raise ValueError("La ortofoto no está georreferenciada: indique el nivel en lugar de la resolución")
+    # Tolerancia para no descartar un nivel por redondeo del tamaño de píxel
+    candidates = [record for record in levels if record['gsd'] <= gsd * 1.01]
+    return candidates[-1] if candidates else levels[0]
+
+def scaled_transform(transform: list, scale: int) -> tuple:
+    """
+    Transformación afín de un nivel reducido scale veces.
+
+    Sin georreferenciación devuelve la escala a píxeles de la ortofoto, de modo
+    que las coordenadas siguen en el sistema de la resolución nativa.
+
+    Args:
+        transform (list): Transformación (a, b, c, d, e, f) de la ortofoto, o None.
+        scale (int): Factor de reducción del nivel.
+
+    Returns:
+        tuple: Transformación (a, b, c, d, e, f) del nivel.
+    """
+    a, b, c, d, e, f = transform if transform is not None else (1.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+    return a * scale, b * scale, c, d * scale, e * scale, f
+
+def resolve_level(image_path: Path, gsd: float = None, level: int = None, pyramid_dir: Path = None,
+                  build: bool = True, **build_options) -> tuple:
+    """
+    Ruta de lectura de una ortofoto a la resolución indicada, construyendo la pirámide si falta,
+    si es de otra imagen o si es más antigua que la ortofoto.
+
+    Args:
+        image_path (Path): Ruta a la ortofoto.
+        gsd (float): Resolución objetivo en unidades del mapa por píxel.
+        level (int): Nivel fijo (0 = resolución nativa); tiene prioridad sobre gsd.
+        pyramid_dir (Path): Directorio de la pirámide; por defecto <ortofoto>.pyramid.
+        build (bool): Construye la pirámide si no existe.
+        **build_options: Argumentos de build_pyramid (levels, tile_size, fmt, shards...).
+
+    Returns:
+        tuple: (ruta de la imagen o del nivel, registro del nivel, pyramid.json).
+    """
+    image_path = Path(image_path)
+    pyramid_dir = Path(pyramid_dir) if pyramid_dir else default_pyramid_dir(image_path)
+    pyramid = load_pyramid(pyramid_dir)
+    # Una pirámide de otra imagen o más antigua que la ortofoto se reconstruye
+    if pyramid is not None and (Path(pyramid['source']).resolve() != image_path.resolve()
+                                or image_path.stat().st_mtime > (pyramid_dir / PYRAMID_FILE).stat().st_mtime):
+        pyramid = None
+    if pyramid is None:
+        if not build:
+            raise FileNotFoundError(f"No se encontró la pirámide: {pyramid_dir}")
+        pyramid = build_pyramid(image_path, pyramid_dir, **build_options)
+    record = select_level(pyramid, gsd, level)
+    path = image_path if record['level'] == 0 else pyramid_dir / record['path']
+    return path, record, pyramid
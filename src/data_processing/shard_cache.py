@@ -0,0 +1,213 @@
+import hashlib
+import json
+import math
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import cv2
+import numpy as np
+from src.data_processing.dataset_utils import IMAGE_EXTENSIONS, label_path
+
+META_FILE = 'meta.json'
+
+def split_digest(images: list, imgsz: int) -> str:
+    """
+    Hash de las imágenes y etiquetas de un split (ruta, tamaño y fecha de modificación) y de imgsz.
+
+    Args:
+        images (list): Rutas de las imágenes.
+        imgsz (int): Tamaño de la caché.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    digest = hashlib.sha256(f"{imgsz}\n".encode())
+    for image_path in images:
+        for path in (image_path, label_path(image_path)):
+            if path.exists():
+                stat = path.stat()
+                digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def _read_label_boxes(image_path: Path) -> np.ndarray:
+    """Etiquetas YOLO como arreglo (N, 5) [cls, cx, cy, w, h]; los polígonos se reducen a su caja."""
+    path = label_path(image_path)
+    rows = []
+    if path.exists():
+        for line in path.read_text().splitlines():
+            values = line.split()
+            if len(values) < 5:
+                continue
+            coords = np.array(values[1:], dtype=np.float32)
+            if len(coords) > 4:
+                xs, ys = coords[0::2], coords[1::2]
+                coords = np.array([(xs.min() + xs.max()) / 2, (ys.min() + ys.max()) / 2,
+                                   xs.max() - xs.min(), ys.max() - ys.min()], dtype=np.float32)
+            rows.append([float(values[0]), *coords[:4]])
+    return np.array(rows, dtype=np.float32).reshape(-1, 5)
+
+def _load_resized(image_path: Path, imgsz: int) -> tuple:
+    """
+    Decodifica y redimensiona una imagen con el lado mayor igual a imgsz, como YOLODataset.load_image.
+
+    Returns:
+        tuple: (imagen BGR redimensionada, (alto, ancho) originales).
+    """
+    image = cv2.imread(str(image_path))
+    if image is None:
+        raise ValueError(f"No se pudo leer la imagen: {image_path}")
+    h0, w0 = image.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        image = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+    return image, (h0, w0)
+
+def build_shard_cache(images: list, cache_dir: Path, imgsz: int = 640, shard_size: int = 1024,
+                      workers: int = 8) -> Path:
+    """
+    Decodifica un split una sola vez en shards uint8 mapeables en memoria.
+
+    Cada imagen se redimensiona con el lado mayor igual a imgsz y se guarda en la
+    esquina superior izquierda de una ranura fija imgsz × imgsz (el resto con
+    relleno 114), de modo que las etiquetas normalizadas siguen siendo válidas.
+    Junto a los shards se guardan el índice de etiquetas (labels.npy con
+    [cls, cx, cy, w, h] y label_offsets.npy), los tamaños y la lista de archivos.
+
+    Args:
+        images (list): Rutas de las imágenes del split.
+        cache_dir (Path): Directorio de la caché del split.
+        imgsz (int): Tamaño de entrenamiento.
+        shard_size (int): Imágenes por shard.
+        workers (int): Hilos de decodificación.
+
+    Returns:
+        Path: Directorio de la caché.
+    """
+    cache_dir = Path(cache_dir)
+    tmp_dir = cache_dir.with_name(cache_dir.name + '.tmp')
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    shapes = np.zeros((len(images), 4), dtype=np.int32)
+    shards = []
+    for start in range(0, len(images), shard_size):
+        count = min(shard_size, len(images) - start)
+        shard = np.lib.format.open_memmap(tmp_dir / f"shard_{len(shards):05d}.npy", mode='w+', dtype=np.uint8,
+                                          shape=(count, imgsz, imgsz, 3))
+        shards.append(shard)
+
+    def store(index: int):
+        image, (h0, w0) = _load_resized(images[index], imgsz)
+        h, w = image.shape[:2]
+        slot = shards[index // shard_size][index % shard_size]
+        slot[:h, :w] = image
+        slot[h:, :] = 114
+        slot[:h, w:] = 114
+        shapes[index] = (h0, w0, h, w)
+        return _read_label_boxes(images[index])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        labels = list(executor.map(store, range(len(images))))
+    for shard in shards:
+        shard.flush()
+    del shards
+
+    offsets = np.zeros(len(images) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(boxes) for boxes in labels])
+    np.save(tmp_dir / 'labels.npy', np.concatenate(labels) if labels else np.zeros((0, 5), np.float32))
+    np.save(tmp_dir / 'label_offsets.npy', offsets)
+    np.save(tmp_dir / 'shapes.npy', shapes)
+    with open(tmp_dir / META_FILE, 'w') as file:
+        json.dump({
+            'imgsz': imgsz,
+            'shard_size': shard_size,
+            'count': len(images),
+            'digest': split_digest(images, imgsz),
+            'files': [str(path) for path in images],
+        }, file)
+
+    if cache_dir.exists():
+        shutil.rmtree(cache_dir)
+    tmp_dir.rename(cache_dir)
+    return cache_dir
+
+class ShardCache:
+    """
+    Lector sin copias de una caché de shards.
+
+    Los shards se abren con np.load(mmap_mode='r'): image() devuelve una vista
+    de solo lectura sobre el archivo mapeado, y el sistema operativo comparte las
+    páginas entre los workers del DataLoader.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        with open(self.cache_dir / META_FILE, 'r') as file:
+            self.meta = json.load(file)
+        self.imgsz = self.meta['imgsz']
+        self.shard_size = self.meta['shard_size']
+        self.files = self.meta['files']
+        self.slots = {path: index for index, path in enumerate(self.files)}
+        self.shapes = np.load(self.cache_dir / 'shapes.npy')
+        self.labels = np.load(self.cache_dir / 'labels.npy', mmap_mode='r')
+        self.label_offsets = np.load(self.cache_dir / 'label_offsets.npy')
+        self.shards = [np.load(path, mmap_mode='r') for path in sorted(self.cache_dir.glob('shard_*.npy'))]
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def find(self, image_path) -> int:
+        """Índice de una imagen en la caché, o None si no está."""
+        index = self.slots.get(str(image_path))
+        return index if index is not None else self.slots.get(str(Path(image_path).resolve()))
+
+    def image(self, index: int) -> tuple:
+        """
+        Imagen redimensionada de la caché.
+
+        Args:
+            index (int): Índice de la imagen.
+
+        Returns:
+            tuple: (vista BGR (h, w, 3), (alto, ancho) originales, (alto, ancho) redimensionados).
+        """
+        h0, w0, h, w = self.shapes[index]
+        slot = self.shards[index // self.shard_size][index % self.shard_size]
+        return slot[:h, :w], (int(h0), int(w0)), (int(h), int(w))
+
+    def image_labels(self, index: int) -> np.ndarray:
+        """Etiquetas (N, 5) [cls, cx, cy, w, h] de una imagen."""
+        return self.labels[self.label_offsets[index]:self.label_offsets[index + 1]]
+
+def ensure_shard_cache(images_dir: Path, cache_root: Path, imgsz: int = 640, shard_size: int = 1024,
+                       workers: int = 8, log=print) -> Path:
+    """
+    Devuelve la caché de un directorio de imágenes, reconstruyéndola solo si cambiaron los archivos o imgsz.
+
+    Args:
+        images_dir (Path): Directorio de imágenes del split.
+        cache_root (Path): Directorio raíz de las cachés.
+        imgsz (int): Tamaño de entrenamiento.
+        shard_size (int): Imágenes por shard.
+        workers (int): Hilos de decodificación.
+        log (callable): Función para reportar el progreso.
+
+    Returns:
+        Path: Directorio de la caché del split.
+    """
+    images_dir = Path(images_dir).resolve()
+    images = sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    key = hashlib.sha256(str(images_dir).encode()).hexdigest()[:16]
+    cache_dir = Path(cache_root) / f"{images_dir.parent.name}_{images_dir.name}_{key}_{imgsz}"
+
+    meta_path = cache_dir / META_FILE
+    if meta_path.exists():
+        with open(meta_path, 'r') as file:
+            if json.load(file).get('digest') == split_digest(images, imgsz):
+                log(f"Shard cache up to date: {cache_dir}")
+                return cache_dir
+
+    log(f"Building shard cache for {len(images)} images in {images_dir} -> {cache_dir}")
+    return build_shard_cache(images, cache_dir, imgsz, shard_size, workers)
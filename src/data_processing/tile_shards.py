@@ -0,0 +1,402 @@
+import io
+import json
+import mmap
+import re
+import shutil
+import threading
+from pathlib import Path
+import cv2
+import numpy as np
+from PIL import Image
+from src.data_processing.dataset_utils import IMAGE_EXTENSIONS, label_path, load_data_yaml, split_dir
+
+INDEX_FILE = 'index.jsonl'
+CONTAINER_FILE = 'container.json'
+SHARD_PATTERN = 'shard_{:05d}.bin'
+FORMAT_VERSION = 1
+
+# Metadatos que se deducen del nombre de los archivos que escriben create_tiles y extract_frames
+NAME_PATTERNS = (
+    (re.compile(r'^tile_(\d+)_(\d+)$'), ('row', 'col')),
+    (re.compile(r'^frame_(\d+)$'), ('frame',)),
+)
+
+def is_container(path: Path) -> bool:
+    """Indica si la ruta es un contenedor de shards (directorio con index.jsonl)."""
+    path = Path(path)
+    return path.is_dir() and (path / INDEX_FILE).exists()
+
+def dataset_uses_containers(data_yaml: Path) -> bool:
+    """
+    Indica si algún split del data.yaml apunta a un contenedor de shards.
+
+    Args:
+        data_yaml (Path): Ruta al data.yaml.
+
+    Returns:
+        bool: True si train, val o test es un contenedor.
+    """
+    data = load_data_yaml(data_yaml)
+    return any(data.get(split) and is_container(split_dir(data_yaml, split)) for split in ('train', 'val', 'test'))
+
+def name_metadata(name: str) -> dict:
+    """
+    Metadatos de fila/columna o índice de frame a partir del nombre de un mosaico o frame.
+
+    Args:
+        name (str): Nombre del archivo (p. ej. 'tile_3_7.jpg' o 'frame_000120.jpg').
+
+    Returns:
+        dict: {'row', 'col'}, {'frame'} o vacío.
+    """
+    stem = Path(name).stem
+    for pattern, keys in NAME_PATTERNS:
+        match = pattern.match(stem)
+        if match:
+            return dict(zip(keys, map(int, match.groups())))
+    return {}
+
+def read_index(root: Path) -> list:
+    """
+    Lee los registros del índice de un contenedor.
+
+    Una línea final incompleta (escritura interrumpida) se ignora.
+
+    Args:
+        root (Path): Directorio del contenedor.
+
+    Returns:
+        list: Registros {'name', 'shard', 'offset', 'length', ...metadatos}.
+    """
+    records = []
+    with open(Path(root) / INDEX_FILE, 'r') as file:
+        for line in file:
+            if not line.endswith('\n'):
+                break
+            records.append(json.loads(line))
+    return records
+
+def encode_image(image, name: str) -> bytes:
+    """
+    Codifica una imagen PIL o un arreglo BGR de OpenCV en el formato de la extensión del nombre.
+
+    Usa la calidad por defecto de cada biblioteca, igual que Image.save y cv2.imwrite
+    al escribir archivos sueltos.
+
+    Args:
+        image (PIL.Image.Image | np.ndarray): Imagen a codificar.
+        name (str): Nombre del registro; su extensión define el formato.
+
+    Returns:
+        bytes: Imagen codificada.
+    """
+    suffix = Path(name).suffix.lower() or '.jpg'
+    if isinstance(image, Image.Image):
+        buffer = io.BytesIO()
+        image.save(buffer, format=Image.registered_extensions()[suffix])
+        return buffer.getvalue()
+    ok, encoded = cv2.imencode(suffix, image)
+    if not ok:
+        raise ValueError(f"No se pudo codificar la imagen: {name}")
+    return encoded.tobytes()
+
+class ShardWriter:
+    """
+    Escribe imágenes codificadas en shards de solo anexado con un índice de desplazamientos.
+
+    Cada registro se escribe primero en el shard y después en index.jsonl, de modo
+    que el índice nunca apunta a datos incompletos. Al reabrir un contenedor se
+    descartan los bytes posteriores al último registro indexado y se sigue
+    anexando. add() es seguro entre hilos; la codificación de add_image se hace
+    fuera del candado para que varios hilos codifiquen en paralelo.
+    """
+
+    def __init__(self, root: Path, shard_size_mb: float = 256, metadata: dict = None):
+        """
+        Args:
+            root (Path): Directorio del contenedor; se crea si no existe.
+            shard_size_mb (float): Tamaño a partir del cual se abre un nuevo shard.
+            metadata (dict): Metadatos del contenedor (origen, tamaño de mosaico...) para container.json.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.shard_size = int(shard_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+        container_path = self.root / CONTAINER_FILE
+        container = json.loads(container_path.read_text()) if container_path.exists() else {}
+        container.update({'format': 'tile-shards', 'version': FORMAT_VERSION, **(metadata or {})})
+        container_path.write_text(json.dumps(container, indent=2))
+
+        records = read_index(self.root) if (self.root / INDEX_FILE).exists() else []
+        self.names = {record['name'] for record in records}
+        self._shard = records[-1]['shard'] if records else 0
+        end = records[-1]['offset'] + records[-1]['length'] if records else 0
+
+        # Recorta una escritura interrumpida: datos sin registro o registro sin salto de línea
+        self._index = open(self.root / INDEX_FILE, 'ab')
+        self._index.truncate((self.root / INDEX_FILE).read_bytes().rfind(b'\n') + 1)
+        self._data = open(self.root / SHARD_PATTERN.format(self._shard), 'ab')
+        self._data.truncate(end)
+        self._offset = end
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, name: str, data: bytes, **meta) -> dict:
+        """
+        Anexa una imagen ya codificada.
+
+        Args:
+            name (str): Nombre único del registro (p. ej. 'tile_3_7.jpg').
+            data (bytes): Imagen codificada.
+            **meta: Metadatos del registro (row/col, frame, shape, label...).
+
+        Returns:
+            dict: Registro escrito en el índice.
+        """
+        with self._lock:
+            if name in self.names:
+                raise ValueError(f"El registro ya existe en {self.root}: {name}")
+            if self._offset > 0 and self._offset + len(data) > self.shard_size:
+                self._data.close()
+                self._shard += 1
+                # 'wb': descarta un shard huérfano de una escritura interrumpida
+                self._data = open(self.root / SHARD_PATTERN.format(self._shard), 'wb')
+                self._offset = 0
+            self._data.write(data)
+            self._data.flush()
+            record = {'name': name, 'shard': self._shard, 'offset': self._offset, 'length': len(data), **meta}
+            self._index.write((json.dumps(record) + '\n').encode())
+            self._index.flush()
+            self._offset += len(data)
+            self.names.add(name)
+            return record
+
+    def add_image(self, name: str, image, **meta) -> dict:
+        """
+        Codifica y anexa una imagen PIL o un arreglo BGR; guarda su tamaño como 'shape' [alto, ancho].
+
+        Args:
+            name (str): Nombre único del registro.
+            image (PIL.Image.Image | np.ndarray): Imagen a guardar.
+            **meta: Metadatos del registro.
+
+        Returns:
+            dict: Registro escrito en el índice.
+        """
+        shape = [image.height, image.width] if isinstance(image, Image.Image) else list(image.shape[:2])
+        return self.add(name, encode_image(image, name), shape=shape, **meta)
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+class ShardReader:
+    """
+    Lectura de un contenedor de shards: acceso aleatorio con mmap o recorrido secuencial.
+
+    Los mapas de memoria se abren al primer acceso a cada shard y no se copian al
+    serializar el lector, por lo que puede pasarse a los workers de un DataLoader.
+    """
+
+    def __init__(self, root: Path):
+        """
+        Args:
+            root (Path): Directorio del contenedor.
+        """
+        self.root = Path(root)
+        if not is_container(self.root):
+            raise FileNotFoundError(f"No es un contenedor de shards: {self.root}")
+        self.records = read_index(self.root)
+        self.names = [record['name'] for record in self.records]
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        container_path = self.root / CONTAINER_FILE
+        self.metadata = json.loads(container_path.read_text()) if container_path.exists() else {}
+        self._maps = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_maps'] = {}
+        return state
+
+    def _map(self, shard: int) -> mmap.mmap:
+        if shard not in self._maps:
+            with open(self.root / SHARD_PATTERN.format(shard), 'rb') as file:
+                self._maps[shard] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[shard]
+
+    def find(self, name: str) -> int:
+        """Posición de un registro por nombre, o None si no existe."""
+        return self._positions.get(name)
+
+    def read_bytes(self, index: int) -> memoryview:
+        """
+        Bytes codificados de un registro, sin copiarlos del mapa de memoria.
+
+        Args:
+            index (int): Posición del registro.
+
+        Returns:
+            memoryview: Vista de los bytes del registro.
+        """
+        record = self.records[index]
+        return memoryview(self._map(record['shard']))[record['offset']:record['offset'] + record['length']]
+
+    def read_image(self, index: int, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+        """
+        Decodifica un registro como arreglo BGR, igual que cv2.imread.
+
+        Args:
+            index (int): Posición del registro.
+            flags (int): Bandera de cv2.imdecode.
+
+        Returns:
+            np.ndarray: Imagen decodificada.
+        """
+        image = cv2.imdecode(np.frombuffer(self.read_bytes(index), dtype=np.uint8), flags)
+        if image is None:
+            raise ValueError(f"No se pudo decodificar {self.names[index]} de {self.root}")
+        return image
+
+    def __iter__(self):
+        """
+        Recorre los registros en orden de escritura con lecturas secuenciales, sin mmap.
+
+        Yields:
+            tuple: (registro, bytes codificados).
+        """
+        file, shard = None, None
+        try:
+            for record in self.records:
+                if record['shard'] != shard:
+                    if file is not None:
+                        file.close()
+                    shard = record['shard']
+                    file = open(self.root / SHARD_PATTERN.format(shard), 'rb')
+                file.seek(record['offset'])
+                yield record, file.read(record['length'])
+        finally:
+            if file is not None:
+                file.close()
+
+    def iter_images(self, flags: int = cv2.IMREAD_COLOR):
+        """
+        Recorre los registros decodificados en orden de escritura.
+
+        Yields:
+            tuple: (registro, imagen BGR).
+        """
+        for record, data in self:
+            yield record, cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+
+    def close(self):
+        for shard_map in self._maps.values():
+            shard_map.close()
+        self._maps = {}
+
+def pack_directory(image_dir: Path, root: Path, shard_size_mb: float = 256, labels_dir: Path = None) -> int:
+    """
+    Convierte un directorio de imágenes (mosaicos, frames o un split YOLO) en un contenedor.
+
+    Los bytes se copian sin recodificar. La fila/columna o el índice de frame se
+    deducen del nombre, y si existe la etiqueta YOLO de la imagen (labels_dir, o
+    la carpeta labels hermana de images) su texto se guarda en 'label'. Los demás
+    archivos del directorio (tiles_manifest.csv, frames.csv) se copian a la raíz
+    del contenedor.
+
+    Args:
+        image_dir (Path): Directorio de origen.
+        root (Path): Directorio del contenedor.
+        shard_size_mb (float): Tamaño máximo de cada shard.
+        labels_dir (Path): Directorio de etiquetas; por defecto el de dataset_utils.label_path.
+
+    Returns:
+        int: Imágenes anexadas (las que ya estaban en el contenedor se omiten).
+    """
+    image_dir = Path(image_dir)
+    count = 0
+    with ShardWriter(root, shard_size_mb, {'source': str(image_dir)}) as writer:
+        for path in sorted(p for p in image_dir.iterdir() if p.is_file()):
+            if path.suffix.lower() not in IMAGE_EXTENSIONS:
+                shutil.copy2(path, writer.root / path.name)
+                continue
+            if path.name in writer.names:
+                continue
+            meta = name_metadata(path.name)
+            with Image.open(path) as image:
+                meta['shape'] = [image.height, image.width]
+            label = Path(labels_dir) / f"{path.stem}.txt" if labels_dir else label_path(path)
+            if label.exists():
+                meta['label'] = label.read_text()
+            writer.add(path.name, path.read_bytes(), **meta)
+            count += 1
+    return count
+
+def unpack_shards(root: Path, output_dir: Path, labels_dir: Path = None) -> int:
+    """
+    Convierte un contenedor al formato de directorio de archivos sueltos.
+
+    Las etiquetas guardadas se escriben en labels_dir, o en la carpeta labels
+    hermana si output_dir se llama 'images' (estructura YOLO).
+
+    Args:
+        root (Path): Directorio del contenedor.
+        output_dir (Path): Directorio de salida de las imágenes.
+        labels_dir (Path): Directorio de salida de las etiquetas.
+
+    Returns:
+        int: Imágenes escritas.
+    """
+    reader = ShardReader(root)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if labels_dir is None and output_dir.name == 'images':
+        labels_dir = output_dir.parent / 'labels'
+
+    for path in reader.root.iterdir():
+        if path.is_file() and path.name not in (INDEX_FILE, CONTAINER_FILE) and path.suffix != '.bin':
+            shutil.copy2(path, output_dir / path.name)
+
+    count = 0
+    for record, data in reader:
+        (output_dir / record['name']).write_bytes(data)
+        if labels_dir is not None and 'label' in record:
+            Path(labels_dir).mkdir(parents=True, exist_ok=True)
+            (Path(labels_dir) / f"{Path(record['name']).stem}.txt").write_text(record['label'])
+        count += 1
+    return count
+
+def parse_label_text(text: str) -> tuple:
+    """
+    Etiquetas YOLO de un registro en el formato de las etiquetas de Ultralytics.
+
+    Si alguna fila es un polígono, todas se tratan como segmentos y la caja es la
+    envolvente, como hace Ultralytics al verificar las etiquetas.
+
+    Args:
+        text (str): Contenido del .txt de etiquetas.
+
+    Returns:
+        tuple: (clases (N, 1), cajas (N, 4) [cx, cy, w, h], lista de segmentos (K, 2)).
+    """
+    rows = [line.split() for line in text.splitlines() if len(line.split()) >= 5]
+    classes = np.array([[float(row[0])] for row in rows], dtype=np.float32).reshape(-1, 1)
+    coords = [np.array(row[1:], dtype=np.float32) for row in rows]
+    segments = []
+    # Como en Ultralytics, la prueba es sobre la fila completa (clase incluida)
+    if any(len(row) > 6 for row in rows):
+        segments = [c[:len(c) // 2 * 2].reshape(-1, 2) for c in coords]
+        boxes = [np.concatenate([(s.min(0) + s.max(0)) / 2, s.max(0) - s.min(0)]) for s in segments]
+    else:
+        boxes = [c[:4] for c in coords]
+    return classes, np.array(boxes, dtype=np.float32).reshape(-1, 4), segments
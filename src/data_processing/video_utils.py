@@ -1,15 +1,194 @@
+import csv
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 from pathlib import Path
 from wasabi import Printer
+from src.data_processing.tile_shards import ShardWriter
 
-def extract_frames(video_path: Path, output_dir: Path, frame_interval: int = 30):
+# A partir de este intervalo (en frames) conviene buscar el frame en lugar de avanzar con grab()
+SEEK_MIN_INTERVAL = 300
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.m4v'}
+
+def _target_frames(frame_interval: int, interval_seconds: float, fps: float):
+    """Genera los índices de frame a conservar, estrictamente crecientes."""
+    if interval_seconds and fps > 0:
+        last = -1
+        for k in itertools.count():
+            idx = round(k * interval_seconds * fps)
+            if idx > last:
+                last = idx
+                yield idx
+    else:
+        yield from itertools.count(0, max(frame_interval, 1))
+
+def iter_frames(cap: cv2.VideoCapture, frame_interval: int = 30, interval_seconds: float = None,
+                mode: str = 'auto'):
     """
-    Extrae frames de un video y los guarda en un directorio.
+    Genera los frames muestreados de un video abierto.
+
+    Args:
+        cap (cv2.VideoCapture): Video abierto y posicionado al inicio.
+        frame_interval (int): Intervalo de frames para guardar.
+        interval_seconds (float): Intervalo en segundos; tiene prioridad sobre frame_interval.
+        mode (str): 'read' decodifica todos los frames, 'grab' avanza sin decodificar
+            los descartados, 'seek' salta directamente a cada frame y 'auto' elige
+            entre 'grab' y 'seek' según el intervalo.
+
+    Yields:
+        tuple: (idx, frame) con el índice real del frame en el video.
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    targets = _target_frames(frame_interval, interval_seconds, fps)
+
+    if mode == 'auto':
+        step = interval_seconds * fps if interval_seconds and fps > 0 else frame_interval
+        mode = 'seek' if step >= SEEK_MIN_INTERVAL else 'grab'
+
+    if mode == 'seek':
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for idx in targets:
+            if total > 0 and idx >= total:
+                break
+            # OpenCV busca el keyframe previo y decodifica hasta el frame exacto
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield idx, frame
+        return
+
+    next_target = next(targets)
+    for frame_count in itertools.count():
+        if mode == 'read':
+            ret, frame = cap.read()
+        else:
+            ret = cap.grab()
+        if not ret:
+            break
+
+        if frame_count == next_target:
+            if mode != 'read':
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+            yield frame_count, frame
+            next_target = next(targets)
+
+def _thumbnail(frame, width: int):
+    """Miniatura en escala de grises, suavizada para que el ruido no cuente como cambio."""
+    height = max(round(frame.shape[0] * width / frame.shape[1]), 1)
+    gray = cv2.cvtColor(cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+    return cv2.GaussianBlur(gray, (3, 3), 0)
+
+def iter_keyframes(cap: cv2.VideoCapture, threshold: float = 0.08, min_gap: int = 5, max_gap: int = 150,
+                   probe_step: int = 2, thumb_width: int = 64):
+    """
+    Genera frames solo cuando la escena cambió lo suficiente desde el último emitido.
+
+    El cambio se mide como la diferencia absoluta media (0 a 1) entre miniaturas
+    en gris. Los frames dentro de min_gap se saltan con grab() sin decodificar y
+    solo se decodifica uno de cada probe_step frames para evaluarlo. OpenCV no
+    decodifica a resolución reducida, así que cada evaluación cuesta un
+    retrieve() completo aunque solo se use la miniatura: con probe_step = 1 el
+    costo se acerca al de leer todo el video, y un probe_step mayor lo reduce a
+    cambio de detectar los cambios con más retraso.
+
+    Args:
+        cap (cv2.VideoCapture): Video abierto y posicionado al inicio.
+        threshold (float): Cambio mínimo para emitir un frame.
+        min_gap (int): Frames mínimos entre dos frames emitidos.
+        max_gap (int): Se emite un frame al llegar a este intervalo aunque no haya cambio.
+        probe_step (int): Cada cuántos frames se evalúa el cambio.
+        thumb_width (int): Ancho de la miniatura usada para medir el cambio.
+
+    Yields:
+        tuple: (idx, frame, score, reason) con reason 'first', 'change' o 'max_gap'.
+    """
+    reference = None
+    last_idx = 0
+    for idx in itertools.count():
+        if not cap.grab():
+            break
+
+        gap = idx - last_idx
+        if reference is not None:
+            if gap < min_gap:
+                continue
+            if gap < max_gap and (gap - min_gap) % max(probe_step, 1):
+                continue
+
+        ret, frame = cap.retrieve()
+        if not ret:
+            break
+        thumb = _thumbnail(frame, thumb_width)
+
+        if reference is None:
+            score, reason = 1.0, 'first'
+        else:
+            score = float(cv2.absdiff(thumb, reference).mean()) / 255.0
+            if score >= threshold:
+                reason = 'change'
+            elif gap >= max_gap:
+                reason = 'max_gap'
+            else:
+                continue
+
+        reference = thumb
+        last_idx = idx
+        yield idx, frame, score, reason
+
+def extract_keyframes_from_dir(video_dir: Path, output_dir: Path, threshold: float = 0.08, min_gap: int = 5,
+                               max_gap: int = 150, probe_step: int = 2, workers: int = 2, shards: bool = False,
+                               shard_size_mb: float = 256):
+    """
+    Extrae frames adaptativos de todos los videos de un directorio, uno por subdirectorio de salida.
+
+    Args:
+        video_dir (Path): Directorio con los videos.
+        output_dir (Path): Directorio de salida; cada video escribe en output_dir/<nombre>.
+        threshold (float): Cambio mínimo (0 a 1) para emitir un frame.
+        min_gap (int): Frames mínimos entre dos frames emitidos.
+        max_gap (int): Frames máximos entre dos frames emitidos.
+        probe_step (int): Cada cuántos frames se evalúa el cambio.
+        workers (int): Videos procesados simultáneamente.
+        shards (bool): Escribe los frames de cada video en un contenedor de shards en su directorio.
+        shard_size_mb (float): Tamaño máximo de cada shard.
+    """
+    msg = Printer()
+    videos = sorted(p for p in video_dir.iterdir() if p.suffix.lower() in VIDEO_EXTENSIONS)
+    if not videos:
+        msg.fail(f"No se encontraron videos en: {video_dir}")
+        return
+
+    # OpenCV libera el GIL al decodificar, por lo que los videos avanzan en paralelo con hilos
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = [executor.submit(extract_keyframes, video_path, output_dir / video_path.stem, threshold,
+                                   min_gap, max_gap, probe_step, shards, shard_size_mb)
+                   for video_path in videos]
+        for future in futures:
+            future.result()
+    msg.good(f"Se procesaron {len(videos)} videos en {output_dir}")
+
+def extract_keyframes(video_path: Path, output_dir: Path, threshold: float = 0.08, min_gap: int = 5,
+                      max_gap: int = 150, probe_step: int = 2, shards: bool = False, shard_size_mb: float = 256):
+    """
+    Extrae frames con muestreo adaptativo al movimiento y escribe frames.csv con los índices y puntajes.
 
     Args:
         video_path (Path): Ruta al archivo de video.
         output_dir (Path): Directorio de salida para los frames.
-        frame_interval (int): Intervalo de frames para guardar.
+        threshold (float): Cambio mínimo (0 a 1) para emitir un frame.
+        min_gap (int): Frames mínimos entre dos frames emitidos.
+        max_gap (int): Frames máximos entre dos frames emitidos.
+        probe_step (int): Cada cuántos frames se evalúa el cambio.
+        shards (bool): Escribe los frames en un contenedor de shards (ver tile_shards) en output_dir
+            en lugar de un JPEG por frame; frames.csv se escribe igual.
+        shard_size_mb (float): Tamaño máximo de cada shard.
     """
     msg = Printer()
     if not video_path.exists():
@@ -22,21 +201,245 @@ def extract_frames(video_path: Path, output_dir: Path, frame_interval: int = 30)
         msg.fail(f"No se pudo abrir el archivo de video: {video_path}")
         return
 
-    frame_count = 0
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    output = ShardWriter(output_dir, shard_size_mb, {'source': str(video_path)}) if shards else output_dir
     saved_frames = 0
+    with open(output_dir / 'frames.csv', 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['frame', 'time_s', 'score', 'reason'])
+        for frame_idx, frame, score, reason in iter_keyframes(cap, threshold, min_gap, max_gap, probe_step):
+            _write_frame(output, frame_idx, frame)
+            time_s = frame_idx / fps if fps > 0 else 0.0
+            writer.writerow([frame_idx, f"{time_s:.3f}", f"{score:.4f}", reason])
+            saved_frames += 1
+
+    cap.release()
+    if shards:
+        output.close()
+    msg.good(f"Se guardaron {saved_frames} frames adaptativos en {output_dir}")
+
+class StageStats:
+    """Contador de elementos y tiempo ocupado de una etapa del pipeline."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items: int, seconds: float):
+        with self._lock:
+            self.items += items
+            self.busy += seconds
+
+    def summary(self, elapsed: float) -> str:
+        rate = self.items / elapsed if elapsed > 0 else 0.0
+        capacity = self.items / self.busy if self.busy > 0 else 0.0
+        return (f"{self.name}: {self.items} frames, {rate:.1f} frames/s "
+                f"({capacity:.1f} frames/s por hilo, {self.busy:.1f} s ocupados)")
+
+def _imwrite(path: Path, frame):
+    """cv2.imwrite que falla con OSError en lugar de devolver False (disco lleno, ruta inválida...)."""
+    if not cv2.imwrite(str(path), frame):
+        raise OSError(f"No se pudo escribir el frame: {path}")
+
+def _write_frame(output, frame_idx: int, frame):
+    """Escribe un frame como JPEG en un directorio o lo anexa a un contenedor de shards."""
+    frame_name = f"frame_{frame_idx:06d}.jpg"
+    if isinstance(output, ShardWriter):
+        output.add_image(frame_name, frame, frame=frame_idx)
+    else:
+        _imwrite(output / frame_name, frame)
+
+def _decode_video(video_path: Path, output, frame_queue: queue.Queue, stats: StageStats,
+                  frame_interval: int, interval_seconds: float, mode: str, stop: threading.Event):
+    """Productor: decodifica los frames muestreados y los encola para codificar hasta que se activa stop."""
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        Printer().fail(f"No se pudo abrir el archivo de video: {video_path}")
+        return
+    if not isinstance(output, ShardWriter):
+        output.mkdir(parents=True, exist_ok=True)
+
+    frames = iter_frames(cap, frame_interval, interval_seconds, mode)
+    while not stop.is_set():
+        start = time.perf_counter()
+        item = next(frames, None)
+        stats.add(item is not None, time.perf_counter() - start)
+        if item is None:
+            break
+        frame_idx, frame = item
+        # put() bloquea cuando la cola está llena: contrapresión sobre el decodificador
+        frame_queue.put((output, frame_idx, frame))
+    cap.release()
+
+def _encode_frames(frame_queue: queue.Queue, stats: StageStats, stop: threading.Event, errors: list):
+    """
+    Consumidor: codifica a JPEG y escribe cada frame hasta recibir None.
+
+    Un error se guarda en errors y activa stop; el hilo sigue vaciando la cola
+    sin escribir para que ningún productor quede bloqueado en put().
+    """
     while True:
-        ret, frame = cap.read()
-        if not ret:
+        item = frame_queue.get()
+        if item is None:
             break
+        if stop.is_set():
+            continue
+        start = time.perf_counter()
+        try:
+            _write_frame(*item)
+        except Exception as error:
+            errors.append(error)
+            stop.set()
+            continue
+        stats.add(1, time.perf_counter() - start)
 
-        if frame_count % frame_interval == 0:
-            frame_name = f"frame_{frame_count:06d}.jpg"
-            frame_path = output_dir / frame_name
-            cv2.imwrite(str(frame_path), frame)
-            saved_frames += 1
+def run_extraction_pipeline(jobs: list, frame_interval: int = 30, interval_seconds: float = None,
+                            mode: str = 'auto', decode_workers: int = 1, encode_workers: int = 4,
+                            queue_size: int = 64, shards: bool = False, shard_size_mb: float = 256) -> tuple:
+    """
+    Extrae frames de varios videos con etapas de decodificación y codificación en paralelo.
+
+    Cada video se decodifica en su propio hilo y alimenta una cola acotada que
+    consume un grupo de hilos codificadores; OpenCV libera el GIL al decodificar
+    y al codificar JPEG. La cola acotada mantiene la memoria en queue_size frames.
+    Si un codificador falla se detienen los decodificadores y el error se relanza.
+
+    Args:
+        jobs (list): Tuplas (video_path, output_dir).
+        frame_interval (int): Intervalo de frames para guardar.
+        interval_seconds (float): Intervalo en segundos; tiene prioridad sobre frame_interval.
+        mode (str): Estrategia de muestreo: 'auto', 'grab', 'seek' o 'read'.
+        decode_workers (int): Videos decodificados simultáneamente.
+        encode_workers (int): Hilos que codifican y escriben frames.
+        queue_size (int): Máximo de frames decodificados en espera.
+        shards (bool): Escribe los frames de cada video en un contenedor de shards en su output_dir.
+        shard_size_mb (float): Tamaño máximo de cada shard.
+
+    Returns:
+        tuple: (decode_stats, encode_stats, elapsed) de la ejecución.
+
+    Raises:
+        OSError: Si no se pudo escribir un frame.
+    """
+    if shards:
+        jobs = [(video_path, ShardWriter(output_dir, shard_size_mb, {'source': str(video_path)}))
+                for video_path, output_dir in jobs]
+    frame_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    decode_stats = StageStats("decodificación")
+    encode_stats = StageStats("codificación")
+    start = time.perf_counter()
+
+    encoders = [threading.Thread(target=_encode_frames, args=(frame_queue, encode_stats, stop, errors), daemon=True)
+                for _ in range(max(encode_workers, 1))]
+    for encoder in encoders:
+        encoder.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(decode_workers, 1)) as executor:
+            futures = [executor.submit(_decode_video, video_path, output_dir, frame_queue, decode_stats,
+                                       frame_interval, interval_seconds, mode, stop)
+                       for video_path, output_dir in jobs]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                stop.set()
+                raise
+    finally:
+        for _ in encoders:
+            frame_queue.put(None)
+        for encoder in encoders:
+            encoder.join()
+        for _, output in jobs:
+            if isinstance(output, ShardWriter):
+                output.close()
+
+    if errors:
+        raise errors[0]
+    return decode_stats, encode_stats, time.perf_counter() - start
+
+def extract_frames_from_dir(video_dir: Path, output_dir: Path, frame_interval: int = 30,
+                            interval_seconds: float = None, mode: str = 'auto', decode_workers: int = 2,
+                            encode_workers: int = 4, queue_size: int = 64, shards: bool = False,
+                            shard_size_mb: float = 256):
+    """
+    Extrae frames de todos los videos de un directorio, uno por subdirectorio de salida.
+
+    Args:
+        video_dir (Path): Directorio con los videos.
+        output_dir (Path): Directorio de salida; cada video escribe en output_dir/<nombre>.
+        frame_interval (int): Intervalo de frames para guardar.
+        interval_seconds (float): Intervalo en segundos; tiene prioridad sobre frame_interval.
+        mode (str): Estrategia de muestreo: 'auto', 'grab', 'seek' o 'read'.
+        decode_workers (int): Videos decodificados simultáneamente.
+        encode_workers (int): Hilos que codifican y escriben frames.
+        queue_size (int): Máximo de frames decodificados en espera.
+        shards (bool): Escribe cada video en un contenedor de shards en output_dir/<nombre>.
+        shard_size_mb (float): Tamaño máximo de cada shard.
+    """
+    msg = Printer()
+    videos = sorted(p for p in video_dir.iterdir() if p.suffix.lower() in VIDEO_EXTENSIONS)
+    if not videos:
+        msg.fail(f"No se encontraron videos en: {video_dir}")
+        return
 
-        frame_count += 1
+    jobs = [(video_path, output_dir / video_path.stem) for video_path in videos]
+    decode_stats, encode_stats, elapsed = run_extraction_pipeline(
+        jobs, frame_interval, interval_seconds, mode, decode_workers, encode_workers, queue_size, shards, shard_size_mb)
+
+    msg.info(decode_stats.summary(elapsed))
+    msg.info(encode_stats.summary(elapsed))
+    msg.good(f"Se guardaron {encode_stats.items} frames de {len(videos)} videos en {output_dir}")
+
+def extract_frames(video_path: Path, output_dir: Path, frame_interval: int = 30,
+                   interval_seconds: float = None, mode: str = 'auto', encode_workers: int = 1,
+                   queue_size: int = 64, shards: bool = False, shard_size_mb: float = 256):
+    """
+    Extrae frames de un video y los guarda en un directorio.
+
+    Args:
+        video_path (Path): Ruta al archivo de video.
+        output_dir (Path): Directorio de salida para los frames.
+        frame_interval (int): Intervalo de frames para guardar.
+        interval_seconds (float): Intervalo en segundos (p. ej. 0.5); tiene prioridad sobre frame_interval.
+        mode (str): Estrategia de muestreo: 'auto', 'grab', 'seek' o 'read'.
+        encode_workers (int): Con más de uno, codifica y escribe en hilos separados del decodificador.
+        queue_size (int): Máximo de frames decodificados en espera.
+        shards (bool): Escribe los frames en un contenedor de shards (ver tile_shards) en output_dir
+            en lugar de un JPEG por frame.
+        shard_size_mb (float): Tamaño máximo de cada shard.
+    """
+    msg = Printer()
+    if not video_path.exists():
+        msg.fail(f"No se encontró el archivo de video: {video_path}")
+        return
+
+    if encode_workers > 1:
+        decode_stats, encode_stats, elapsed = run_extraction_pipeline(
+            [(video_path, output_dir)], frame_interval, interval_seconds, mode, 1, encode_workers, queue_size,
+            shards, shard_size_mb)
+        msg.info(decode_stats.summary(elapsed))
+        msg.info(encode_stats.summary(elapsed))
+        msg.good(f"Se guardaron {encode_stats.items} frames en {output_dir}")
+        return
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        msg.fail(f"No se pudo abrir el archivo de video: {video_path}")
+        return
+
+    output = ShardWriter(output_dir, shard_size_mb, {'source': str(video_path)}) if shards else output_dir
+    saved_frames = 0
+    for frame_idx, frame in iter_frames(cap, frame_interval, interval_seconds, mode):
+        _write_frame(output, frame_idx, frame)
+        saved_frames += 1
 
     cap.release()
+    if shards:
+        output.close()
     msg.good(f"Se guardaron {saved_frames} frames en {output_dir}")
-
@@ -0,0 +1,226 @@
+import json
+import multiprocessing
+import resource
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import cv2
+import numpy as np
+
+# Variante -> (tipo de backend, argumentos de YOLO.export). 'pytorch' no se exporta.
+FORMATS = {
+    'pytorch': ('pt', None),
+    'onnx': ('onnx', {'format': 'onnx'}),
+    'openvino': ('openvino', {'format': 'openvino'}),
+    'tflite_fp32': ('tflite', {'format': 'tflite'}),
+    'tflite_fp16': ('tflite', {'format': 'tflite', 'half': True}),
+    'tflite_int8': ('tflite', {'format': 'tflite', 'int8': True}),
+}
+
+def export_variant(model_path: Path, variant: str, imgsz: int, work_dir: Path, data_yaml: Path = None) -> Path:
+    """
+    Exporta el modelo en una variante y tamaño, sin tocar las exportaciones junto a los pesos originales.
+
+    Los pesos se copian a work_dir/<variant>_<imgsz>/ y Ultralytics exporta ahí.
+
+    Args:
+        model_path (Path): Pesos .pt.
+        variant (str): Llave de FORMATS.
+        imgsz (int): Tamaño de entrada de la exportación.
+        work_dir (Path): Directorio de trabajo del benchmark.
+        data_yaml (Path): data.yaml para la calibración int8.
+
+    Returns:
+        Path: Archivo del modelo exportado.
+    """
+    from ultralytics import YOLO
+
+    _, export_args = FORMATS[variant]
+    if export_args is None:
+        return Path(model_path)
+
+    variant_dir = Path(work_dir) / f"{variant}_{imgsz}"
+    variant_dir.mkdir(parents=True, exist_ok=True)
+    weights = variant_dir / Path(model_path).name
+    shutil.copy2(model_path, weights)
+
+    kwargs = dict(export_args, imgsz=imgsz)
+    if kwargs.get('int8') and data_yaml:
+        kwargs['data'] = str(data_yaml)
+    exported = Path(YOLO(str(weights)).export(**kwargs))
+    if exported.is_dir():
+        # OpenVINO exporta un directorio con el .xml y el .bin
+        exported = next(exported.glob('*.xml'))
+    return exported
+
+def model_size(path: Path) -> float:
+    """Tamaño en MB del modelo (incluye el .bin de OpenVINO)."""
+    path = Path(path)
+    files = [path, path.with_suffix('.bin')] if path.suffix == '.xml' else [path]
+    return sum(f.stat().st_size for f in files if f.exists()) / (1024 * 1024)
+
+def _measure(backend_type: str, model_path: str, imgsz: int, image_paths: list, warmup: int,
+             threads: int, batch_size: int) -> dict:
+    # Se ejecuta en un proceso propio para que el pico de RSS corresponda solo a este modelo
+    from src.inference.backends import BACKENDS
+
+    images = [cv2.imread(str(path)) for path in image_paths]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    backend = BACKENDS[backend_type](Path(model_path), imgsz, threads, 1)
+    for image in images[:warmup]:
+        backend.predict([image])
+
+    latencies = []
+    for image in images:
+        start = time.perf_counter()
+        backend.predict([image])
+        latencies.append(time.perf_counter() - start)
+
+    backend.batch_size = max(batch_size, backend.batch_size)
+    start = time.perf_counter()
+    backend.predict(images)
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p95_ms': float(np.percentile(latencies, 95)),
+        'throughput_ips': len(images) / elapsed if elapsed > 0 else 0.0,
+        # ru_maxrss está en KB en Linux
+        'peak_rss_mb': peak / 1024,
+        'model_rss_mb': (peak - baseline) / 1024,
+    }
+
+def measure_latency(backend_type: str, model_path: Path, imgsz: int, image_paths: list, warmup: int = 5,
+                    threads: int = 4, batch_size: int = 1) -> dict:
+    """
+    Mide latencia, throughput y memoria de un modelo en CPU en un proceso aislado.
+
+    Args:
+        backend_type (str): 'pt', 'onnx', 'openvino' o 'tflite'.
+        model_path (Path): Archivo del modelo.
+        imgsz (int): Tamaño de entrada.
+        image_paths (list): Conjunto fijo de imágenes.
+        warmup (int): Inferencias descartadas antes de medir.
+        threads (int): Hilos del runtime.
+        batch_size (int): Lote para la medición de throughput.
+
+    Returns:
+        dict: latency_p50_ms, latency_p95_ms, throughput_ips, peak_rss_mb y model_rss_mb.
+    """
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_measure, backend_type, str(model_path), imgsz, [str(p) for p in image_paths],
+                               warmup, threads, batch_size).result()
+
+def evaluate_map(model_path: Path, data_yaml: Path, imgsz: int, task: str = 'detect') -> dict:
+    """
+    mAP del modelo exportado sobre el split de validación con el evaluador de Ultralytics.
+
+    Args:
+        model_path (Path): Archivo del modelo (.pt, .onnx, .xml o .tflite).
+        data_yaml (Path): data.yaml del dataset.
+        imgsz (int): Tamaño de entrada.
+        task (str): Tarea del modelo original ('detect' o 'segment').
+
+    Returns:
+        dict: map50 y map50_95 de las cajas.
+    """
+    from ultralytics import YOLO
+
+    model_path = Path(model_path)
+    # Ultralytics carga OpenVINO desde el directorio exportado
+    source = model_path.parent if model_path.suffix == '.xml' else model_path
+    metrics = YOLO(str(source), task=task).val(
+        data=str(data_yaml), imgsz=imgsz, batch=1, device='cpu', plots=False, verbose=False)
+    return {'map50': float(metrics.box.map50), 'map50_95': float(metrics.box.map)}
+
+def run_benchmark(model_path: Path, image_paths: list, work_dir: Path, variants: list, sizes: list,
+                  data_yaml: Path = None, warmup: int = 5, threads: int = 4, batch_size: int = 1,
+                  log=print) -> list:
+    """
+    Exporta y mide cada combinación de variante y tamaño.
+
+    Una variante que falla al exportarse o medirse queda en la tabla con su error
+    en lugar de detener el benchmark.
+
+    Args:
+        model_path (Path): Pesos .pt.
+        image_paths (list): Conjunto fijo de imágenes para la latencia.
+        work_dir (Path): Directorio donde se guardan las exportaciones.
+        variants (list): Llaves de FORMATS.
+        sizes (list): Valores de imgsz.
+        data_yaml (Path): data.yaml para el mAP y la calibración int8; sin él no se calcula el mAP.
+        warmup (int): Inferencias descartadas antes de medir.
+        threads (int): Hilos del runtime.
+        batch_size (int): Lote para la medición de throughput.
+        log (callable): Función para reportar el progreso.
+
+    Returns:
+        list: Una fila (dict) por combinación.
+    """
+    from ultralytics import YOLO
+
+    task = YOLO(str(model_path)).task
+    rows = []
+    for imgsz in sizes:
+        for variant in variants:
+            row = {'format': variant, 'imgsz': imgsz}
+            try:
+                log(f"{variant} @ {imgsz}: exportando")
+                exported = export_variant(model_path, variant, imgsz, work_dir, data_yaml)
+                row['path'] = str(exported)
+                row['size_mb'] = model_size(exported)
+                log(f"{variant} @ {imgsz}: midiendo latencia")
+                row.update(measure_latency(FORMATS[variant][0], exported, imgsz, image_paths, warmup, threads,
+                                           batch_size))
+                if data_yaml:
+                    log(f"{variant} @ {imgsz}: evaluando mAP")
+                    row.update(evaluate_map(exported, data_yaml, imgsz, task))
+            except Exception as error:
+                row['error'] = str(error)
+            rows.append(row)
+    return rows
+
+COLUMNS = [
+    ('format', 'Format', '{}'),
+    ('imgsz', 'imgsz', '{}'),
+    ('size_mb', 'Size (MB)', '{:.1f}'),
+    ('latency_p50_ms', 'p50 (ms)', '{:.1f}'),
+    ('latency_p95_ms', 'p95 (ms)', '{:.1f}'),
+    ('throughput_ips', 'img/s', '{:.1f}'),
+    ('peak_rss_mb', 'Peak RSS (MB)', '{:.0f}'),
+    ('map50', 'mAP50', '{:.3f}'),
+    ('map50_95', 'mAP50-95', '{:.3f}'),
+]
+
+def write_report(rows: list, output_dir: Path, metadata: dict = None) -> tuple:
+    """
+    Guarda la tabla comparativa en benchmark.json y benchmark.md.
+
+    Args:
+        rows (list): Filas de run_benchmark.
+        output_dir (Path): Directorio de salida.
+        metadata (dict): Información adicional para el JSON (modelo, imágenes, hilos...).
+
+    Returns:
+        tuple: (ruta del JSON, ruta del Markdown).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    json_path = output_dir / 'benchmark.json'
+    with open(json_path, 'w') as file:
+        json.dump({'metadata': metadata or {}, 'results': rows}, file, indent=2)
+
+    lines = ['| ' + ' | '.join(title for _, title, _ in COLUMNS) + ' |',
+             '|' + '---|' * len(COLUMNS)]
+    for row in rows:
+        cells = [fmt.format(row[key]) if row.get(key) is not None else '-' for key, _, fmt in COLUMNS]
+        if 'error' in row:
+            cells[2] = f"error: {row['error'].splitlines()[0][:60]}" if row['error'] else 'error'
+        lines.append('| ' + ' | '.join(cells) + ' |')
+    markdown_path = output_dir / 'benchmark.md'
+    markdown_path.write_text('\n'.join(lines) + '\n')
+    return json_path, markdown_path
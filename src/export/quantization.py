@@ -0,0 +1,211 @@
+import random
+import time
+from pathlib import Path
+import cv2
+import numpy as np
+from src.data_processing.dataset_utils import label_path, split_images
+from src.inference.backends import TFLiteBackend, letterbox
+from src.inference.tracking import iou_matrix
+
+def read_labels(image_path: Path, shape: tuple = None) -> tuple:
+    """
+    Lee las etiquetas YOLO de una imagen.
+
+    Args:
+        image_path (Path): Ruta a la imagen.
+        shape (tuple): (alto, ancho) para devolver cajas xyxy en píxeles; si es None solo se leen las clases.
+
+    Returns:
+        tuple: (cajas (N, 4) xyxy, clases (N,)). Las etiquetas de polígono se convierten a su caja envolvente.
+    """
+    path = label_path(Path(image_path))
+    boxes, classes = [], []
+    if path.exists():
+        for line in path.read_text().splitlines():
+            values = line.split()
+            if len(values) < 5:
+                continue
+            classes.append(int(values[0]))
+            coords = np.array(values[1:], dtype=np.float64)
+            if len(coords) == 4:
+                cx, cy, w, h = coords
+                boxes.append([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+            else:
+                xs, ys = coords[0::2], coords[1::2]
+                boxes.append([xs.min(), ys.min(), xs.max(), ys.max()])
+    boxes = np.array(boxes, dtype=np.float64).reshape(-1, 4)
+    if shape is not None:
+        boxes *= [shape[1], shape[0], shape[1], shape[0]]
+    return boxes, np.array(classes, dtype=np.int64)
+
+def sample_calibration_images(data_yaml: Path, num_samples: int = 200, stratify: bool = True,
+                              split: str = 'val', seed: int = 0) -> list:
+    """
+    Selecciona las imágenes de calibración de un split del dataset.
+
+    Con stratify=True se toman imágenes por turnos de cada clase, empezando por
+    las menos frecuentes, para que todas las clases queden representadas aunque
+    el dataset esté desbalanceado. El resto se completa al azar.
+
+    Args:
+        data_yaml (Path): data.yaml del dataset.
+        num_samples (int): Número de imágenes.
+        stratify (bool): Estratifica por clase.
+        split (str): Split del que se toman las imágenes.
+        seed (int): Semilla para que la selección sea reproducible.
+
+    Returns:
+        list: Rutas de las imágenes seleccionadas.
+    """
+    images = split_images(data_yaml, split)
+    rng = random.Random(seed)
+    if not stratify or len(images) <= num_samples:
+        return sorted(rng.sample(images, min(num_samples, len(images))))
+
+    by_class = {}
+    for image_path in images:
+        _, classes = read_labels(image_path)
+        for cls in set(classes.tolist()):
+            by_class.setdefault(cls, []).append(image_path)
+    for paths in by_class.values():
+        rng.shuffle(paths)
+
+    selected, seen = [], set()
+    queues = sorted(by_class.values(), key=len)
+    while len(selected) < num_samples and any(queues):
+        for paths in queues:
+            while paths and paths[-1] in seen:
+                paths.pop()
+            if paths and len(selected) < num_samples:
+                seen.add(paths[-1])
+                selected.append(paths.pop())
+
+    remaining = [path for path in images if path not in seen]
+    selected += rng.sample(remaining, min(num_samples - len(selected), len(remaining)))
+    return sorted(selected)
+
+def representative_dataset(image_paths: list, imgsz: int = 640):
+    """
+    Generador de datos representativos para el TFLiteConverter.
+
+    Aplica el mismo preprocesamiento que los backends de inferencia (letterbox, RGB, [0, 1]).
+
+    Args:
+        image_paths (list): Imágenes de calibración.
+        imgsz (int): Tamaño de entrada del modelo.
+
+    Returns:
+        callable: Función generadora que produce [tensor NHWC float32].
+    """
+    def generator():
+        for image_path in image_paths:
+            image = cv2.imread(str(image_path))
+            if image is None:
+                continue
+            boxed, _, _ = letterbox(image, imgsz)
+            yield [np.ascontiguousarray(boxed[None, :, :, ::-1], dtype=np.float32) / 255.0]
+    return generator
+
+def quantize_saved_model(saved_model_dir: Path, image_paths: list, output_path: Path, imgsz: int = 640) -> Path:
+    """
+    Convierte un SavedModel a TFLite con cuantización entera completa.
+
+    Pesos y activaciones quedan en int8 y la entrada en uint8 (escala 1/255), de modo
+    que la app puede pasar los bytes RGB del frame sin normalizar. La salida se
+    mantiene en float32 para que el decodificador de Detector.kt no cambie.
+
+    Args:
+        saved_model_dir (Path): Directorio del SavedModel exportado por Ultralytics.
+        image_paths (list): Imágenes de calibración.
+        output_path (Path): Ruta del .tflite resultante.
+        imgsz (int): Tamaño de entrada del modelo.
+
+    Returns:
+        Path: Ruta del modelo cuantizado.
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_saved_model(str(saved_model_dir))
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset(image_paths, imgsz)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.uint8
+    converter.inference_output_type = tf.float32
+
+    output_path = Path(output_path)
+    output_path.write_bytes(converter.convert())
+    return output_path
+
+def average_precision(detections: list, ground_truths: list, iou_threshold: float = 0.5) -> float:
+    """
+    mAP a un umbral de IoU (interpolación en todos los puntos, como VOC).
+
+    Args:
+        detections (list): Por imagen, arreglo (N, 6) [x1, y1, x2, y2, conf, cls].
+        ground_truths (list): Por imagen, (cajas (M, 4), clases (M,)).
+        iou_threshold (float): IoU mínima para contar un acierto.
+
+    Returns:
+        float: Media del AP de las clases presentes en las etiquetas.
+    """
+    classes = sorted(set(np.concatenate([gt_classes for _, gt_classes in ground_truths]).tolist())) \
+        if ground_truths else []
+    aps = []
+    for cls in classes:
+        scores, hits, total = [], [], 0
+        for dets, (gt_boxes, gt_classes) in zip(detections, ground_truths):
+            dets = dets[dets[:, 5] == cls]
+            gt = gt_boxes[gt_classes == cls]
+            total += len(gt)
+            if not len(dets):
+                continue
+            dets = dets[np.argsort(-dets[:, 4], kind='stable')]
+            matched = np.zeros(len(gt), dtype=bool)
+            iou = iou_matrix(dets[:, :4].astype(np.float64), gt) if len(gt) else np.zeros((len(dets), 0))
+            for i in range(len(dets)):
+                candidates = np.where(~matched & (iou[i] >= iou_threshold))[0] if iou.shape[1] else []
+                if len(candidates):
+                    matched[candidates[np.argmax(iou[i, candidates])]] = True
+                hits.append(bool(len(candidates)))
+                scores.append(dets[i, 4])
+        if total == 0:
+            continue
+        order = np.argsort(-np.array(scores), kind='stable')
+        tp = np.cumsum(np.array(hits, dtype=np.float64)[order])
+        recall = np.concatenate([[0.0], tp / total, [1.0]])
+        precision = np.concatenate([[1.0], tp / np.arange(1, len(tp) + 1), [0.0]])
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        aps.append(float(np.sum((recall[1:] - recall[:-1]) * precision[1:])))
+    return float(np.mean(aps)) if aps else 0.0
+
+def evaluate_tflite(model_path: Path, image_paths: list, imgsz: int = 640, conf: float = 0.001,
+                    threads: int = 4) -> dict:
+    """
+    Evalúa un modelo TFLite en CPU: mAP50 frente a las etiquetas y latencia por imagen.
+
+    Args:
+        model_path (Path): Ruta al .tflite.
+        image_paths (list): Imágenes etiquetadas.
+        imgsz (int): Tamaño de entrada del modelo.
+        conf (float): Umbral de confianza para el mAP.
+        threads (int): Hilos del intérprete.
+
+    Returns:
+        dict: map50, latency_p50_ms y latency_p95_ms.
+    """
+    backend = TFLiteBackend(model_path, imgsz, threads)
+    detections, ground_truths, latencies = [], [], []
+    for image_path in image_paths:
+        image = cv2.imread(str(image_path))
+        if image is None:
+            continue
+        start = time.perf_counter()
+        detections.append(backend.predict([image], conf)[0])
+        latencies.append(time.perf_counter() - start)
+        ground_truths.append(read_labels(image_path, image.shape[:2]))
+    latencies = np.array(latencies) * 1000
+    return {
+        'map50': average_precision(detections, ground_truths),
+        'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies.size else 0.0,
+        'latency_p95_ms': float(np.percentile(latencies, 95)) if latencies.size else 0.0,
+    }
@@ -0,0 +1,312 @@
+"""
+Backends de inferencia en CPU intercambiables (PyTorch, ONNX Runtime, OpenVINO y TFLite).
+
+Todos comparten el mismo preprocesamiento (letterbox, RGB, 0-1) y el mismo
+postprocesamiento (decodificación de la salida [B, 4 + nc, N] y NMS por clase),
+por lo que las detecciones solo difieren por la precisión numérica de cada
+runtime. Los runtimes se importan al crear el backend, así que basta instalar
+el que se vaya a usar. Solo se admiten modelos de detección: la salida de
+máscaras de los modelos de segmentación (-seg) no se decodifica y load_backend
+los rechaza.
+"""
+import ast
+from pathlib import Path
+import cv2
+import numpy as np
+import yaml
+from src.inference.decoder import nms_batched
+
+def letterbox(image: np.ndarray, imgsz: int = 640, color: int = 114) -> tuple:
+    """
+    Redimensiona conservando la proporción y rellena hasta imgsz × imgsz.
+
+    Args:
+        image (np.ndarray): Imagen BGR.
+        imgsz (int): Tamaño de entrada del modelo.
+        color (int): Valor del relleno.
+
+    Returns:
+        tuple: (imagen, ratio, (pad_x, pad_y)).
+    """
+    height, width = image.shape[:2]
+    ratio = min(imgsz / height, imgsz / width)
+    new_width, new_height = round(width * ratio), round(height * ratio)
+    pad_x, pad_y = (imgsz - new_width) / 2, (imgsz - new_height) / 2
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+    left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(color, color, color))
+    return image, ratio, (left, top)
+
+def preprocess(images: list, imgsz: int = 640) -> tuple:
+    """
+    Preprocesamiento común: letterbox, BGR a RGB y escala a [0, 1].
+
+    Args:
+        images (list): Imágenes BGR.
+        imgsz (int): Tamaño de entrada del modelo.
+
+    Returns:
+        tuple: (batch NHWC float32, lista de (ratio, pad)).
+    """
+    batch, transforms = [], []
+    for image in images:
+        boxed, ratio, pad = letterbox(image, imgsz)
+        batch.append(boxed[:, :, ::-1])
+        transforms.append((ratio, pad))
+    return np.ascontiguousarray(np.stack(batch), dtype=np.float32) / 255.0, transforms
+
+def postprocess(output: np.ndarray, transforms: list, shapes: list, imgsz: int = 640, conf: float = 0.25,
+                iou: float = 0.7, max_det: int = 300, normalized: bool = False, num_classes: int = None) -> list:
+    """
+    Postprocesamiento común de la salida [B, 4 + nc, N] de YOLO.
+
+    Args:
+        output (np.ndarray): Salida del modelo.
+        transforms (list): (ratio, pad) de cada imagen, de preprocess.
+        shapes (list): (alto, ancho) original de cada imagen.
+        imgsz (int): Tamaño de entrada del modelo.
+        conf (float): Umbral de confianza.
+        iou (float): Umbral de IoU de la NMS por clase.
+        max_det (int): Máximo de detecciones por imagen.
+        normalized (bool): Si las cajas vienen en [0, 1] (exportación TFLite).
+        num_classes (int): Canales de clase; los siguientes (coeficientes de máscara en
+            modelos de segmentación) se ignoran. Por defecto todos los canales tras la caja.
+
+    Returns:
+        list: Un arreglo float32 (N, 6) [x1, y1, x2, y2, conf, cls] por imagen, en píxeles originales.
+    """
+    detections = []
+    for prediction, (ratio, (pad_x, pad_y)), (height, width) in zip(output, transforms, shapes):
+        class_scores = prediction[4:4 + num_classes] if num_classes else prediction[4:]
+        classes = class_scores.argmax(axis=0)
+        scores = class_scores[classes, np.arange(class_scores.shape[1])]
+        candidates = np.flatnonzero(scores > conf)
+
+        cx, cy, w, h = prediction[:4, candidates]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        if normalized:
+            boxes *= imgsz
+        scores, classes = scores[candidates], classes[candidates]
+
+        keep = nms_batched(boxes, scores, iou, classes=classes)[:max_det]
+        boxes = (boxes[keep] - [pad_x, pad_y, pad_x, pad_y]) / ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+        detections.append(np.concatenate([boxes, scores[keep, None], classes[keep, None]], axis=1).astype(np.float32))
+    return detections
+
+def _metadata(model_path: Path) -> dict:
+    """metadata.yaml que Ultralytics escribe junto a los modelos exportados (names, task...)."""
+    for directory in (model_path.parent, model_path.parent.parent):
+        metadata_path = directory / 'metadata.yaml'
+        if metadata_path.exists():
+            with open(metadata_path, 'r') as file:
+                return yaml.safe_load(file)
+    return {}
+
+def _task(metadata: dict, num_outputs: int) -> str:
+    """Tarea del modelo según sus metadatos; los modelos -seg tienen una segunda salida de prototipos."""
+    return metadata.get('task') or ('segment' if num_outputs > 1 else 'detect')
+
+class Backend:
+    """
+    Interfaz común de los backends.
+
+    Las subclases implementan _forward, que recibe el lote NHWC float32 y devuelve
+    la salida cruda [B, 4 + nc, N].
+    """
+
+    normalized = False
+
+    def __init__(self, model_path: Path, imgsz: int = 640, threads: int = 4, batch_size: int = 1):
+        self.model_path = Path(model_path)
+        self.imgsz = imgsz
+        self.threads = threads
+        self.batch_size = batch_size
+        self.names = {}
+        self.task = 'detect'
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def predict(self, images: list, conf: float = 0.25, iou: float = 0.7, max_det: int = 300) -> list:
+        """
+        Ejecuta preprocesamiento, modelo y postprocesamiento sobre imágenes BGR.
+
+        Args:
+            images (list): Imágenes BGR.
+            conf (float): Umbral de confianza.
+            iou (float): Umbral de IoU de la NMS.
+            max_det (int): Máximo de detecciones por imagen.
+
+        Returns:
+            list: Un arreglo (N, 6) [x1, y1, x2, y2, conf, cls] por imagen.
+        """
+        detections = []
+        for start in range(0, len(images), self.batch_size):
+            chunk = images[start:start + self.batch_size]
+            batch, transforms = preprocess(chunk, self.imgsz)
+            output = self._forward(batch)
+            detections.extend(postprocess(output, transforms, [image.shape[:2] for image in chunk], self.imgsz,
+                                          conf, iou, max_det, self.normalized, len(self.names) or None))
+        return detections
+
+class TorchBackend(Backend):
+    """Pesos .pt de Ultralytics ejecutados con PyTorch en CPU."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import torch
+        from ultralytics import YOLO
+
+        torch.set_num_threads(self.threads)
+        yolo = YOLO(str(self.model_path))
+        self.names = yolo.names
+        self.task = yolo.task
+        self.model = yolo.model.float().eval()
+        self._torch = torch
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        with self._torch.inference_mode():
+            output = self.model(self._torch.from_numpy(batch.transpose(0, 3, 1, 2).copy()))
+        output = output[0] if isinstance(output, (list, tuple)) else output
+        return output.numpy()
+
+class OnnxBackend(Backend):
+    """Modelo ONNX ejecutado con ONNX Runtime (CPUExecutionProvider)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        self.session = ort.InferenceSession(str(self.model_path), options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if 'names' not in metadata:
+            metadata = _metadata(self.model_path)
+        self.names = ast.literal_eval(metadata['names']) if isinstance(metadata.get('names'), str) \
+            else metadata.get('names', {})
+        self.task = _task(metadata, len(self.session.get_outputs()))
+        if isinstance(self.session.get_inputs()[0].shape[0], int):
+            # Exportación con batch fijo
+            self.batch_size = self.session.get_inputs()[0].shape[0]
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        size = len(batch)
+        if size < self.batch_size:
+            batch = np.concatenate([batch, np.zeros((self.batch_size - size, *batch.shape[1:]), batch.dtype)])
+        return self.session.run(None, {self.input_name: batch.transpose(0, 3, 1, 2)})[0][:size]
+
+class OpenVinoBackend(Backend):
+    """Modelo OpenVINO IR (.xml) compilado para CPU."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import openvino as ov
+
+        core = ov.Core()
+        self.model = core.compile_model(str(self.model_path), 'CPU', {'INFERENCE_NUM_THREADS': self.threads})
+        metadata = _metadata(self.model_path)
+        self.names = metadata.get('names', {})
+        self.task = _task(metadata, len(self.model.outputs))
+        # Los modelos exportados por Ultralytics tienen batch 1 salvo que se indique dynamic=True
+        if self.model.inputs[0].get_partial_shape()[0].is_static:
+            self.batch_size = self.model.inputs[0].get_partial_shape()[0].get_length()
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        outputs = [self.model(image[None].transpose(0, 3, 1, 2))[0] for image in batch] if self.batch_size == 1 \
+            else [self.model(batch.transpose(0, 3, 1, 2))[0]]
+        return np.concatenate(outputs)
+
+class TFLiteBackend(Backend):
+    """Modelo .tflite (p. ej. best_float32.tflite de export_model.py) con el intérprete de TFLite."""
+
+    normalized = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=str(self.model_path), num_threads=self.threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        metadata = _metadata(self.model_path)
+        self.names = metadata.get('names', {})
+        self.task = _task(metadata, len(self.interpreter.get_output_details()))
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        outputs = []
+        for image in batch:
+            tensor = image[None]
+            if self.input['dtype'] != np.float32:
+                # Modelo cuantizado: aplica la escala y el punto cero de la entrada
+                scale, zero_point = self.input['quantization']
+                tensor = np.round(tensor / scale + zero_point).astype(self.input['dtype'])
+            self.interpreter.set_tensor(self.input['index'], tensor)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output['index'])
+            if self.output['dtype'] != np.float32:
+                scale, zero_point = self.output['quantization']
+                output = (output.astype(np.float32) - zero_point) * scale
+            outputs.append(output)
+        return np.concatenate(outputs)
+
+BACKENDS = {
+    'pt': TorchBackend,
+    'onnx': OnnxBackend,
+    'openvino': OpenVinoBackend,
+    'tflite': TFLiteBackend,
+}
+
+def default_model_path(model_path: Path, backend_type: str) -> Path:
+    """
+    Ruta donde Ultralytics deja el modelo exportado a partir del .pt.
+
+    Args:
+        model_path (Path): Ruta a los pesos .pt.
+        backend_type (str): Tipo de backend.
+
+    Returns:
+        Path: Ruta esperada del modelo exportado.
+    """
+    model_path = Path(model_path)
+    if backend_type == 'onnx':
+        return model_path.with_suffix('.onnx')
+    if backend_type == 'openvino':
+        return model_path.parent / f"{model_path.stem}_openvino_model" / f"{model_path.stem}.xml"
+    if backend_type == 'tflite':
+        return model_path.parent / f"{model_path.stem}_saved_model" / f"{model_path.stem}_float32.tflite"
+    return model_path
+
+def load_backend(model_path: Path, backend_config: dict, imgsz: int = 640) -> Backend:
+    """
+    Crea el backend indicado en la sección 'backend' de la configuración.
+
+    Args:
+        model_path (Path): Ruta a los pesos .pt de la configuración.
+        backend_config (dict): type, path (opcional), threads y batch_size.
+        imgsz (int): Tamaño de entrada del modelo.
+
+    Returns:
+        Backend: Backend listo para predict.
+
+    Raises:
+        ValueError: Si el tipo de backend no existe o el modelo no es de detección.
+    """
+    backend_type = backend_config.get('type', 'pt')
+    if backend_type not in BACKENDS:
+        raise ValueError(f"Backend desconocido '{backend_type}'. Opciones: {', '.join(BACKENDS)}")
+    path = Path(backend_config.get('path') or default_model_path(model_path, backend_type))
+    backend = BACKENDS[backend_type](path, imgsz, backend_config.get('threads', 4), backend_config.get('batch_size', 1))
+    if backend.task != 'detect':
+        raise ValueError(f"El backend solo admite modelos de detección; {path} es de tarea '{backend.task}'. "
+                         f"Use la inferencia con Ultralytics para conservar las máscaras.")
+    return backend
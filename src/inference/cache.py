@@ -0,0 +1,168 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+import numpy as np
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """
+    SHA-256 del contenido de un archivo.
+
+    Args:
+        path (Path): Ruta al archivo.
+        chunk_size (int): Bytes leídos por bloque.
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def model_fingerprint(model_path: Path, params: dict) -> str:
+    """
+    Huella del modelo y de los parámetros de inferencia que afectan el resultado.
+
+    Args:
+        model_path (Path): Ruta a los pesos del modelo.
+        params (dict): Parámetros de inferencia (imgsz, conf, ...).
+
+    Returns:
+        str: Hash hexadecimal.
+    """
+    payload = json.dumps({'model': file_digest(model_path), 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResultCache:
+    """
+    Caché en disco de detecciones direccionada por contenido.
+
+    Cada entrada se identifica por el hash de los bytes de la imagen más la huella
+    del modelo y los parámetros, y guarda un arreglo float32 (N, 6) con
+    [x1, y1, x2, y2, conf, cls]. Al superar max_bytes se eliminan las entradas
+    usadas menos recientemente.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 512 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(str(self.path / 'results.sqlite'), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS results ("
+                         "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def key(image_path: Path, fingerprint: str) -> str:
+        return hashlib.sha256((file_digest(image_path) + fingerprint).encode()).hexdigest()
+
+    def get(self, key: str):
+        """
+        Busca un resultado y actualiza su último acceso.
+
+        Args:
+            key (str): Llave de la entrada.
+
+        Returns:
+            np.ndarray | None: Detecciones (N, 6) o None si no está en caché.
+        """
+        row = self._db.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+        # frombuffer es de solo lectura; la copia permite usarlo con torch.from_numpy
+        return np.frombuffer(row[0], dtype=np.float32).reshape(-1, 6).copy()
+
+    def put(self, key: str, detections: np.ndarray):
+        """
+        Guarda las detecciones de una imagen.
+
+        Args:
+            key (str): Llave de la entrada.
+            detections (np.ndarray): Arreglo (N, 6) con [x1, y1, x2, y2, conf, cls].
+        """
+        data = np.ascontiguousarray(detections, dtype=np.float32).tobytes()
+        self._db.execute("INSERT OR REPLACE INTO results (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+                         (key, data, len(data) + len(key), time.time()))
+
+    def commit(self):
+        """Persiste los cambios y aplica el límite de tamaño."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            rows = self._db.execute("SELECT key, size FROM results ORDER BY last_access")
+            evict = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                evict.append((key,))
+                excess -= size
+            self._db.executemany("DELETE FROM results WHERE key = ?", evict)
+        self._db.commit()
+
+    def close(self):
+        self.commit()
+        self._db.close()
+
+def result_to_array(result) -> np.ndarray:
+    """
+    Convierte un resultado de Ultralytics al arreglo compacto de la caché.
+
+    Args:
+        result (Results): Resultado de model.predict para una imagen.
+
+    Returns:
+        np.ndarray: Arreglo float32 (N, 6) con [x1, y1, x2, y2, conf, cls].
+    """
+    boxes = result.boxes
+    return np.concatenate([boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy()[:, None],
+                           boxes.cls.cpu().numpy()[:, None]], axis=1).astype(np.float32)
+
+def predict_with_cache(model, image_paths: list, cache: ResultCache, fingerprint: str, imgsz: int = 640,
+                       conf: float = 0.25, batch_size: int = 16):
+    """
+    Genera las detecciones de cada imagen, enviando al modelo solo las que no están en caché.
+
+    Args:
+        model (YOLO): Modelo YOLO cargado.
+        image_paths (list): Rutas de las imágenes.
+        cache (ResultCache): Caché de resultados.
+        fingerprint (str): Huella del modelo y parámetros (model_fingerprint).
+        imgsz (int): Tamaño de imagen de entrada.
+        conf (float): Umbral de confianza.
+        batch_size (int): Imágenes por llamada a model.predict.
+
+    Yields:
+        tuple: (image_path, detections) con detections de forma (N, 6).
+    """
+    pending = []
+
+    def flush():
+        results = model.predict(source=[str(path) for path, _ in pending], imgsz=imgsz, conf=conf, verbose=False)
+        for (path, key), result in zip(pending, results):
+            detections = result_to_array(result)
+            cache.put(key, detections)
+            yield path, detections
+        pending.clear()
+        cache.commit()
+
+    for image_path in image_paths:
+        key = cache.key(image_path, fingerprint)
+        detections = cache.get(key)
+        if detections is not None:
+            yield image_path, detections
+            continue
+        pending.append((image_path, key))
+        if len(pending) >= batch_size:
+            yield from flush()
+    if pending:
+        yield from flush()
+    cache.commit()
@@ -0,0 +1,76 @@
+import http.client
+import json
+import socket
+from pathlib import Path
+from urllib.parse import urlparse
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class InferenceClient:
+    """
+    Cliente ligero del servidor de inferencia; no importa torch ni ultralytics.
+
+    Args:
+        url (str): URL del servidor (p. ej. http://127.0.0.1:8765).
+        socket_path (str): Unix socket del servidor; tiene prioridad sobre url.
+        timeout (float): Tiempo máximo de espera por solicitud en segundos.
+    """
+
+    def __init__(self, url: str = 'http://127.0.0.1:8765', socket_path: str = None, timeout: float = 60.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 8765
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: bytes = None, timeout: float = None) -> dict:
+        timeout = timeout or self.timeout
+        if self.socket_path:
+            connection = _UnixHTTPConnection(self.socket_path, timeout)
+        else:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        try:
+            headers = {'Content-Type': 'application/octet-stream'} if body is not None else {}
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = json.loads(response.read())
+            if response.status != 200:
+                raise RuntimeError(payload.get('error', f'HTTP {response.status}'))
+            return payload
+        finally:
+            connection.close()
+
+    def is_available(self) -> bool:
+        """Indica si hay un servidor escuchando."""
+        try:
+            self._request('GET', '/health', timeout=0.5)
+            return True
+        except (OSError, RuntimeError, ValueError):
+            return False
+
+    def models(self) -> list:
+        return self._request('GET', '/health')['models']
+
+    def stats(self) -> dict:
+        return self._request('GET', '/stats')
+
+    def predict(self, model_name: str, image_path: Path) -> dict:
+        """
+        Envía una imagen al servidor y devuelve sus detecciones.
+
+        Args:
+            model_name (str): Nombre del modelo en el servidor.
+            image_path (Path): Ruta a la imagen.
+
+        Returns:
+            dict: boxes, scores, classes y names.
+        """
+        return self._request('POST', f'/predict/{model_name}', body=Path(image_path).read_bytes())
@@ -0,0 +1,137 @@
+"""
+Decodificador vectorizado de la salida cruda de YOLO equivalente al Detector de Android.
+
+Reproduce bestBox/applyNMS de android_app/.../Detector.kt sobre el tensor
+[1, 4 + nc, N] del modelo TFLite: argmax por anchor sobre los canales de clase,
+umbral estricto de confianza, descarte de cajas fuera de [0, 1] y NMS agnóstica
+a la clase ordenada por confianza. Toda la aritmética se hace en float32, igual
+que en Kotlin, para obtener exactamente las mismas cajas.
+"""
+import numpy as np
+
+# Mismos valores que el companion object de Detector.kt
+CONFIDENCE_THRESHOLD = 0.3
+IOU_THRESHOLD = 0.5
+
+def nms_batched(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = IOU_THRESHOLD,
+                areas: np.ndarray = None, classes: np.ndarray = None, block_size: int = 256) -> np.ndarray:
+    """
+    NMS voraz exacta procesada por bloques para decenas de miles de candidatos.
+
+    Las cajas se ordenan por confianza y se procesan en bloques: dentro del bloque
+    la supresión se resuelve con una matriz IoU (B, B) y las cajas conservadas
+    suprimen de una sola vez a todas las candidatas posteriores aún vivas. El
+    resultado es idéntico al de la NMS voraz secuencial de Detector.kt.
+
+    Args:
+        boxes (np.ndarray): Cajas xyxy de forma (N, 4).
+        scores (np.ndarray): Confianzas de forma (N,).
+        iou_threshold (float): Se suprimen cajas con IoU >= umbral.
+        areas (np.ndarray): Áreas de las cajas; por defecto se calculan de xyxy.
+        classes (np.ndarray): Si se indica, la supresión es por clase.
+        block_size (int): Cajas por bloque; acota la memoria a block_size × N.
+
+    Returns:
+        np.ndarray: Índices conservados, ordenados por confianza descendente.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32)
+    if not len(boxes):
+        return np.zeros(0, dtype=np.int64)
+    if areas is None:
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    if classes is not None:
+        offset = np.float32(boxes.max() + 1)
+        boxes = boxes + (classes.astype(np.float32) * offset)[:, None]
+
+    order = np.argsort(-np.asarray(scores), kind='stable')
+    boxes = boxes[order]
+    areas = np.asarray(areas, dtype=np.float32)[order]
+    threshold = np.float32(iou_threshold)
+    n = len(boxes)
+    suppressed = np.zeros(n, dtype=bool)
+    keep = []
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            block = np.flatnonzero(~suppressed[start:stop]) + start
+            if not block.size:
+                continue
+
+            # Resolución secuencial dentro del bloque
+            iou = _pairwise_iou(boxes[block], areas[block], boxes[block], areas[block])
+            alive = np.ones(block.size, dtype=bool)
+            for i in range(block.size):
+                if alive[i]:
+                    alive[i + 1:] &= ~(iou[i, i + 1:] >= threshold)
+            kept = block[alive]
+            keep.append(kept)
+
+            # Las cajas conservadas suprimen a las candidatas de bloques posteriores
+            rest = np.flatnonzero(~suppressed[stop:]) + stop
+            if rest.size:
+                iou = _pairwise_iou(boxes[kept], areas[kept], boxes[rest], areas[rest])
+                suppressed[rest[(iou >= threshold).any(axis=0)]] = True
+
+    return order[np.concatenate(keep)]
+
+def _pairwise_iou(boxes1: np.ndarray, areas1: np.ndarray, boxes2: np.ndarray, areas2: np.ndarray) -> np.ndarray:
+    # Mismo orden de operaciones que calculateIoU en Kotlin
+    x1 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    y1 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    x2 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    y2 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+    zero = np.float32(0)
+    intersection = np.maximum(zero, x2 - x1) * np.maximum(zero, y2 - y1)
+    return intersection / (areas1[:, None] + areas2[None, :] - intersection)
+
+def decode_output(output: np.ndarray, labels: list = None, conf_threshold: float = CONFIDENCE_THRESHOLD,
+                  iou_threshold: float = IOU_THRESHOLD, apply_nms: bool = True) -> dict:
+    """
+    Decodifica el tensor crudo [1, 4 + nc, N] de un modelo YOLO exportado.
+
+    Args:
+        output (np.ndarray): Salida del modelo, de forma (1, 4 + nc, N) o (4 + nc, N).
+        labels (list): Nombres de clase (labels.txt); opcional.
+        conf_threshold (float): Se conservan anchors con confianza > umbral.
+        iou_threshold (float): Umbral de IoU para la NMS.
+        apply_nms (bool): Si es False devuelve todas las candidatas válidas.
+
+    Returns:
+        dict: boxes (xyxy normalizadas), cxcywh, scores, classes y, si hay labels, names.
+    """
+    output = np.asarray(output, dtype=np.float32)
+    if output.ndim == 3:
+        output = output[0]
+    class_scores = output[4:]
+
+    if class_scores.shape[0]:
+        classes = class_scores.argmax(axis=0)
+        scores = np.take_along_axis(class_scores, classes[None, :], axis=0)[0]
+        candidates = np.flatnonzero(scores > np.float32(conf_threshold))
+    else:
+        classes = scores = candidates = np.zeros(0, dtype=np.int64)
+
+    cx, cy, w, h = output[:4, candidates]
+    half = np.float32(2)
+    boxes = np.stack([cx - w / half, cy - h / half, cx + w / half, cy + h / half], axis=1)
+    inside = ((boxes >= 0) & (boxes <= 1)).all(axis=1)
+
+    boxes, candidates = boxes[inside], candidates[inside]
+    cxcywh = np.stack([cx, cy, w, h], axis=1)[inside]
+    scores, classes = scores[candidates].astype(np.float32), classes[candidates].astype(np.int64)
+
+    if apply_nms:
+        keep = nms_batched(boxes, scores, iou_threshold, areas=cxcywh[:, 2] * cxcywh[:, 3])
+    else:
+        keep = np.argsort(-scores, kind='stable')
+
+    detections = {
+        'boxes': boxes[keep],
+        'cxcywh': cxcywh[keep],
+        'scores': scores[keep],
+        'classes': classes[keep],
+    }
+    if labels is not None:
+        detections['names'] = [labels[c] for c in detections['classes']]
+    return detections
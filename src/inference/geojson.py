@@ -0,0 +1,387 @@
+import json
+import math
+from pathlib import Path
+import cv2
+import numpy as np
+from src.data_processing.ortophoto_utils import iter_tiles, open_strip_reader
+
+try:
+    import rasterio
+except ImportError:  # rasterio es opcional; sin él se usan world files o una transformación explícita
+    rasterio = None
+
+# Sufijos de world file por extensión de imagen; también se aceptan <ext>w y .wld
+WORLD_FILE_SUFFIXES = {
+    '.jpg': '.jgw', '.jpeg': '.jgw', '.png': '.pgw', '.tif': '.tfw', '.tiff': '.tfw', '.bmp': '.bpw',
+}
+
+def read_world_file(path: Path) -> tuple:
+    """
+    Lee un world file y lo convierte a una transformación afín sobre esquinas de píxel.
+
+    El world file georreferencia el centro del píxel superior izquierdo; la
+    transformación devuelta (a, b, c, d, e, f) aplica a coordenadas continuas
+    de píxel (x, y) con el origen en la esquina: X = a·x + b·y + c, Y = d·x + e·y + f.
+
+    Args:
+        path (Path): Ruta al world file.
+
+    Returns:
+        tuple: Transformación (a, b, c, d, e, f).
+    """
+    a, d, b, e, c, f = (float(line) for line in Path(path).read_text().split()[:6])
+    return a, b, c - 0.5 * a - 0.5 * b, d, e, f - 0.5 * d - 0.5 * e
+
+def find_world_file(image_path: Path) -> Path:
+    """World file junto a la imagen (.jgw, .tfw, <ext>w o .wld), o None si no existe."""
+    image_path = Path(image_path)
+    suffix = image_path.suffix.lower()
+    candidates = [WORLD_FILE_SUFFIXES.get(suffix), suffix[:2] + suffix[-1] + 'w', suffix + 'w', '.wld']
+    for candidate in candidates:
+        if candidate and image_path.with_suffix(candidate).exists():
+            return image_path.with_suffix(candidate)
+    return None
+
+def load_georeference(image_path: Path, transform: list = None, world_file: Path = None, crs: str = None) -> tuple:
+    """
+    Obtiene la georreferenciación de una imagen.
+
+    Prioridad: transformación explícita, world file indicado, world file junto a
+    la imagen y, si rasterio está instalado, la transformación del GeoTIFF.
+
+    Args:
+        image_path (Path): Ruta a la imagen.
+        transform (list): Transformación afín (a, b, c, d, e, f) sobre esquinas de píxel.
+        world_file (Path): Ruta a un world file.
+        crs (str): Sistema de referencia (p. ej. 'EPSG:32614').
+
+    Returns:
+        tuple: (transformación o None si la imagen no está georreferenciada, crs).
+    """
+    if transform is not None:
+        return tuple(float(v) for v in transform), crs
+    world_file = world_file or find_world_file(image_path)
+    if world_file is not None:
+        return read_world_file(world_file), crs
+    if rasterio is not None:
+        try:
+            with rasterio.open(image_path) as dataset:
+                if dataset.crs is not None:
+                    t = dataset.transform
+                    return (t.a, t.b, t.c, t.d, t.e, t.f), crs or dataset.crs.to_string()
+        except rasterio.errors.RasterioIOError:
+            pass
+    return None, crs
+
+def apply_transform(points: np.ndarray, transform: tuple) -> np.ndarray:
+    """Aplica una transformación afín a un arreglo (N, 2) de coordenadas de píxel."""
+    if transform is None:
+        return points
+    a, b, c, d, e, f = transform
+    x, y = points[:, 0].astype(np.float64), points[:, 1].astype(np.float64)
+    return np.stack([a * x + b * y + c, d * x + e * y + f], axis=1)
+
+def default_precision(transform: tuple) -> int:
+    """Decimales suficientes para una décima del tamaño de píxel (1 en coordenadas de píxel)."""
+    pixel = math.hypot(transform[0], transform[3]) if transform is not None else 1.0
+    return max(math.ceil(-math.log10(pixel)) + 1, 0)
+
+def simplify_line(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplifica una polilínea con Douglas-Peucker, conservando los extremos.
+
+    Cada segmento evalúa la distancia de todos sus puntos intermedios en una sola
+    operación de NumPy; la recursión se reemplaza por una pila.
+
+    Args:
+        points (np.ndarray): Vértices (N, 2).
+        tolerance (float): Distancia máxima en píxeles entre la línea original y la simplificada.
+
+    Returns:
+        np.ndarray: Vértices conservados.
+    """
+    n = len(points)
+    if n < 3:
+        return points
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        p0 = points[start]
+        dx, dy = points[end] - p0
+        inner = points[start + 1:end] - p0
+        norm = math.hypot(dx, dy)
+        if norm == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(dx * inner[:, 1] - dy * inner[:, 0]) / norm
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            index = start + 1 + i
+            keep[index] = True
+            stack.extend(((start, index), (index, end)))
+    return points[keep]
+
+def simplify_ring(ring: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplifica un anillo cerrado (sin repetir el primer vértice).
+
+    El anillo se divide en el vértice más lejano al primero y cada mitad se
+    simplifica por separado.
+
+    Returns:
+        np.ndarray: Anillo simplificado, o None si queda con menos de 3 vértices.
+    """
+    if len(ring) < 3:
+        return None
+    far = int(np.argmax(np.hypot(*(ring - ring[0]).T)))
+    if far == 0:
+        return None
+    first = simplify_line(ring[:far + 1], tolerance)
+    second = simplify_line(np.vstack([ring[far:], ring[:1]]), tolerance)
+    simplified = np.vstack([first, second[1:-1]])
+    return simplified if len(simplified) >= 3 else None
+
+def simplify_polygon(rings: list, tolerance: float, max_vertices: int = None) -> list:
+    """
+    Simplifica un polígono (anillo exterior y huecos) respetando un máximo de vértices.
+
+    Si con la tolerancia dada el polígono excede max_vertices, la tolerancia se
+    duplica hasta cumplirlo.
+
+    Args:
+        rings (list): Anillo exterior seguido de los huecos, cada uno (N, 2).
+        tolerance (float): Tolerancia de Douglas-Peucker en píxeles.
+        max_vertices (int): Vértices máximos del polígono.
+
+    Returns:
+        list: Anillos simplificados, o None si el exterior colapsa.
+    """
+    while True:
+        exterior = simplify_ring(rings[0], tolerance)
+        if exterior is None:
+            return None
+        holes = [hole for hole in (simplify_ring(r, tolerance) for r in rings[1:]) if hole is not None]
+        simplified = [exterior, *holes]
+        if max_vertices is None or sum(len(r) for r in simplified) <= max_vertices or tolerance > 1e4:
+            return simplified
+        tolerance *= 2
+
+def mask_to_polygons(mask: np.ndarray, min_area: float = 0.0) -> list:
+    """
+    Vectoriza una máscara binaria en polígonos con huecos.
+
+    Args:
+        mask (np.ndarray): Máscara (H, W) uint8.
+        min_area (float): Área mínima en píxeles de los anillos exteriores.
+
+    Returns:
+        list: Polígonos, cada uno una lista [exterior, *huecos] de arreglos (N, 2)
+            en coordenadas continuas de píxel (centro del píxel en +0.5).
+    """
+    contours, hierarchy = cv2.findContours(mask, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    if hierarchy is None:
+        return []
+    hierarchy = hierarchy[0]
+    polygons = []
+    for i, contour in enumerate(contours):
+        if hierarchy[i][3] != -1 or cv2.contourArea(contour) < max(min_area, 1e-9):
+            continue
+        rings = [contour[:, 0].astype(np.float64) + 0.5]
+        child = hierarchy[i][2]
+        while child != -1:
+            rings.append(contours[child][:, 0].astype(np.float64) + 0.5)
+            child = hierarchy[child][0]
+        polygons.append(rings)
+    return polygons
+
+def _signed_area(ring: np.ndarray) -> float:
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+def _ring_coordinates(ring: np.ndarray, counterclockwise: bool, precision: int) -> list:
+    """Anillo cerrado con la orientación de RFC 7946 y las coordenadas redondeadas."""
+    if (_signed_area(ring) > 0) != counterclockwise:
+        ring = ring[::-1]
+    ring = np.round(np.vstack([ring, ring[:1]]), precision)
+    return ring.tolist()
+
+class GeoJSONWriter:
+    """
+    Escritor incremental de GeoJSON.
+
+    Cada feature se escribe en cuanto se agrega, de modo que la memoria no depende
+    del tamaño de la ortofoto. Con sufijo .geojsonl (o .geojsons) escribe una
+    feature por línea (GeoJSON secuencial); si no, un FeatureCollection.
+
+    Args:
+        path (Path): Archivo de salida.
+        crs (str): Sistema de referencia, escrito como miembro 'crs' para QGIS/GDAL.
+    """
+
+    def __init__(self, path: Path, crs: str = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sequence = self.path.suffix.lower() in ('.geojsonl', '.geojsons')
+        self.count = 0
+        self.file = open(self.path, 'w')
+        if not self.sequence:
+            header = {'type': 'FeatureCollection'}
+            if crs:
+                header['crs'] = {'type': 'name', 'properties': {'name': crs}}
+            self.file.write(json.dumps(header)[:-1] + ', "features": [\n')
+
+    def write(self, geometry: dict, properties: dict):
+        feature = json.dumps({'type': 'Feature', 'geometry': geometry, 'properties': properties},
+                             separators=(',', ':'))
+        if self.sequence:
+            self.file.write(feature + '\n')
+        else:
+            self.file.write((',\n' if self.count else '') + feature)
+        self.count += 1
+
+    def close(self):
+        if self.file is None:
+            return
+        if not self.sequence:
+            self.file.write('\n]}\n')
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def polygons_geometry(polygons: list, transform: tuple, precision: int) -> dict:
+    """
+    Geometría GeoJSON (Polygon o MultiPolygon) de polígonos en coordenadas de píxel globales.
+
+    Args:
+        polygons (list): Polígonos [exterior, *huecos].
+        transform (tuple): Transformación afín, o None para coordenadas de píxel.
+        precision (int): Decimales de las coordenadas.
+
+    Returns:
+        dict: Geometría GeoJSON.
+    """
+    parts = []
+    for rings in polygons:
+        rings = [apply_transform(ring, transform) for ring in rings]
+        parts.append([_ring_coordinates(rings[0], True, precision)] +
+                     [_ring_coordinates(hole, False, precision) for hole in rings[1:]])
+    if len(parts) == 1:
+        return {'type': 'Polygon', 'coordinates': parts[0]}
+    return {'type': 'MultiPolygon', 'coordinates': parts}
+
+def _core_window(left: int, upper: int, right: int, lower: int, width: int, height: int,
+                 tile_size: int, step: int) -> tuple:
+    """
+    Región del mosaico que le pertenece, en coordenadas locales.
+
+    Los límites están a la mitad del traslape con los vecinos, por lo que las
+    regiones de mosaicos contiguos se tocan sin superponerse.
+    """
+    half = round((tile_size - step) / 2)
+    x0 = 0 if left == 0 else half
+    y0 = 0 if upper == 0 else half
+    x1 = right - left if right >= width else step + half
+    y1 = lower - upper if lower >= height else step + half
+    return x0, y0, x1, y1
+
+def export_mask_polygons(model, image_path: Path, output_path: Path, tile_size: int = 640, overlap: float = 0.2,
+                         imgsz: int = 640, conf: float = 0.25, batch_size: int = 8, tolerance: float = 1.5,
+                         max_vertices: int = 256, min_area: float = 16.0, transform: list = None,
+                         world_file: Path = None, crs: str = None, precision: int = None,
+                         windowed: bool = True, keep: set = None) -> dict:
+    """
+    Exporta las máscaras de un modelo de segmentación como polígonos GeoJSON, mosaico por mosaico.
+
+    Cada máscara se recorta a la región propia del mosaico (la mitad del traslape
+    con cada vecino), se vectoriza, se simplifica con Douglas-Peucker y se escribe
+    de inmediato, de modo que no se acumulan geometrías en memoria. Los objetos
+    que cruzan mosaicos quedan como piezas contiguas con el mismo 'cls' y su
+    'tile', que pueden disolverse en un SIG.
+
+    Args:
+        model (YOLO): Modelo YOLO de segmentación.
+        image_path (Path): Ruta a la imagen u ortofoto.
+        output_path (Path): Archivo .geojson o .geojsonl de salida.
+        tile_size (int): Tamaño de los mosaicos en píxeles.
+        overlap (float): Proporción de traslape entre mosaicos (0 a 1).
+        imgsz (int): Tamaño de imagen de entrada del modelo.
+        conf (float): Umbral de confianza.
+        batch_size (int): Mosaicos por llamada a model.predict.
+        tolerance (float): Tolerancia de simplificación en píxeles.
+        max_vertices (int): Vértices máximos por polígono.
+        min_area (float): Área mínima en píxeles de cada polígono.
+        transform (list): Transformación afín (a, b, c, d, e, f) sobre esquinas de píxel.
+        world_file (Path): World file; por defecto se busca junto a la imagen.
+        crs (str): Sistema de referencia de la salida.
+        precision (int): Decimales de las coordenadas; por defecto una décima de píxel.
+        windowed (bool): Lee la ortofoto por franjas para acotar la memoria.
+        keep (set): Celdas (row, col) a procesar (ver select_tiles); por defecto todas.
+
+    Returns:
+        dict: Estadísticas (features, vértices antes y después de simplificar, tamaño del archivo,
+            georreferenciada).
+    """
+    transform, crs = load_georeference(image_path, transform, world_file, crs)
+    precision = default_precision(transform) if precision is None else precision
+    with open_strip_reader(image_path) as reader:
+        width, height = reader.size
+    step = max(int(tile_size * (1 - overlap)), 1)
+    names = getattr(model, 'names', {}) or {}
+    pixel_area = abs(transform[0] * transform[4] - transform[1] * transform[3]) if transform else 1.0
+    stats = {'features': 0, 'raw_vertices': 0, 'vertices': 0}
+
+    with GeoJSONWriter(output_path, crs) as writer:
+        batch = []
+
+        def flush():
+            results = model.predict(source=[tile for tile, _ in batch], imgsz=imgsz, conf=conf,
+                                     retina_masks=True, verbose=False)
+            for (_, (row, col, left, upper, right, lower)), result in zip(batch, results):
+                if result.masks is None:
+                    continue
+                x0, y0, x1, y1 = _core_window(left, upper, right, lower, width, height, tile_size, step)
+                masks = result.masks.data.cpu().numpy() > 0.5
+                scores = result.boxes.conf.cpu().numpy()
+                classes = result.boxes.cls.cpu().numpy().astype(np.int64)
+                for mask, score, cls in zip(masks, scores, classes):
+                    core = np.zeros(mask.shape, dtype=np.uint8)
+                    core[y0:y1, x0:x1] = mask[y0:y1, x0:x1]
+                    polygons = []
+                    for rings in mask_to_polygons(core, min_area):
+                        stats['raw_vertices'] += sum(len(r) for r in rings)
+                        simplified = simplify_polygon(rings, tolerance, max_vertices)
+                        if simplified is not None:
+                            polygons.append([ring + (left, upper) for ring in simplified])
+                    if not polygons:
+                        continue
+                    area = sum(abs(_signed_area(r[0])) - sum(abs(_signed_area(h)) for h in r[1:]) for r in polygons)
+                    stats['vertices'] += sum(len(r) for rings in polygons for r in rings)
+                    writer.write(polygons_geometry(polygons, transform, precision), {
+                        'cls': int(cls),
+                        'name': names.get(int(cls), str(int(cls))),
+                        'conf': round(float(score), 4),
+                        'area': round(area * pixel_area, 4),
+                        'tile': [row, col],
+                    })
+            batch.clear()
+
+        for row, col, left, upper, tile in iter_tiles(image_path, tile_size, overlap, windowed, keep):
+            batch.append((tile, (row, col, left, upper, left + tile.size[0], upper + tile.size[1])))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        stats['features'] = writer.count
+
+    stats['size_kb'] = Path(output_path).stat().st_size / 1024
+    stats['georeferenced'] = transform is not None
+    return stats
@@ -0,0 +1,176 @@
+import cv2
+import numpy as np
+
+def box_area(boxes: np.ndarray) -> np.ndarray:
+    """
+    Calcula el área de cajas en formato xyxy.
+
+    Args:
+        boxes (np.ndarray): Cajas de forma (N, 4).
+
+    Returns:
+        np.ndarray: Áreas de forma (N,).
+    """
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+def box_overlap(box: np.ndarray, boxes: np.ndarray, metric: str = 'iou') -> np.ndarray:
+    """
+    Calcula el traslape entre una caja y un conjunto de cajas.
+
+    Args:
+        box (np.ndarray): Caja xyxy de forma (4,).
+        boxes (np.ndarray): Cajas xyxy de forma (N, 4).
+        metric (str): 'iou' (intersección sobre unión) o 'ios' (intersección sobre la menor).
+
+    Returns:
+        np.ndarray: Traslape de forma (N,).
+    """
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = box_area(box[None, :])[0]
+    areas = box_area(boxes)
+    if metric == 'ios':
+        denominator = np.minimum(area, areas)
+    else:
+        denominator = area + areas - intersection
+    return intersection / np.maximum(denominator, 1e-9)
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.5, classes: np.ndarray = None) -> np.ndarray:
+    """
+    Supresión de no máximos voraz sobre cajas xyxy.
+
+    Args:
+        boxes (np.ndarray): Cajas de forma (N, 4).
+        scores (np.ndarray): Confianzas de forma (N,).
+        iou_threshold (float): Se suprimen cajas con IoU >= umbral.
+        classes (np.ndarray): Si se indica, la supresión es por clase.
+
+    Returns:
+        np.ndarray: Índices conservados, ordenados por confianza descendente.
+    """
+    if classes is not None and len(boxes):
+        # Desplaza cada clase a una región disjunta para suprimir solo dentro de la clase
+        offset = boxes.max() + 1
+        boxes = boxes + (classes.astype(boxes.dtype) * offset)[:, None]
+
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        iou = box_overlap(boxes[i], boxes[order[1:]])
+        order = order[1:][iou < iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+def union_polygons(polygons: list) -> np.ndarray:
+    """
+    Une polígonos que se traslapan rasterizándolos en una máscara común.
+
+    Args:
+        polygons (list): Polígonos (K, 2) en píxeles; se ignoran los None.
+
+    Returns:
+        np.ndarray: Contorno exterior más grande de la unión (K, 2) en float32, o None.
+    """
+    polygons = [polygon for polygon in polygons if polygon is not None and len(polygon) >= 3]
+    if len(polygons) <= 1:
+        return polygons[0] if polygons else None
+    points = np.concatenate(polygons)
+    origin = np.floor(points.min(axis=0))
+    width, height = (np.ceil(points.max(axis=0)) - origin).astype(int) + 2
+    mask = np.zeros((height, width), np.uint8)
+    cv2.fillPoly(mask, [np.round(polygon - origin).astype(np.int32) for polygon in polygons], 1)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contour = max(contours, key=cv2.contourArea)
+    return contour[:, 0].astype(np.float32) + origin.astype(np.float32)
+
+def _window_neighbors(windows: np.ndarray) -> list:
+    """Para cada ventana, las otras ventanas con las que comparte área (su banda de traslape)."""
+    bin_size = max(float(np.min(windows[:, 2:] - windows[:, :2])), 1.0)
+    bins = {}
+    spans = []
+    for index, (left, upper, right, lower) in enumerate(windows):
+        span = [(bx, by) for bx in range(int(left // bin_size), int((right - 1) // bin_size) + 1)
+                for by in range(int(upper // bin_size), int((lower - 1) // bin_size) + 1)]
+        spans.append(span)
+        for key in span:
+            bins.setdefault(key, []).append(index)
+    neighbors = []
+    for index, span in enumerate(spans):
+        candidates = {other for key in span for other in bins[key] if other != index}
+        bands = []
+        for other in sorted(candidates):
+            band = np.concatenate([np.maximum(windows[index, :2], windows[other, :2]),
+                                   np.minimum(windows[index, 2:], windows[other, 2:])])
+            if band[2] > band[0] and band[3] > band[1]:
+                bands.append((other, band))
+        neighbors.append(bands)
+    return neighbors
+
+def _touches(boxes: np.ndarray, band: np.ndarray) -> np.ndarray:
+    """Indica qué cajas xyxy comparten área con la banda."""
+    return ((np.minimum(boxes[:, 2], band[2]) > np.maximum(boxes[:, 0], band[0]))
+            & (np.minimum(boxes[:, 3], band[3]) > np.maximum(boxes[:, 1], band[1])))
+
+def merge_detections(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, windows: np.ndarray,
+                     polygons: list = None, match_threshold: float = 0.5, metric: str = 'ios'):
+    """
+    Fusiona detecciones duplicadas de mosaicos traslapados.
+
+    Solo se comparan detecciones de mosaicos distintos cuyas cajas caen en la
+    banda de traslape de ambos mosaicos, de modo que dos objetos anidados del
+    mismo mosaico se conservan y el costo depende de las detecciones de cada
+    banda y no del total de la ortofoto. Cada grupo de cajas de la misma clase
+    que se traslapan por encima del umbral se reduce a la de mayor confianza,
+    extendida a la unión del grupo (cajas y polígonos) para recuperar objetos
+    cortados en el borde de un mosaico.
+
+    Args:
+        boxes (np.ndarray): Cajas globales xyxy de forma (N, 4).
+        scores (np.ndarray): Confianzas de forma (N,).
+        classes (np.ndarray): Clases de forma (N,).
+        windows (np.ndarray): Ventana global (left, upper, right, lower) del mosaico de cada detección, (N, 4).
+        polygons (list): Polígonos globales de cada detección (o None); se unen al fusionar.
+        match_threshold (float): Traslape mínimo para considerar un duplicado.
+        metric (str): Métrica de traslape, 'ios' o 'iou'.
+
+    Returns:
+        tuple: (keep, merged_boxes, merged_polygons) con los índices conservados y sus cajas
+            y polígonos fusionados.
+    """
+    polygons = polygons if polygons is not None else [None] * len(boxes)
+    tile_windows, tile_ids = np.unique(np.asarray(windows), axis=0, return_inverse=True)
+    tile_ids = tile_ids.reshape(-1)
+    members = [np.flatnonzero(tile_ids == tile) for tile in range(len(tile_windows))]
+    neighbors = _window_neighbors(tile_windows)
+
+    merged = boxes.copy()
+    merged_polygons = []
+    alive = np.ones(len(boxes), dtype=bool)
+    keep = []
+    for i in np.argsort(-scores, kind='stable'):
+        if not alive[i]:
+            continue
+        alive[i] = False
+        group = []
+        for other, band in neighbors[tile_ids[i]]:
+            if not _touches(boxes[i:i + 1], band)[0]:
+                continue
+            rest = members[other][alive[members[other]]]
+            rest = rest[(classes[rest] == classes[i]) & _touches(boxes[rest], band)]
+            if rest.size:
+                duplicates = rest[box_overlap(boxes[i], boxes[rest], metric) >= match_threshold]
+                alive[duplicates] = False
+                group.extend(duplicates)
+        polygon = polygons[i]
+        if group:
+            merged[i, :2] = np.minimum(boxes[i, :2], boxes[group, :2].min(axis=0))
+            merged[i, 2:] = np.maximum(boxes[i, 2:], boxes[group, 2:].max(axis=0))
+            polygon = union_polygons([polygon] + [polygons[j] for j in group])
+        keep.append(i)
+        merged_polygons.append(polygon)
+    keep = np.asarray(keep, dtype=np.int64)
+    return keep, merged[keep], merged_polygons
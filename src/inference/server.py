@@ -0,0 +1,209 @@
+import json
+import queue
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+
+class _Request:
+    __slots__ = ('image', 'event', 'result', 'error', 'enqueued')
+
+    def __init__(self, image: np.ndarray):
+        self.image = image
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.enqueued = time.perf_counter()
+
+def result_to_dict(result) -> dict:
+    """
+    Convierte un resultado de Ultralytics a un diccionario serializable en JSON.
+
+    Args:
+        result (Results): Resultado de model.predict para una imagen.
+
+    Returns:
+        dict: boxes (xyxy en píxeles), scores, classes y names.
+    """
+    boxes = result.boxes
+    classes = boxes.cls.cpu().numpy().astype(int).tolist()
+    # float64 para que el redondeo no arrastre el error de representación de float32
+    return {
+        'boxes': np.round(boxes.xyxy.cpu().numpy().astype(float), 2).tolist(),
+        'scores': np.round(boxes.conf.cpu().numpy().astype(float), 4).tolist(),
+        'classes': classes,
+        'names': [result.names[c] for c in classes],
+    }
+
+class MicroBatcher:
+    """
+    Agrupa solicitudes concurrentes en micro-lotes para un modelo cargado.
+
+    Un hilo dedicado toma la primera solicitud de la cola y espera como máximo
+    max_wait_ms a que lleguen más, hasta max_batch_size, antes de llamar a
+    model.predict una sola vez para todo el lote.
+    """
+
+    def __init__(self, model, imgsz: int = 640, conf: float = 0.25, max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0):
+        self.model = model
+        self.imgsz = imgsz
+        self.conf = conf
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._latencies = deque(maxlen=4096)
+        self._batch_sizes = deque(maxlen=4096)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def warmup(self):
+        """Ejecuta una predicción sobre una imagen vacía para inicializar el modelo."""
+        self.submit(np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8))
+
+    def submit(self, image: np.ndarray) -> dict:
+        """
+        Encola una imagen BGR y espera su resultado.
+
+        Args:
+            image (np.ndarray): Imagen BGR.
+
+        Returns:
+            dict: Detecciones de la imagen.
+        """
+        request = _Request(image)
+        self._queue.put(request)
+        request.event.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                results = self.model.predict(source=[request.image for request in batch], imgsz=self.imgsz,
+                                             conf=self.conf, verbose=False)
+                for request, result in zip(batch, results):
+                    request.result = result_to_dict(result)
+            except Exception as error:
+                for request in batch:
+                    request.error = error
+            finally:
+                now = time.perf_counter()
+                self._batch_sizes.append(len(batch))
+                for request in batch:
+                    self._latencies.append(now - request.enqueued)
+                    request.event.set()
+                self.requests += len(batch)
+
+    def stats(self) -> dict:
+        """
+        Profundidad de la cola y percentiles de latencia recientes.
+
+        Returns:
+            dict: queue_depth, requests, mean_batch_size y latencias p50/p95/p99 en ms.
+        """
+        latencies = np.array(self._latencies) * 1000
+        stats = {
+            'queue_depth': self._queue.qsize(),
+            'requests': self.requests,
+            'mean_batch_size': float(np.mean(self._batch_sizes)) if self._batch_sizes else 0.0,
+        }
+        for percentile in (50, 95, 99):
+            stats[f'latency_p{percentile}_ms'] = float(np.percentile(latencies, percentile)) if latencies.size else 0.0
+        return stats
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    """
+    Rutas HTTP del servidor de inferencia.
+
+    GET /health, GET /stats y POST /predict/<modelo> con los bytes de la imagen
+    (JPEG, PNG, ...) como cuerpo de la solicitud.
+    """
+
+    server_version = 'HarvestInference/1.0'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'models': sorted(self.server.batchers)})
+        elif self.path == '/stats':
+            self._send_json(200, {name: batcher.stats() for name, batcher in self.server.batchers.items()})
+        else:
+            self._send_json(404, {'error': f'Ruta no encontrada: {self.path}'})
+
+    def do_POST(self):
+        prefix = '/predict/'
+        name = self.path[len(prefix):] if self.path.startswith(prefix) else None
+        batcher = self.server.batchers.get(name)
+        if batcher is None:
+            self._send_json(404, {'error': f'Modelo no encontrado: {name}'})
+            return
+
+        data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            self._send_json(400, {'error': 'No se pudo decodificar la imagen.'})
+            return
+
+        try:
+            self._send_json(200, batcher.submit(image))
+        except Exception as error:
+            self._send_json(500, {'error': str(error)})
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # En un Unix socket client_address es una cadena vacía
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    # Cola de conexiones amplia para que los clientes concurrentes no se rechacen
+    request_queue_size = 128
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+def create_server(batchers: dict, host: str = '127.0.0.1', port: int = 8765, socket_path: str = None):
+    """
+    Crea el servidor HTTP sobre TCP local o sobre un Unix socket.
+
+    Args:
+        batchers (dict): MicroBatcher por nombre de modelo.
+        host (str): Dirección TCP (solo localhost se recomienda).
+        port (int): Puerto TCP.
+        socket_path (str): Si se indica, escucha en este Unix socket en lugar de TCP.
+
+    Returns:
+        socketserver.BaseServer: Servidor listo para serve_forever().
+    """
+    if socket_path:
+        server = ThreadingUnixHTTPServer(socket_path, InferenceHandler)
+    else:
+        server = LocalHTTPServer((host, port), InferenceHandler)
+    server.batchers = batchers
+    return server
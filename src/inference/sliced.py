@@ -0,0 +1,124 @@
+import json
+from pathlib import Path
+import numpy as np
+from src.data_processing.ortophoto_utils import iter_tiles
+from src.inference.postprocessing import merge_detections
+
+def _result_to_arrays(result, left: int, upper: int):
+    """Convierte un resultado de Ultralytics a arreglos en coordenadas globales."""
+    boxes = result.boxes.xyxy.cpu().numpy().astype(np.float32)
+    boxes[:, [0, 2]] += left
+    boxes[:, [1, 3]] += upper
+    scores = result.boxes.conf.cpu().numpy().astype(np.float32)
+    classes = result.boxes.cls.cpu().numpy().astype(np.int64)
+    if result.masks is not None:
+        polygons = [xy + np.array([left, upper], dtype=np.float32) for xy in result.masks.xy]
+    else:
+        polygons = [None] * len(boxes)
+    return boxes, scores, classes, polygons
+
+def predict_orthophoto(model, image_path: Path, tile_size: int = 640, overlap: float = 0.2,
+                       imgsz: int = 640, conf: float = 0.25, batch_size: int = 8,
+                       match_threshold: float = 0.5, windowed: bool = True, keep: set = None) -> dict:
+    """
+    Ejecuta inferencia por mosaicos sobre una ortofoto completa.
+
+    Los mosaicos se generan en memoria con la misma rejilla que create_tiles,
+    se envían al modelo por lotes y las detecciones se trasladan a coordenadas
+    globales antes de fusionar los duplicados de las bandas de traslape entre
+    mosaicos vecinos.
+
+    Args:
+        model (YOLO): Modelo YOLO cargado.
+        image_path (Path): Ruta a la ortofoto.
+        tile_size (int): Tamaño de los mosaicos en píxeles.
+        overlap (float): Proporción de traslape entre mosaicos (0 a 1).
+        imgsz (int): Tamaño de imagen de entrada del modelo.
+        conf (float): Umbral de confianza.
+        batch_size (int): Mosaicos por llamada a model.predict.
+        match_threshold (float): Traslape (IoS) mínimo para fusionar duplicados.
+        windowed (bool): Lee la ortofoto por franjas para acotar la memoria.
+        keep (set): Celdas (row, col) a procesar (ver select_tiles); por defecto todas.
+
+    Returns:
+        dict: Detecciones globales con llaves boxes, scores, classes y polygons.
+    """
+    boxes, scores, classes, polygons, windows = [], [], [], [], []
+    batch = []
+
+    def flush():
+        results = model.predict(source=[tile for tile, _, _ in batch], imgsz=imgsz, conf=conf, verbose=False)
+        for (tile, left, upper), result in zip(batch, results):
+            tile_boxes, tile_scores, tile_classes, tile_polygons = _result_to_arrays(result, left, upper)
+            boxes.append(tile_boxes)
+            scores.append(tile_scores)
+            classes.append(tile_classes)
+            polygons.extend(tile_polygons)
+            windows.append(np.tile(np.array([left, upper, left + tile.width, upper + tile.height],
+                                            dtype=np.float32), (len(tile_boxes), 1)))
+        batch.clear()
+
+    for _, _, left, upper, tile in iter_tiles(image_path, tile_size, overlap, windowed, keep):
+        batch.append((tile, left, upper))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    if not boxes or not sum(len(b) for b in boxes):
+        return {'boxes': np.zeros((0, 4), np.float32), 'scores': np.zeros(0, np.float32),
+                'classes': np.zeros(0, np.int64), 'polygons': []}
+
+    boxes = np.concatenate(boxes)
+    scores = np.concatenate(scores)
+    classes = np.concatenate(classes)
+    windows = np.concatenate(windows)
+    keep, merged, merged_polygons = merge_detections(boxes, scores, classes, windows, polygons, match_threshold)
+    return {
+        'boxes': merged,
+        'scores': scores[keep],
+        'classes': classes[keep],
+        'polygons': merged_polygons,
+    }
+
+def scale_detections(detections: dict, scale: float) -> dict:
+    """
+    Lleva las detecciones de un nivel reducido de la pirámide a píxeles de la ortofoto.
+
+    Args:
+        detections (dict): Salida de predict_orthophoto.
+        scale (float): Factor de reducción del nivel.
+
+    Returns:
+        dict: Detecciones con cajas y polígonos escalados.
+    """
+    return {
+        **detections,
+        'boxes': detections['boxes'] * np.float32(scale),
+        'polygons': [None if polygon is None else polygon * np.float32(scale) for polygon in detections['polygons']],
+    }
+
+def save_detections(detections: dict, output_path: Path, names: dict = None):
+    """
+    Guarda un conjunto global de detecciones en JSON.
+
+    Args:
+        detections (dict): Salida de predict_orthophoto.
+        output_path (Path): Ruta del archivo JSON.
+        names (dict): Nombres de clase del modelo.
+    """
+    names = names or {}
+    features = []
+    for box, score, cls, polygon in zip(detections['boxes'], detections['scores'],
+                                        detections['classes'], detections['polygons']):
+        features.append({
+            'box': [round(float(v), 2) for v in box],
+            'conf': round(float(score), 4),
+            'cls': int(cls),
+            'name': names.get(int(cls), str(int(cls))),
+            'polygon': None if polygon is None else np.round(polygon, 2).tolist(),
+        })
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as file:
+        json.dump({'detections': features}, file)
@@ -0,0 +1,314 @@
+import json
+import math
+from pathlib import Path
+import numpy as np
+from src.inference.geojson import apply_transform
+
+class DetectionIndex:
+    """
+    Índice espacial empaquetado sobre los centros de las detecciones.
+
+    Los puntos se agrupan en una rejilla uniforme y se guardan ordenados por
+    celda (formato CSR: points[offsets[c]:offsets[c + 1]] son los puntos de la
+    celda c), de modo que una consulta solo revisa los puntos de las celdas que
+    toca. Todo el índice son arreglos de NumPy y se serializa con save/load.
+
+    Args:
+        points (np.ndarray): Centros (N, 2) en coordenadas de píxel globales o geográficas.
+        classes (np.ndarray): Clase de cada punto.
+        scores (np.ndarray): Confianza de cada punto.
+        cell_size (float): Tamaño de celda; por defecto ~4 puntos por celda.
+        transform (tuple): Transformación con la que se georreferenciaron los puntos, guardada con el índice.
+    """
+
+    def __init__(self, points: np.ndarray, classes: np.ndarray = None, scores: np.ndarray = None,
+                 cell_size: float = None, transform: tuple = None):
+        self.transform = None if transform is None else tuple(float(v) for v in transform)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        classes = np.zeros(len(points), np.int64) if classes is None else np.asarray(classes, np.int64)
+        scores = np.ones(len(points), np.float32) if scores is None else np.asarray(scores, np.float32)
+
+        if len(points):
+            self.origin = points.min(axis=0)
+            extent = np.maximum(points.max(axis=0) - self.origin, 1e-9)
+        else:
+            self.origin, extent = np.zeros(2), np.ones(2)
+        if cell_size is None:
+            cell_size = math.sqrt(extent[0] * extent[1] * 4 / max(len(points), 1)) or float(extent.max())
+        self.cell_size = float(cell_size)
+        self.shape = (int(extent[1] // self.cell_size) + 1, int(extent[0] // self.cell_size) + 1)
+
+        cells = self._cell_ids(points)
+        order = np.argsort(cells, kind='stable')
+        self.points, self.classes, self.scores = points[order], classes[order], scores[order]
+        self.offsets = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.shape[0] * self.shape[1]), out=self.offsets[1:])
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _cell_coords(self, points: np.ndarray) -> tuple:
+        rows = np.clip(((points[:, 1] - self.origin[1]) // self.cell_size).astype(np.int64), 0, self.shape[0] - 1)
+        cols = np.clip(((points[:, 0] - self.origin[0]) // self.cell_size).astype(np.int64), 0, self.shape[1] - 1)
+        return rows, cols
+
+    def _cell_ids(self, points: np.ndarray) -> np.ndarray:
+        rows, cols = self._cell_coords(points)
+        return rows * self.shape[1] + cols
+
+    def _cell_range(self, xmin: float, ymin: float, xmax: float, ymax: float) -> tuple:
+        """Filas y columnas de celdas [r0, r1) × [c0, c1) que intersectan una ventana."""
+        c0 = max(int((xmin - self.origin[0]) // self.cell_size), 0)
+        r0 = max(int((ymin - self.origin[1]) // self.cell_size), 0)
+        c1 = min(int((xmax - self.origin[0]) // self.cell_size) + 1, self.shape[1])
+        r1 = min(int((ymax - self.origin[1]) // self.cell_size) + 1, self.shape[0])
+        return r0, r1, c0, c1
+
+    def candidates(self, xmin: float, ymin: float, xmax: float, ymax: float) -> np.ndarray:
+        """Índices de los puntos de las celdas que intersectan una ventana (sin filtrar)."""
+        r0, r1, c0, c1 = self._cell_range(xmin, ymin, xmax, ymax)
+        if r0 >= r1 or c0 >= c1:
+            return np.zeros(0, dtype=np.int64)
+        # Las celdas de una fila son contiguas en el orden CSR
+        starts = self.offsets[np.arange(r0, r1) * self.shape[1] + c0]
+        ends = self.offsets[np.arange(r0, r1) * self.shape[1] + c1]
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+
+    def _mask(self, cls) -> np.ndarray:
+        if cls is None:
+            return np.ones(len(self.points), dtype=bool)
+        return np.isin(self.classes, np.atleast_1d(cls))
+
+    def window_counts(self, windows: np.ndarray, cls=None) -> np.ndarray:
+        """
+        Cuenta los puntos dentro de muchas ventanas [xmin, ymin, xmax, ymax).
+
+        Las celdas completamente interiores se suman con una tabla de sumas
+        acumuladas de la rejilla; solo los puntos de las celdas del borde se
+        comparan uno a uno.
+
+        Args:
+            windows (np.ndarray): Ventanas (M, 4).
+            cls (int | list): Clases a contar; por defecto todas.
+
+        Returns:
+            np.ndarray: Conteo por ventana (M,).
+        """
+        windows = np.asarray(windows, dtype=np.float64).reshape(-1, 4)
+        selected = self._mask(cls)
+        cell_counts = np.bincount(self._cell_ids(self.points)[selected], minlength=self.shape[0] * self.shape[1])
+        table = np.zeros((self.shape[0] + 1, self.shape[1] + 1), dtype=np.int64)
+        table[1:, 1:] = cell_counts.reshape(self.shape).cumsum(0).cumsum(1)
+
+        # Celdas interiores: completamente dentro de la ventana
+        ir0 = np.clip(np.ceil((windows[:, 1] - self.origin[1]) / self.cell_size), 0, self.shape[0]).astype(np.int64)
+        ic0 = np.clip(np.ceil((windows[:, 0] - self.origin[0]) / self.cell_size), 0, self.shape[1]).astype(np.int64)
+        ir1 = np.clip(np.floor((windows[:, 3] - self.origin[1]) / self.cell_size), 0, self.shape[0]).astype(np.int64)
+        ic1 = np.clip(np.floor((windows[:, 2] - self.origin[0]) / self.cell_size), 0, self.shape[1]).astype(np.int64)
+        ir1, ic1 = np.maximum(ir1, ir0), np.maximum(ic1, ic0)
+        counts = table[ir1, ic1] - table[ir0, ic1] - table[ir1, ic0] + table[ir0, ic0]
+
+        for i, (xmin, ymin, xmax, ymax) in enumerate(windows):
+            index = self.candidates(xmin, ymin, xmax, ymax)
+            if not len(index):
+                continue
+            rows, cols = self._cell_coords(self.points[index])
+            border = ~((rows >= ir0[i]) & (rows < ir1[i]) & (cols >= ic0[i]) & (cols < ic1[i]))
+            index = index[border & selected[index]]
+            x, y = self.points[index, 0], self.points[index, 1]
+            counts[i] += int(np.count_nonzero((x >= xmin) & (x < xmax) & (y >= ymin) & (y < ymax)))
+        return counts
+
+    def grid_counts(self, cell_size: float, origin: tuple = None, shape: tuple = None, cls=None) -> tuple:
+        """
+        Conteo de puntos en una rejilla regular (p. ej. celdas de 10 m).
+
+        Args:
+            cell_size (float): Tamaño de celda de la rejilla.
+            origin (tuple): Esquina (x, y) de la rejilla; por defecto alineada a múltiplos de cell_size.
+            shape (tuple): (filas, columnas); por defecto las que cubren todos los puntos.
+            cls (int | list): Clases a contar; por defecto todas.
+
+        Returns:
+            tuple: (conteos (filas, columnas), origen).
+        """
+        if origin is None:
+            origin = np.floor(self.origin / cell_size) * cell_size
+        origin = np.asarray(origin, dtype=np.float64)
+        points = self.points[self._mask(cls)]
+        if shape is None:
+            extent = (self.points.max(axis=0) - origin) if len(self.points) else np.zeros(2)
+            shape = (int(extent[1] // cell_size) + 1, int(extent[0] // cell_size) + 1)
+        rows = ((points[:, 1] - origin[1]) // cell_size).astype(np.int64)
+        cols = ((points[:, 0] - origin[0]) // cell_size).astype(np.int64)
+        inside = (rows >= 0) & (rows < shape[0]) & (cols >= 0) & (cols < shape[1])
+        counts = np.bincount(rows[inside] * shape[1] + cols[inside], minlength=shape[0] * shape[1])
+        return counts.reshape(shape), tuple(origin)
+
+    def points_in_polygons(self, polygons: list, chunk_size: int = 1 << 20) -> np.ndarray:
+        """
+        Asigna cada punto al polígono que lo contiene (regla par-impar, los huecos se respetan).
+
+        Para cada polígono solo se prueban los puntos de las celdas de su caja
+        envolvente, contra todas sus aristas a la vez.
+
+        Args:
+            polygons (list): Polígonos como listas de anillos (N, 2) [exterior, *huecos]
+                (los MultiPolygon se pasan como la lista de todos sus anillos).
+            chunk_size (int): Máximo de pares punto × arista evaluados a la vez.
+
+        Returns:
+            np.ndarray: Índice del polígono de cada punto, en el orden de self.points (-1 si ninguno).
+        """
+        owner = np.full(len(self.points), -1, dtype=np.int64)
+        for polygon_index, rings in enumerate(polygons):
+            rings = [np.asarray(ring, dtype=np.float64) for ring in rings]
+            vertices = np.vstack(rings)
+            index = self.candidates(*vertices.min(axis=0), *vertices.max(axis=0))
+            index = index[owner[index] < 0]
+            if not len(index):
+                continue
+            starts = np.vstack(rings)
+            ends = np.vstack([np.roll(ring, -1, axis=0) for ring in rings])
+            inside = np.zeros(len(index), dtype=bool)
+            step = max(chunk_size // len(starts), 1)
+            for lo in range(0, len(index), step):
+                px = self.points[index[lo:lo + step], 0][:, None]
+                py = self.points[index[lo:lo + step], 1][:, None]
+                x1, y1, x2, y2 = starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
+                straddles = (y1 > py) != (y2 > py)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+                crossings = np.count_nonzero(straddles & (px < x_cross), axis=1)
+                inside[lo:lo + step] = crossings % 2 == 1
+            owner[index[inside]] = polygon_index
+        return owner
+
+    def polygon_counts(self, polygons: list, num_classes: int = None) -> np.ndarray:
+        """
+        Conteo de puntos por polígono y clase.
+
+        Args:
+            polygons (list): Polígonos como listas de anillos.
+            num_classes (int): Clases; por defecto max(classes) + 1.
+
+        Returns:
+            np.ndarray: Conteos (polígonos, clases).
+        """
+        owner = self.points_in_polygons(polygons)
+        num_classes = num_classes or (int(self.classes.max()) + 1 if len(self.classes) else 1)
+        inside = owner >= 0
+        counts = np.bincount(owner[inside] * num_classes + self.classes[inside],
+                             minlength=len(polygons) * num_classes)
+        return counts.reshape(len(polygons), num_classes)
+
+    def line_counts(self, lines: list, width: float, cls=None) -> np.ndarray:
+        """
+        Cuenta los puntos a menos de width / 2 de cada polilínea (p. ej. hileras de plantación).
+
+        Un punto cercano a varias hileras se asigna solo a la más cercana.
+
+        Args:
+            lines (list): Polilíneas (N, 2).
+            width (float): Ancho del corredor de cada hilera.
+            cls (int | list): Clases a contar; por defecto todas.
+
+        Returns:
+            np.ndarray: Conteo por polilínea.
+        """
+        selected = self._mask(cls)
+        best = np.full(len(self.points), np.inf)
+        owner = np.full(len(self.points), -1, dtype=np.int64)
+        half = width / 2
+        for line_index, line in enumerate(lines):
+            line = np.asarray(line, dtype=np.float64)
+            xmin, ymin = line.min(axis=0) - half
+            xmax, ymax = line.max(axis=0) + half
+            index = self.candidates(xmin, ymin, xmax, ymax)
+            index = index[selected[index]]
+            if not len(index) or len(line) < 2:
+                continue
+            p = self.points[index][:, None, :]
+            a, b = line[:-1][None], line[1:][None]
+            ab = b - a
+            length2 = np.maximum((ab ** 2).sum(-1), 1e-12)
+            t = np.clip(((p - a) * ab).sum(-1) / length2, 0, 1)
+            distance = np.sqrt(((a + t[..., None] * ab - p) ** 2).sum(-1)).min(axis=1)
+            closer = (distance <= half) & (distance < best[index])
+            best[index[closer]] = distance[closer]
+            owner[index[closer]] = line_index
+        return np.bincount(owner[owner >= 0], minlength=len(lines))
+
+    def save(self, path: Path):
+        """Guarda el índice en un .npz para reutilizarlo sin reconstruirlo."""
+        np.savez(path, points=self.points, classes=self.classes, scores=self.scores, offsets=self.offsets,
+                 origin=self.origin, cell_size=self.cell_size, shape=np.array(self.shape),
+                 transform=np.array(self.transform if self.transform is not None else [], dtype=np.float64))
+
+    @classmethod
+    def load(cls, path: Path) -> 'DetectionIndex':
+        """Carga un índice guardado con save."""
+        with np.load(path) as data:
+            index = cls.__new__(cls)
+            index.points, index.classes, index.scores = data['points'], data['classes'], data['scores']
+            index.offsets, index.origin = data['offsets'], data['origin']
+            index.cell_size = float(data['cell_size'])
+            index.shape = tuple(int(v) for v in data['shape'])
+            index.transform = tuple(float(v) for v in data['transform']) if len(data['transform']) else None
+        return index
+
+    @classmethod
+    def from_detections(cls, path: Path, transform: tuple = None, cell_size: float = None) -> 'DetectionIndex':
+        """
+        Construye el índice desde un <name>_detections.json de la inferencia por mosaicos.
+
+        Args:
+            path (Path): Archivo de detecciones.
+            transform (tuple): Transformación afín para pasar de píxeles a coordenadas geográficas.
+            cell_size (float): Tamaño de celda del índice.
+
+        Returns:
+            DetectionIndex: Índice sobre los centros de las cajas.
+        """
+        with open(path, 'r') as file:
+            detections = json.load(file)['detections']
+        boxes = np.array([d['box'] for d in detections], dtype=np.float64).reshape(-1, 4)
+        centers = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+        classes = np.array([d['cls'] for d in detections], dtype=np.int64)
+        scores = np.array([d['conf'] for d in detections], dtype=np.float32)
+        return cls(apply_transform(centers, transform), classes, scores, cell_size, transform)
+
+def load_geojson_geometries(path: Path, id_field: str = None) -> tuple:
+    """
+    Lee las geometrías de un GeoJSON (FeatureCollection o una feature por línea).
+
+    Args:
+        path (Path): Archivo GeoJSON.
+        id_field (str): Propiedad usada como identificador; por defecto el índice de la feature.
+
+    Returns:
+        tuple: (identificadores de los polígonos, polígonos como listas de anillos,
+            identificadores de las polilíneas, polilíneas). Las partes de un Multi* comparten identificador.
+    """
+    text = Path(path).read_text()
+    if Path(path).suffix.lower() in ('.geojsonl', '.geojsons'):
+        features = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        features = json.loads(text)['features']
+
+    polygon_ids, polygons, line_ids, lines = [], [], [], []
+    for i, feature in enumerate(features):
+        geometry = feature['geometry']
+        feature_id = (feature.get('properties') or {}).get(id_field, i) if id_field else i
+        kind, coordinates = geometry['type'], geometry['coordinates']
+        if kind == 'Polygon':
+            polygon_ids.append(feature_id)
+            polygons.append([np.array(ring)[:, :2] for ring in coordinates])
+        elif kind == 'MultiPolygon':
+            polygon_ids.append(feature_id)
+            polygons.append([np.array(ring)[:, :2] for part in coordinates for ring in part])
+        elif kind in ('LineString', 'MultiLineString'):
+            for part in ([coordinates] if kind == 'LineString' else coordinates):
+                line_ids.append(feature_id)
+                lines.append(np.array(part)[:, :2])
+    return polygon_ids, polygons, line_ids, lines
@@ -0,0 +1,186 @@
+import csv
+import queue
+import threading
+from pathlib import Path
+import cv2
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet es opcional; sin pyarrow se escribe CSV
+    pa = None
+
+DETECTION_COLUMNS = ['frame', 'cls', 'conf', 'x1', 'y1', 'x2', 'y2']
+
+class DetectionWriter:
+    """
+    Escritor columnar de detecciones por frame, en bloques de tamaño fijo.
+
+    Acumula filas hasta chunk_size y las agrega al archivo (CSV o un row group
+    de Parquet), por lo que la memoria no crece con la duración del video. Un
+    video sin detecciones deja el archivo con solo el encabezado o el esquema.
+    """
+
+    def __init__(self, output_path: Path, chunk_size: int = 5000, fmt: str = 'csv'):
+        if fmt == 'parquet' and pa is None:
+            raise ImportError("Se requiere pyarrow para escribir en formato parquet.")
+        self.output_path = Path(output_path)
+        self.chunk_size = chunk_size
+        self.fmt = fmt
+        self.rows = 0
+        self._buffer = []
+        self._buffered = 0
+        self._file = None
+        self._writer = None
+
+    def add(self, frame_idx: int, boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray):
+        """
+        Agrega las detecciones de un frame.
+
+        Args:
+            frame_idx (int): Índice del frame.
+            boxes (np.ndarray): Cajas xyxy en píxeles, forma (N, 4).
+            scores (np.ndarray): Confianzas, forma (N,).
+            classes (np.ndarray): Clases, forma (N,).
+        """
+        if not len(boxes):
+            return
+        frames = np.full(len(boxes), frame_idx, dtype=np.int64)
+        self._buffer.append((frames, classes.astype(np.int64), scores.astype(np.float32), boxes.astype(np.float32)))
+        self._buffered += len(boxes)
+        if self._buffered >= self.chunk_size:
+            self.flush()
+
+    def _open(self):
+        """Crea el archivo de salida con el encabezado CSV o el esquema Parquet."""
+        if self.fmt == 'parquet':
+            schema = pa.schema([('frame', pa.int64()), ('cls', pa.int64()), ('conf', pa.float32()),
+                                ('x1', pa.float32()), ('y1', pa.float32()), ('x2', pa.float32()),
+                                ('y2', pa.float32())])
+            self._writer = pq.ParquetWriter(str(self.output_path), schema)
+        else:
+            self._file = open(self.output_path, 'w', newline='')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(DETECTION_COLUMNS)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        frames, classes, scores, boxes = (np.concatenate(column) for column in zip(*self._buffer))
+        self._buffer, self._buffered = [], 0
+        self.rows += len(frames)
+        if self._writer is None:
+            self._open()
+
+        if self.fmt == 'parquet':
+            table = pa.table({'frame': frames, 'cls': classes, 'conf': scores,
+                              'x1': boxes[:, 0], 'y1': boxes[:, 1], 'x2': boxes[:, 2], 'y2': boxes[:, 3]},
+                             schema=self._writer.schema)
+            self._writer.write_table(table)
+        else:
+            self._writer.writerows(
+                (f, c, f"{s:.4f}", f"{b[0]:.1f}", f"{b[1]:.1f}", f"{b[2]:.1f}", f"{b[3]:.1f}")
+                for f, c, s, b in zip(frames.tolist(), classes.tolist(), scores.tolist(), boxes.tolist()))
+            self._file.flush()
+
+    def close(self):
+        self.flush()
+        if self._writer is None:
+            self._open()
+        if self.fmt == 'parquet' and self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+class VideoWriterThread:
+    """
+    Escribe frames anotados a un mp4 desde un hilo dedicado.
+
+    La cola acotada aplica contrapresión: si la escritura se atrasa, la
+    inferencia espera en lugar de acumular frames en memoria.
+    """
+
+    def __init__(self, output_path: Path, fps: float, queue_size: int = 32):
+        self.output_path = Path(output_path)
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.frames = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        writer = None
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(str(self.output_path), cv2.VideoWriter_fourcc(*'mp4v'),
+                                         self.fps, (width, height))
+            writer.write(frame)
+            self.frames += 1
+        if writer is not None:
+            writer.release()
+
+    def write(self, frame: np.ndarray):
+        self._queue.put(frame)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+def stream_video_inference(model, input_path: Path, output_dir: Path, imgsz: int = 640, conf: float = 0.25,
+                           chunk_size: int = 5000, fmt: str = 'csv', save_video: bool = True) -> dict:
+    """
+    Ejecuta la inferencia sobre un video frame a frame con memoria constante.
+
+    Los resultados se consumen del generador de Ultralytics (stream=True), las
+    detecciones se escriben por bloques y, opcionalmente, los frames anotados se
+    envían al hilo que escribe el mp4.
+
+    Args:
+        model (YOLO): Modelo YOLO cargado.
+        input_path (Path): Ruta al video.
+        output_dir (Path): Directorio de salida.
+        imgsz (int): Tamaño de imagen de entrada.
+        conf (float): Umbral de confianza.
+        chunk_size (int): Detecciones acumuladas antes de escribir un bloque.
+        fmt (str): 'csv' o 'parquet'.
+        save_video (bool): Guarda un mp4 anotado.
+
+    Returns:
+        dict: Resumen con frames procesados, detecciones y rutas de salida.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cap = cv2.VideoCapture(str(input_path))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    detections_path = output_dir / f"{input_path.stem}_detections.{fmt}"
+    video_path = output_dir / f"{input_path.stem}.mp4"
+    detection_writer = DetectionWriter(detections_path, chunk_size, fmt)
+    video_writer = VideoWriterThread(video_path, fps) if save_video else None
+
+    frames = 0
+    try:
+        for frame_idx, result in enumerate(model.predict(source=str(input_path), stream=True, imgsz=imgsz,
+                                                         conf=conf, verbose=False)):
+            boxes = result.boxes
+            detection_writer.add(frame_idx, boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(),
+                                 boxes.cls.cpu().numpy())
+            if video_writer is not None:
+                video_writer.write(result.plot())
+            frames += 1
+    finally:
+        detection_writer.close()
+        if video_writer is not None:
+            video_writer.close()
+
+    return {
+        'frames': frames,
+        'detections': detection_writer.rows,
+        'detections_path': detections_path,
+        'video_path': video_path if save_video else None,
+    }
@@ -0,0 +1,261 @@
+import time
+from pathlib import Path
+import cv2
+import numpy as np
+
+# Modelo de velocidad constante sobre el estado [cx, cy, w, h, vx, vy, vw, vh]
+_F = np.eye(8, dtype=np.float64)
+_F[:4, 4:] = np.eye(4)
+_H = np.eye(4, 8, dtype=np.float64)
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.05, 0.05, 0.01, 0.01])
+_R = np.diag([4.0, 4.0, 10.0, 10.0])
+
+def _xyxy_to_cxcywh(boxes: np.ndarray) -> np.ndarray:
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2,
+                     boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1)
+
+def _cxcywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    half = boxes[:, 2:4] / 2
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], axis=1)
+
+def iou_matrix(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    IoU entre dos conjuntos de cajas xyxy.
+
+    Args:
+        boxes1 (np.ndarray): Cajas de forma (N, 4).
+        boxes2 (np.ndarray): Cajas de forma (M, 4).
+
+    Returns:
+        np.ndarray: Matriz de forma (N, M).
+    """
+    x1 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    y1 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    x2 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    y2 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    return intersection / np.maximum(area1[:, None] + area2[None, :] - intersection, 1e-9)
+
+def greedy_match(iou: np.ndarray, threshold: float) -> tuple:
+    """
+    Asociación voraz por IoU descendente.
+
+    Args:
+        iou (np.ndarray): Matriz IoU (tracks, detecciones).
+        threshold (float): IoU mínima para asociar.
+
+    Returns:
+        tuple: (track_indices, detection_indices) asociados.
+    """
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind='stable')
+    used_rows, used_cols, matches = set(), set(), []
+    for r, c in zip(rows[order], cols[order]):
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            matches.append((r, c))
+    if not matches:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    track_idx, det_idx = zip(*matches)
+    return np.array(track_idx, dtype=np.int64), np.array(det_idx, dtype=np.int64)
+
+class BoxTracker:
+    """
+    Tracker multiobjeto ligero en CPU (filtro de Kalman + asociación por IoU).
+
+    Todos los tracks se guardan en arreglos NumPy y se predicen en bloque, por
+    lo que avanzar un frame sin detecciones cuesta unas pocas operaciones.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 30, min_hits: int = 2,
+                 confidence_decay: float = 0.9):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.confidence_decay = confidence_decay
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.state = np.zeros((0, 8))
+        self.covariance = np.zeros((0, 8, 8))
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.age = np.zeros(0, dtype=np.int64)
+        self.classes = np.zeros(0, dtype=np.int64)
+        self.next_id = 0
+        self.confirmed = {}
+
+    @property
+    def boxes(self) -> np.ndarray:
+        return _cxcywh_to_xyxy(self.state[:, :4])
+
+    @property
+    def confidence(self) -> np.ndarray:
+        """Confianza de seguimiento: 1 tras asociar una detección y decae mientras el track se propaga sin ella."""
+        return self.confidence_decay ** self.age
+
+    def active(self) -> np.ndarray:
+        """Máscara de tracks confirmados."""
+        return self.hits >= self.min_hits
+
+    def predict(self):
+        """Avanza todos los tracks un frame con el modelo de velocidad constante."""
+        self.state = self.state @ _F.T
+        self.state[:, 2:4] = np.maximum(self.state[:, 2:4], 1.0)
+        self.covariance = _F @ self.covariance @ _F.T + _Q
+        self.age += 1
+
+        alive = self.age <= self.max_age
+        if not alive.all():
+            self._keep(alive)
+
+    def update(self, boxes: np.ndarray, classes: np.ndarray):
+        """
+        Corrige los tracks con las detecciones del frame actual y crea tracks nuevos.
+
+        Args:
+            boxes (np.ndarray): Detecciones xyxy, forma (N, 4).
+            classes (np.ndarray): Clases, forma (N,).
+        """
+        track_idx, det_idx = greedy_match(iou_matrix(self.boxes, boxes), self.iou_threshold)
+        if track_idx.size:
+            measurement = _xyxy_to_cxcywh(boxes[det_idx])
+            P = self.covariance[track_idx]
+            S = _H @ P @ _H.T + _R
+            K = P @ _H.T @ np.linalg.inv(S)
+            residual = measurement - self.state[track_idx] @ _H.T
+            self.state[track_idx] += np.einsum('nij,nj->ni', K, residual)
+            self.covariance[track_idx] = (np.eye(8) - K @ _H) @ P
+            self.hits[track_idx] += 1
+            self.age[track_idx] = 0
+            self.classes[track_idx] = classes[det_idx]
+
+        new = np.setdiff1d(np.arange(len(boxes)), det_idx)
+        if new.size:
+            state = np.zeros((new.size, 8))
+            state[:, :4] = _xyxy_to_cxcywh(boxes[new])
+            covariance = np.tile(np.diag([10.0, 10.0, 10.0, 10.0, 100.0, 100.0, 100.0, 100.0]), (new.size, 1, 1))
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + new.size)])
+            self.next_id += new.size
+            self.state = np.concatenate([self.state, state])
+            self.covariance = np.concatenate([self.covariance, covariance])
+            self.hits = np.concatenate([self.hits, np.ones(new.size, dtype=np.int64)])
+            self.age = np.concatenate([self.age, np.zeros(new.size, dtype=np.int64)])
+            self.classes = np.concatenate([self.classes, classes[new].astype(np.int64)])
+
+        for track_id, cls in zip(self.ids[self.active()], self.classes[self.active()]):
+            self.confirmed.setdefault(int(track_id), int(cls))
+
+    def _keep(self, mask: np.ndarray):
+        self.ids = self.ids[mask]
+        self.state = self.state[mask]
+        self.covariance = self.covariance[mask]
+        self.hits = self.hits[mask]
+        self.age = self.age[mask]
+        self.classes = self.classes[mask]
+
+class LineCounter:
+    """
+    Cuenta los tracks que cruzan una línea horizontal o vertical en cada sentido.
+
+    Args:
+        position (float): Posición de la línea como fracción del alto (axis='y') o ancho (axis='x').
+        axis (str): 'y' para línea horizontal, 'x' para vertical.
+    """
+
+    def __init__(self, position: float = 0.5, axis: str = 'y'):
+        self.position = position
+        self.axis = axis
+        self.forward = set()
+        self.backward = set()
+        self._last = {}
+
+    def update(self, ids: np.ndarray, boxes: np.ndarray, frame_shape: tuple):
+        dim = 1 if self.axis == 'y' else 0
+        line = self.position * frame_shape[0 if self.axis == 'y' else 1]
+        centers = (boxes[:, dim] + boxes[:, dim + 2]) / 2
+        current = {}
+        for track_id, center in zip(ids.tolist(), centers.tolist()):
+            last = self._last.get(track_id)
+            if last is not None and track_id not in self.forward and track_id not in self.backward:
+                if last < line <= center:
+                    self.forward.add(track_id)
+                elif last >= line > center:
+                    self.backward.add(track_id)
+            current[track_id] = center
+        self._last = current
+
+def count_video(model, video_path: Path, imgsz: int = 640, conf: float = 0.25, detect_every: int = 5,
+                redetect_confidence: float = 0.5, line_position: float = 0.5, line_axis: str = 'y',
+                iou_threshold: float = 0.3, max_age: int = 30, min_hits: int = 2) -> dict:
+    """
+    Cuenta objetos únicos en un video ejecutando el detector solo cada N frames.
+
+    Entre detecciones las cajas se propagan con el tracker y los frames se
+    avanzan con grab() sin decodificar. El detector también se ejecuta cuando la
+    confianza de seguimiento de algún track confirmado (que decae por cada frame
+    sin detección asociada) cae por debajo de redetect_confidence.
+
+    Args:
+        model (YOLO): Modelo YOLO cargado.
+        video_path (Path): Ruta al video.
+        imgsz (int): Tamaño de imagen de entrada.
+        conf (float): Umbral de confianza.
+        detect_every (int): Ejecuta el detector cada N frames (1 = todos).
+        redetect_confidence (float): Confianza de track que fuerza una nueva detección.
+        line_position (float): Posición relativa de la línea de conteo.
+        line_axis (str): 'y' para línea horizontal, 'x' para vertical.
+        iou_threshold (float): IoU mínima para asociar detecciones a tracks.
+        max_age (int): Frames sin detección antes de eliminar un track.
+        min_hits (int): Detecciones para confirmar un track.
+
+    Returns:
+        dict: Conteos por video, por clase y por cruce de línea, y rendimiento.
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    frame_shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    tracker = BoxTracker(iou_threshold, max(max_age, detect_every * 2), min_hits)
+    counter = LineCounter(line_position, line_axis)
+
+    frames = detector_frames = 0
+    force_detect = True
+    start = time.perf_counter()
+    while True:
+        detect = force_detect or frames % max(detect_every, 1) == 0
+        if detect:
+            ret, frame = cap.read()
+        else:
+            ret = cap.grab()
+        if not ret:
+            break
+
+        tracker.predict()
+        if detect:
+            result = model.predict(source=frame, imgsz=imgsz, conf=conf, verbose=False)[0]
+            tracker.update(result.boxes.xyxy.cpu().numpy(), result.boxes.cls.cpu().numpy())
+            detector_frames += 1
+
+        active = tracker.active()
+        counter.update(tracker.ids[active], tracker.boxes[active], frame_shape)
+        # Solo el frame en que un track cruza el umbral fuerza la detección, para
+        # que los tracks que salen de la escena no disparen el detector en cada frame
+        confidence = tracker.confidence[active]
+        force_detect = bool(((confidence < redetect_confidence)
+                             & (confidence >= redetect_confidence * tracker.confidence_decay)).any())
+        frames += 1
+
+    cap.release()
+    elapsed = time.perf_counter() - start
+
+    per_class = {}
+    for cls in tracker.confirmed.values():
+        per_class[cls] = per_class.get(cls, 0) + 1
+    return {
+        'frames': frames,
+        'detector_frames': detector_frames,
+        'elapsed': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'unique_objects': len(tracker.confirmed),
+        'per_class': per_class,
+        'line_crossings': {'forward': len(counter.forward), 'backward': len(counter.backward)},
+    }
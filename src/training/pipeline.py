@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+import psutil
+
+class Step:
+    """
+    Paso del pipeline (sync, train o export de un dataset).
+
+    Args:
+        name (str): Identificador único del paso (p. ej. 'train:jima_in_situ').
+        run (callable): Función sin argumentos que ejecuta el paso.
+        fingerprint (callable): Función que devuelve las entradas del paso (serializables a JSON).
+            Se evalúa cuando terminan sus dependencias; si no cambió y las salidas existen, el paso se omite.
+        outputs (list): Archivos que el paso debe producir.
+        deps (list): Nombres de los pasos de los que depende.
+        cpus (float): CPUs que reserva mientras se ejecuta.
+        memory_gb (float): Memoria que reserva mientras se ejecuta.
+    """
+
+    def __init__(self, name: str, run, fingerprint=None, outputs: list = (), deps: list = (),
+                 cpus: float = 1, memory_gb: float = 0.5):
+        self.name = name
+        self.run = run
+        self.fingerprint = fingerprint
+        self.outputs = [Path(path) for path in outputs]
+        self.deps = list(deps)
+        self.cpus = cpus
+        self.memory_gb = memory_gb
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+def _record_path(cache_dir: Path, name: str) -> Path:
+    return Path(cache_dir) / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.json"
+
+def _read_record(cache_dir: Path, name: str) -> dict:
+    path = _record_path(cache_dir, name)
+    if not path.exists():
+        return {}
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def _write_record(cache_dir: Path, name: str, record: dict):
+    path = _record_path(cache_dir, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as file:
+        json.dump(record, file, indent=2)
+    os.replace(tmp_path, path)
+
+def execute_step(step: Step, cache_dir: Path, force: bool = False) -> str:
+    """
+    Ejecuta un paso salvo que su huella coincida con la de la última ejecución correcta.
+
+    La huella se vuelve a calcular después de ejecutar el paso, de modo que los pasos
+    cuyas entradas incluyen sus propias salidas (p. ej. los archivos de un dataset
+    sincronizado) quedan registrados con el estado final.
+
+    Args:
+        step (Step): Paso a ejecutar.
+        cache_dir (Path): Directorio de los registros de ejecución.
+        force (bool): Ejecuta el paso aunque su huella no haya cambiado.
+
+    Returns:
+        str: 'cached' o 'done'.
+    """
+    record = _read_record(cache_dir, step.name)
+    if not force and step.fingerprint is not None and record.get('digest') == _digest(step.fingerprint()) \
+            and all(path.exists() for path in step.outputs):
+        return 'cached'
+
+    start = time.perf_counter()
+    step.run()
+    missing = [str(path) for path in step.outputs if not path.exists()]
+    if missing:
+        raise RuntimeError(f"El paso no produjo {', '.join(missing)}")
+    _write_record(cache_dir, step.name, {
+        'digest': _digest(step.fingerprint()) if step.fingerprint is not None else None,
+        'seconds': time.perf_counter() - start,
+        'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    })
+    return 'done'
+
+def _check_graph(steps: dict):
+    """Verifica que las dependencias existan y que el grafo no tenga ciclos."""
+    for step in steps.values():
+        for dep in step.deps:
+            if dep not in steps:
+                raise ValueError(f"{step.name} depende de un paso inexistente: {dep}")
+
+    state = {}
+
+    def visit(name: str, path: list):
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Ciclo en el pipeline: {' -> '.join(path + [name])}")
+        if state.get(name) == 'visited':
+            return
+        state[name] = 'visiting'
+        for dep in steps[name].deps:
+            visit(dep, path + [name])
+        state[name] = 'visited'
+
+    for name in steps:
+        visit(name, [])
+
+def default_limits() -> tuple:
+    """CPUs del equipo y memoria disponible en GB."""
+    return os.cpu_count() or 1, psutil.virtual_memory().available / 1024 ** 3
+
+def run_pipeline(steps: list, cache_dir: Path, max_cpus: float = None, max_memory_gb: float = None,
+                 force: list = (), log=print) -> list:
+    """
+    Ejecuta un grafo de pasos en paralelo respetando sus dependencias y los límites de CPU y memoria.
+
+    Un paso arranca cuando todas sus dependencias terminaron y sus recursos caben
+    junto a los pasos en ejecución; un paso que excede los límites por sí solo se
+    ejecuta cuando no hay otros en curso. Si un paso falla, los que dependen de él
+    se marcan como 'skipped' y el resto del grafo continúa.
+
+    Args:
+        steps (list): Pasos del pipeline.
+        cache_dir (Path): Directorio de los registros de ejecución.
+        max_cpus (float): CPUs disponibles; por defecto os.cpu_count().
+        max_memory_gb (float): Memoria disponible; por defecto la memoria libre del equipo.
+        force (list): Nombres o prefijos de pasos a ejecutar aunque no hayan cambiado (p. ej. 'train:').
+        log (callable): Función para reportar el progreso.
+
+    Returns:
+        list: Un dict por paso con 'step', 'status' ('done', 'cached', 'failed' o 'skipped'),
+            'seconds' y 'error'.
+    """
+    steps = {step.name: step for step in steps}
+    _check_graph(steps)
+    cpus, memory_gb = default_limits()
+    max_cpus = max_cpus or cpus
+    max_memory_gb = max_memory_gb or memory_gb
+
+    results = {}
+    pending = dict(steps)
+    running = {}
+    used_cpus, used_memory = 0.0, 0.0
+
+    def finish(name: str, status: str, seconds: float = 0.0, error: str = None):
+        results[name] = {'step': name, 'status': status, 'seconds': seconds, 'error': error}
+
+    def timed(step: Step) -> tuple:
+        start = time.perf_counter()
+        forced = any(step.name.startswith(name) for name in force)
+        try:
+            status, error = execute_step(step, cache_dir, forced), None
+        except Exception as exception:
+            status, error = 'failed', str(exception)
+        return status, time.perf_counter() - start, error
+
+    with ThreadPoolExecutor(max_workers=max(len(steps), 1)) as executor:
+        while pending or running:
+            for name, step in list(pending.items()):
+                states = [results.get(dep, {}).get('status') for dep in step.deps]
+                if any(state in ('failed', 'skipped') for state in states):
+                    del pending[name]
+                    finish(name, 'skipped', error='falló una dependencia')
+                    log(f"{name}: skipped (a dependency failed)")
+                    continue
+                if not all(state in ('done', 'cached') for state in states):
+                    continue
+                fits = used_cpus + step.cpus <= max_cpus and used_memory + step.memory_gb <= max_memory_gb
+                if not fits and running:
+                    continue
+                del pending[name]
+                used_cpus += step.cpus
+                used_memory += step.memory_gb
+                log(f"{name}: started")
+                running[executor.submit(timed, step)] = step
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                used_cpus -= step.cpus
+                used_memory -= step.memory_gb
+                status, seconds, error = future.result()
+                finish(step.name, status, seconds, error)
+                log(f"{step.name}: {status} ({seconds:.1f} s)" + (f": {error}" if error else ''))
+
+    return [results[name] for name in steps]
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import re
+from pathlib import Path
+from src.data_processing.dataset_utils import manifest_digest
+
+FINGERPRINT_FILE = 'fingerprint.json'
+
+# Parámetros que no cambian el modelo resultante y no deben invalidar una corrida
+IGNORED_TRAINING_KEYS = {'device'}
+
+# Pesos preentrenados de cada tarea; deben descargarse en la raíz del repositorio.
+# Viven aquí para que el pipeline calcule las huellas sin importar torch.
+PRETRAINED_MODELS = {
+    'detect': 'yolov8n.pt',
+    'segment': 'yolo11n-seg.pt',
+}
+
+def run_fingerprint(config: dict, pretrained: str) -> dict:
+    """
+    Huella de una corrida de entrenamiento.
+
+    Cubre la configuración de entrenamiento, los pesos preentrenados, el contenido
+    del data.yaml y el manifiesto de archivos del dataset.
+
+    Args:
+        config (dict): Configuración de entrenamiento (secciones 'model' y 'training').
+        pretrained (str): Pesos iniciales (p. ej. 'yolov8n.pt').
+
+    Returns:
+        dict: Componentes de la huella y su hash en 'digest'.
+    """
+    data_yaml = Path(config['model']['data_yaml'])
+    components = {
+        'training': {k: v for k, v in config['training'].items() if k not in IGNORED_TRAINING_KEYS},
+        'pretrained': pretrained,
+        'data_yaml': hashlib.sha256(data_yaml.read_bytes()).hexdigest(),
+        'manifest': manifest_digest(data_yaml),
+    }
+    components['digest'] = hashlib.sha256(json.dumps(components, sort_keys=True).encode()).hexdigest()
+    return components
+
+def read_fingerprint(directory: Path) -> dict:
+    """Huella guardada en un directorio de corrida o de salida, o {} si no existe."""
+    path = Path(directory) / FINGERPRINT_FILE
+    if not path.exists():
+        return {}
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def write_fingerprint(directory: Path, fingerprint: dict, **extra):
+    """
+    Guarda la huella en un directorio.
+
+    Args:
+        directory (Path): Directorio de corrida o de salida.
+        fingerprint (dict): Huella de run_fingerprint.
+        **extra: Campos adicionales (p. ej. completed=True).
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / FINGERPRINT_FILE, 'w') as file:
+        json.dump({**fingerprint, **extra}, file, indent=2)
+
+def _run_dirs(project: Path, run_name: str) -> list:
+    """Corridas versionadas existentes: run_name, run_name_v2, run_name_v3, ..."""
+    pattern = re.compile(rf'^{re.escape(run_name)}(?:_v(\d+))?$')
+    runs = []
+    if project.exists():
+        for path in project.iterdir():
+            match = pattern.match(path.name)
+            if match and path.is_dir():
+                runs.append((int(match.group(1) or 1), path))
+    return [path for _, path in sorted(runs)]
+
+def resolve_run(project: Path, run_name: str, fingerprint: dict) -> tuple:
+    """
+    Decide qué corrida usar para una huella.
+
+    Args:
+        project (Path): Directorio de corridas (p. ej. runs/detect).
+        run_name (str): Nombre base de la corrida.
+        fingerprint (dict): Huella de run_fingerprint.
+
+    Returns:
+        tuple: (estado, directorio) con estado 'completed' si una corrida con la misma
+            huella terminó, 'resume' si quedó interrumpida con weights/last.pt, o 'new'
+            con el siguiente directorio versionado libre.
+    """
+    project = Path(project)
+    runs = _run_dirs(project, run_name)
+    for run_dir in reversed(runs):
+        stored = read_fingerprint(run_dir)
+        if stored.get('digest') != fingerprint['digest']:
+            continue
+        if stored.get('completed'):
+            return 'completed', run_dir
+        if (run_dir / 'weights' / 'last.pt').exists():
+            return 'resume', run_dir
+        # Interrumpida antes de guardar el primer epoch: se reutiliza el directorio
+        return 'new', run_dir
+
+    taken = {path.name for path in runs}
+    version = 1
+    name = run_name
+    while name in taken or (project / name).exists():
+        version += 1
+        name = f"{run_name}_v{version}"
+    return 'new', project / name
+
+def train_run(config: dict, pretrained: str, fingerprint: dict, project: Path, device: str, trainer=None,
+              log=print) -> Path:
+    """
+    Entrena, reanuda u omite una corrida según su huella.
+
+    Una corrida interrumpida con la misma huella se reanuda desde weights/last.pt.
+    Si la huella cambió se inicia una corrida versionada nueva en lugar de borrar
+    las anteriores.
+
+    Args:
+        config (dict): Configuración de entrenamiento.
+        pretrained (str): Pesos iniciales.
+        fingerprint (dict): Huella de run_fingerprint.
+        project (Path): Directorio de corridas (p. ej. runs/detect).
+        device (str): Dispositivo de entrenamiento.
+        trainer (type): Trainer de Ultralytics a usar (p. ej. make_shard_trainer); None usa el de la tarea.
+        log (callable): Función para reportar el progreso.
+
+    Returns:
+        Path: Directorio de la corrida.
+    """
+    from ultralytics import YOLO
+
+    state, run_dir = resolve_run(project, f"{config['model']['name']}_train", fingerprint)
+
+    if state == 'completed':
+        log(f"Run '{run_dir}' already completed with the same fingerprint. Skipping training.")
+        return run_dir
+
+    if state == 'resume':
+        log(f"Resuming interrupted run '{run_dir}' from last.pt.")
+        YOLO(str(run_dir / 'weights' / 'last.pt')).train(resume=True, device=device, trainer=trainer)
+    else:
+        log(f"Starting run '{run_dir}'.")
+        write_fingerprint(run_dir, fingerprint)
+        YOLO(pretrained).train(
+            data=config['model']['data_yaml'],
+            epochs=config['training']['epochs'],
+            batch=config['training']['batch_size'],
+            imgsz=config['training']['imgsz'],
+            device=device,
+            project=str(Path(project).resolve()),
+            name=run_dir.name,
+            exist_ok=True,
+            trainer=trainer
+        )
+
+    if (run_dir / 'weights' / 'best.pt').exists():
+        write_fingerprint(run_dir, fingerprint, completed=True)
+    return run_dir
@@ -0,0 +1,180 @@
+import math
+from pathlib import Path
+import cv2
+from src.data_processing.shard_cache import ShardCache, ensure_shard_cache
+from src.data_processing.tile_shards import ShardReader, is_container, parse_label_text
+
+class ShardImageMixin:
+    """
+    Reemplaza YOLODataset.load_image para leer de la caché de shards en lugar de decodificar JPEGs.
+
+    Las imágenes que no están en la caché (o las cargas con rect_mode=False) se
+    delegan a la implementación original.
+    """
+
+    shard_cache = None
+
+    def load_image(self, i, rect_mode=True):
+        index = self.shard_cache.find(self.im_files[i]) if rect_mode else None
+        if index is None:
+            return super().load_image(i, rect_mode)
+
+        image, hw0, hw = self.shard_cache.image(index)
+        if self.augment:
+            # Mismo buffer que YOLODataset para el mosaico; guarda vistas, no copias
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = image, hw0, hw
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                if self.cache != 'ram':
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return image, hw0, hw
+
+def attach_shard_cache(dataset, cache: ShardCache):
+    """
+    Hace que un dataset de Ultralytics lea sus imágenes de la caché de shards.
+
+    Args:
+        dataset (YOLODataset): Dataset construido por el trainer.
+        cache (ShardCache): Caché del split.
+
+    Returns:
+        YOLODataset: El mismo dataset, con load_image reemplazado.
+    """
+    base = type(dataset)
+    dataset.__class__ = type(f"Shard{base.__name__}", (ShardImageMixin, base), {})
+    dataset.shard_cache = cache
+    return dataset
+
+class TileShardDatasetMixin:
+    """
+    Dataset de Ultralytics cuyas imágenes y etiquetas vienen de un contenedor de shards (tile_shards).
+
+    im_files son rutas virtuales <contenedor>/<nombre> en el orden del índice, de
+    modo que la imagen i es el registro i. Las etiquetas se leen del campo 'label'
+    de cada registro y el tamaño original de 'shape', sin abrir ninguna imagen.
+    """
+
+    tile_shards = None
+
+    def get_img_files(self, img_path):
+        self.tile_shards = ShardReader(img_path)
+        files = [str(self.tile_shards.root / name) for name in self.tile_shards.names]
+        if self.fraction < 1:
+            files = files[:round(len(files) * self.fraction)]
+        return files
+
+    def get_labels(self):
+        labels = []
+        for record, im_file in zip(self.tile_shards.records, self.im_files):
+            classes, boxes, segments = parse_label_text(record.get('label', ''))
+            labels.append({
+                'im_file': im_file,
+                'shape': tuple(record['shape']),
+                'cls': classes,
+                'bboxes': boxes,
+                'segments': segments,
+                'keypoints': None,
+                'normalized': True,
+                'bbox_format': 'xywh',
+            })
+        return labels
+
+    def check_cache_ram(self, safety_margin=0.5):
+        return True
+
+    def load_image(self, i, rect_mode=True):
+        if self.ims[i] is not None:
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+
+        image = self.tile_shards.read_image(i)
+        h0, w0 = image.shape[:2]
+        if rect_mode:
+            r = self.imgsz / max(h0, w0)
+            if r != 1:
+                w, h = min(math.ceil(w0 * r), self.imgsz), min(math.ceil(h0 * r), self.imgsz)
+                image = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+        elif not (h0 == w0 == self.imgsz):
+            image = cv2.resize(image, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = image, (h0, w0), image.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                if self.cache != 'ram':
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return image, (h0, w0), image.shape[:2]
+
+def build_container_dataset(trainer, img_path, mode: str = 'train', batch: int = None):
+    """
+    Construye el dataset de un split guardado como contenedor de shards.
+
+    Mismos argumentos que build_yolo_dataset de Ultralytics; la caché en disco
+    (.npy junto a cada imagen) no aplica y se desactiva.
+
+    Args:
+        trainer: Trainer de Ultralytics que construye el dataset.
+        img_path (str): Directorio del contenedor.
+        mode (str): 'train' o 'val'.
+        batch (int): Tamaño del lote.
+
+    Returns:
+        YOLODataset: Dataset que lee del contenedor.
+    """
+    from ultralytics.data import YOLODataset
+    from ultralytics.utils import colorstr
+    from ultralytics.utils.torch_utils import de_parallel
+
+    cfg = trainer.args
+    stride = max(int(de_parallel(trainer.model).stride.max() if trainer.model else 0), 32)
+    dataset_class = type('TileShardYOLODataset', (TileShardDatasetMixin, YOLODataset), {})
+    return dataset_class(
+        img_path=str(img_path),
+        imgsz=cfg.imgsz,
+        batch_size=batch,
+        augment=mode == 'train',
+        hyp=cfg,
+        rect=cfg.rect or mode == 'val',
+        cache='ram' if cfg.cache in (True, 'ram') else None,
+        single_cls=cfg.single_cls or False,
+        stride=stride,
+        pad=0.0 if mode == 'train' else 0.5,
+        prefix=colorstr(f"{mode}: "),
+        task=cfg.task,
+        classes=cfg.classes,
+        data=trainer.data,
+        fraction=cfg.fraction if mode == 'train' else 1.0,
+    )
+
+def make_shard_trainer(base_trainer, cache_root: Path = None, shard_size: int = 1024, workers: int = 8, log=print):
+    """
+    Crea un trainer de Ultralytics cuyos datasets leen de la caché de shards.
+
+    La caché de cada split se construye (o se reutiliza si los archivos no
+    cambiaron) al crear el dataset, con el imgsz del entrenamiento. Los splits
+    del data.yaml que apuntan a un contenedor de shards (tile_shards) se leen
+    directamente del contenedor, sin caché.
+
+    Args:
+        base_trainer (type): DetectionTrainer o SegmentationTrainer.
+        cache_root (Path): Directorio raíz de las cachés; None para leer solo contenedores.
+        shard_size (int): Imágenes por shard.
+        workers (int): Hilos de decodificación al construir la caché.
+        log (callable): Función para reportar el progreso.
+
+    Returns:
+        type: Subclase de base_trainer para model.train(trainer=...).
+    """
+    def build_dataset(self, img_path, mode='train', batch=None):
+        if is_container(img_path):
+            log(f"Leyendo {mode} desde el contenedor de shards: {img_path}")
+            return build_container_dataset(self, img_path, mode, batch)
+        dataset = base_trainer.build_dataset(self, img_path, mode, batch)
+        images_dir = Path(img_path)
+        if cache_root is None or not images_dir.is_dir():
+            return dataset
+        cache_dir = ensure_shard_cache(images_dir, cache_root, self.args.imgsz, shard_size, workers, log)
+        return attach_shard_cache(dataset, ShardCache(cache_dir))
+
+    return type(f"Shard{base_trainer.__name__}", (base_trainer,), {'build_dataset': build_dataset})